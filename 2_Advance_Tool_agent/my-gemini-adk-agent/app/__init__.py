@@ -1,11 +1,22 @@
 """Advanced Tool Agent package."""
 
-from app.agent import AdvancedToolAgent
-from app.tools import generate_code_with_cli, analyze_code_with_cli, GeminiCLIWrapper
-
-__all__ = [
-    "AdvancedToolAgent",
-    "generate_code_with_cli",
-    "analyze_code_with_cli",
-    "GeminiCLIWrapper"
-]
+from importlib import import_module
+
+# Public names and the modules defining them. They are imported on first
+# access (PEP 562) so that importing a submodule such as app.server does not
+# load the agent and tools up front.
+_EXPORTS = {
+    "AdvancedToolAgent": "app.agent",
+    "generate_code_with_cli": "app.tools",
+    "analyze_code_with_cli": "app.tools",
+    "GeminiCLIWrapper": "app.tools",
+}
+
+__all__ = list(_EXPORTS)
+
+
+def __getattr__(name):
+    module = _EXPORTS.get(name)
+    if module is None:
+        raise AttributeError(f"module {__name__!r} has no attribute {name!r}")
+    return getattr(import_module(module), name)
@@ -2,8 +2,12 @@
 
 import json
 import logging
-from typing import Dict, Any, List
-from app.tools import generate_code_with_cli, analyze_code_with_cli
+from concurrent.futures import ThreadPoolExecutor
+from typing import Dict, Any, List, Optional, Tuple
+from app.chunking import StreamingBlockSplitter, merge_analyses
+from app.intent import classify
+from app.sessions import DEFAULT_SESSION, SessionStore
+from app.tools import AVAILABLE_TOOLS, finish_generation, stream_code_with_cli
 
 logging.basicConfig(level=logging.INFO, format='%(asctime)s - %(name)s - %(levelname)s - %(message)s')
 logger = logging.getLogger(__name__)
@@ -12,12 +16,25 @@ logger = logging.getLogger(__name__)
 class AdvancedToolAgent:
     """Agent that can generate and analyze code using Gemini CLI."""
     
-    def __init__(self):
-        self.tools = {
-            "generate_code": generate_code_with_cli,
-            "analyze_code": analyze_code_with_cli
-        }
-        self.conversation_history: List[Dict[str, Any]] = []
+    def __init__(self, pipelined: bool = False, max_analysis_workers: int = 4,
+                 sessions: Optional[SessionStore] = None):
+        """
+        Args:
+            pipelined: For generate + analyze requests, start analyzing finished
+                functions/classes while the rest of the code is still being generated
+            max_analysis_workers: Maximum concurrent analysis calls in pipelined mode
+            sessions: Per-session conversation history store (a bounded
+                in-memory store by default)
+        """
+        self.tools = dict(AVAILABLE_TOOLS)
+        self.pipelined = pipelined
+        self.max_analysis_workers = max_analysis_workers
+        self.sessions = sessions or SessionStore()
+    
+    @property
+    def conversation_history(self) -> List[Dict[str, Any]]:
+        """Recent turns of the default session."""
+        return self.sessions.history(DEFAULT_SESSION)["turns"]
     
     def parse_intent(self, user_request: str) -> Dict[str, Any]:
         """
@@ -26,37 +43,12 @@ class AdvancedToolAgent:
         Returns:
             Dict with 'action', 'tool', and 'params'
         """
-        request_lower = user_request.lower()
-        
-        # Check for generation keywords
-        generate_keywords = ["generate", "create", "build", "write", "make", "develop"]
-        analyze_keywords = ["analyze", "check", "review", "audit", "inspect", "scan", "find vulnerabilities"]
-        
-        has_generate = any(keyword in request_lower for keyword in generate_keywords)
-        has_analyze = any(keyword in request_lower for keyword in analyze_keywords)
-        
-        # Detect language
-        language = "python"  # default
-        if "javascript" in request_lower or "js" in request_lower or "node" in request_lower:
-            language = "javascript"
-        elif "golang" in request_lower or " go " in request_lower:
-            language = "go"
-        
-        # Detect complexity
-        complexity = "medium"
-        if "simple" in request_lower or "basic" in request_lower:
-            complexity = "simple"
-        elif "complex" in request_lower or "advanced" in request_lower:
-            complexity = "complex"
-        
-        # Detect analysis type
-        analysis_type = "security"
-        if "performance" in request_lower:
-            analysis_type = "performance"
-        elif "style" in request_lower or "best practice" in request_lower:
-            analysis_type = "style"
-        elif "all" in request_lower or "comprehensive" in request_lower:
-            analysis_type = "all"
+        features = classify(user_request)
+        has_generate = features["generate"]
+        has_analyze = features["analyze"]
+        language = features["language"]
+        complexity = features["complexity"]
+        analysis_type = features["analysis_type"]
         
         # Determine action
         if has_generate and has_analyze:
@@ -108,7 +100,11 @@ class AdvancedToolAgent:
     def execute_tool(self, tool_name: str, params: Dict[str, Any]) -> Dict[str, Any]:
         """Execute a tool with given parameters."""
         logger.info(f"Executing tool: {tool_name}")
-        logger.info(f"Parameters: {json.dumps(params, indent=2)}")
+        # Long values (e.g. code to analyze) are summarized, not copied into the log
+        logger.info("Parameters: %s", {
+            key: f"<{len(value)} chars>" if isinstance(value, str) and len(value) > 200 else value
+            for key, value in params.items()
+        })
         
         tool_func = self.tools.get(tool_name)
         if not tool_func:
@@ -122,16 +118,32 @@ class AdvancedToolAgent:
             logger.error(f"Tool execution failed: {str(e)}")
             return {"success": False, "error": str(e)}
     
-    def process_request(self, user_request: str) -> Dict[str, Any]:
+    def process_request(self, user_request: str, session_id: Optional[str] = DEFAULT_SESSION,
+                        format_response: bool = True) -> Dict[str, Any]:
         """
         Process a user request end-to-end.
         
         Args:
             user_request: Natural language request from user
+            session_id: Conversation to record the exchange in, or None to
+                keep no history
+            format_response: Build the human-readable 'formatted_response'
+                text; API clients that only read the structured fields can
+                skip it
             
         Returns:
-            Dict with results and formatted response
+            Dict with results and (optionally) formatted response
         """
+        result = self._process(user_request)
+        if format_response and result.get("action"):
+            result["formatted_response"] = self.format_result(result)
+        if session_id is not None:
+            self.sessions.append(session_id, "user", user_request)
+            self.sessions.append(session_id, "assistant", self._summarize_result(result))
+        return result
+    
+    def _process(self, user_request: str) -> Dict[str, Any]:
+        """Parse intent and run the matching tool(s)."""
         logger.info(f"Processing request: {user_request[:100]}...")
         
         # Parse intent
@@ -140,31 +152,42 @@ class AdvancedToolAgent:
         
         # Execute based on action
         if intent["action"] == "both":
-            # Generate code first, then analyze it
-            logger.info("Executing chained operation: generate + analyze")
-            
-            # Step 1: Generate code
-            gen_result = self.execute_tool("generate_code", intent["params"]["generate"])
-            
-            if not gen_result.get("success"):
-                return {
-                    "success": False,
-                    "error": gen_result.get("error"),
-                    "stage": "generation"
-                }
-            
-            # Step 2: Analyze generated code
-            analyze_params = intent["params"]["analyze"].copy()
-            analyze_params["code"] = gen_result["code"]
-            
-            analyze_result = self.execute_tool("analyze_code", analyze_params)
+            if self.pipelined and intent["params"]["generate"]["language"] == "python":
+                logger.info("Executing pipelined operation: generate + analyze")
+                gen_result, analyze_result = self._generate_and_analyze_pipelined(
+                    intent["params"]["generate"], intent["params"]["analyze"]
+                )
+                if not gen_result.get("success"):
+                    return {
+                        "success": False,
+                        "error": gen_result.get("error"),
+                        "stage": "generation"
+                    }
+            else:
+                # Generate code first, then analyze it
+                logger.info("Executing chained operation: generate + analyze")
+                
+                # Step 1: Generate code
+                gen_result = self.execute_tool("generate_code", intent["params"]["generate"])
+                
+                if not gen_result.get("success"):
+                    return {
+                        "success": False,
+                        "error": gen_result.get("error"),
+                        "stage": "generation"
+                    }
+                
+                # Step 2: Analyze generated code
+                analyze_params = intent["params"]["analyze"].copy()
+                analyze_params["code"] = gen_result["code"]
+                
+                analyze_result = self.execute_tool("analyze_code", analyze_params)
             
             return {
                 "success": True,
                 "action": "both",
                 "generation": gen_result,
-                "analysis": analyze_result,
-                "formatted_response": self._format_both_response(gen_result, analyze_result)
+                "analysis": analyze_result
             }
         
         elif intent["action"] == "generate":
@@ -172,8 +195,7 @@ class AdvancedToolAgent:
             return {
                 "success": result.get("success", False),
                 "action": "generate",
-                "result": result,
-                "formatted_response": self._format_generate_response(result)
+                "result": result
             }
         
         elif intent["action"] == "analyze":
@@ -181,8 +203,7 @@ class AdvancedToolAgent:
             return {
                 "success": result.get("success", False),
                 "action": "analyze",
-                "result": result,
-                "formatted_response": self._format_analyze_response(result)
+                "result": result
             }
         
         else:
@@ -191,6 +212,123 @@ class AdvancedToolAgent:
                 "error": "Unknown action type"
             }
     
+    def _generate_and_analyze_pipelined(
+        self, gen_params: Dict[str, Any], analyze_params: Dict[str, Any]
+    ) -> Tuple[Dict[str, Any], Dict[str, Any]]:
+        """
+        Stream code generation and analyze each completed top-level block
+        while generation continues, then merge the per-block analyses.
+        
+        The streamed output goes through the same fence removal, validation
+        and repair as generate_code. If that changes the code, the per-block
+        analyses no longer match it and the final code is analyzed instead.
+        
+        Returns:
+            (generation result, merged analysis result)
+        """
+        analysis_type = analyze_params.get("analysis_type", "security")
+        splitter = StreamingBlockSplitter()
+        pieces: List[str] = []
+        pending = []
+        metadata: Dict[str, Any] = {}
+        
+        with ThreadPoolExecutor(max_workers=self.max_analysis_workers) as pool:
+            def submit(chunks):
+                for chunk in chunks:
+                    logger.info(f"Analyzing generated block starting at line {chunk.start_line}")
+                    params = dict(analyze_params, code=chunk.code)
+                    pending.append((chunk, pool.submit(self.execute_tool, "analyze_code", params)))
+            
+            for event in stream_code_with_cli(**gen_params):
+                if event["event"] == "chunk":
+                    pieces.append(event["data"]["text"])
+                    submit(splitter.feed(event["data"]["text"]))
+                elif event["event"] == "error":
+                    for _, future in pending:
+                        future.cancel()
+                    return event["data"], {}
+                else:
+                    metadata = event["data"]
+            
+            submit(splitter.flush())
+            results = [(chunk, future.result()) for chunk, future in pending]
+        
+        output = "".join(pieces)
+        gen_result = finish_generation(output, **gen_params)
+        gen_result["timing"] = {
+            key: metadata.get(key) for key in ("time_to_first_chunk", "total_time")
+        }
+        
+        block_results = self._align_block_results(results, output, gen_result["code"])
+        if not block_results:
+            logger.info("Generated code changed after streaming, analyzing the final code")
+            analyze_result = self.execute_tool("analyze_code", dict(analyze_params, code=gen_result["code"]))
+            return gen_result, analyze_result
+        return gen_result, merge_analyses(block_results, analysis_type)
+    
+    @staticmethod
+    def _align_block_results(results: List[Tuple[Any, Dict[str, Any]]], output: str,
+                             code: str) -> Optional[List[Tuple[int, Dict[str, Any]]]]:
+        """
+        Map analyses of streamed blocks onto the cleaned-up code.
+        
+        Blocks are numbered by lines of the raw output (fence lines blanked,
+        leading blank lines dropped); blocks wholly outside the code, such as
+        prose around the fences, are discarded.
+        
+        Returns:
+            (line_offset, result) pairs relative to the code, or None when the
+            code is not an unchanged slice of the output or a block spans its
+            boundary
+        """
+        lines = output.split("\n")
+        while lines and not lines[0].strip():
+            lines.pop(0)
+        lines = ["" if line.lstrip().startswith("```") else line.rstrip() for line in lines]
+        code_lines = [line.rstrip() for line in code.split("\n")]
+        
+        start = next((index for index in range(len(lines) - len(code_lines) + 1)
+                      if lines[index:index + len(code_lines)] == code_lines), None)
+        if start is None:
+            return None
+        end = start + len(code_lines)
+        
+        aligned = []
+        for chunk, result in results:
+            content = [number for number, line in enumerate(chunk.code.split("\n"), chunk.line_offset)
+                       if line.strip()]
+            if not content or content[-1] < start or content[0] >= end:
+                continue
+            if content[0] < start or content[-1] >= end:
+                return None
+            aligned.append((chunk.line_offset - start, result))
+        return aligned
+    
+    @staticmethod
+    def _summarize_result(result: Dict[str, Any]) -> str:
+        """One-line description of a result for conversation history."""
+        if not result.get("success"):
+            return f"failed: {result.get('error')}"
+        
+        parts = []
+        generation = result.get("generation") or (result.get("result") if result.get("action") == "generate" else None)
+        if generation:
+            lines = len((generation.get("code") or "").splitlines())
+            parts.append(f"generated {generation.get('language', '')} code ({lines} lines)")
+        analysis = result.get("analysis") or (result.get("result") if result.get("action") == "analyze" else None)
+        if analysis:
+            parts.append(f"{analysis.get('analysis_type', '')} analysis " +
+                         ("completed" if analysis.get("success") else f"failed: {analysis.get('error')}"))
+        return "; ".join(parts) or result.get("action", "")
+    
+    def format_result(self, result: Dict[str, Any]) -> str:
+        """Human-readable text for a finished result."""
+        if result["action"] == "both":
+            return self._format_both_response(result["generation"], result["analysis"])
+        if result["action"] == "generate":
+            return self._format_generate_response(result["result"])
+        return self._format_analyze_response(result["result"])
+    
     def _format_generate_response(self, result: Dict[str, Any]) -> str:
         """Format code generation response."""
         if not result.get("success"):
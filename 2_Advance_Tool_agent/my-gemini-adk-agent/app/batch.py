@@ -0,0 +1,154 @@
+"""Concurrent analysis of many files with content-hash deduplication."""
+
+import hashlib
+import io
+import logging
+import tarfile
+import time
+from concurrent.futures import FIRST_COMPLETED, ThreadPoolExecutor, wait
+from typing import Any, AsyncIterator, Callable, Dict, Iterator, List, Optional, Sequence, Tuple
+
+from fastapi.concurrency import iterate_in_threadpool
+
+from app.responses import dumps_bytes
+from app.tools import analyze_code_with_cli
+
+logger = logging.getLogger(__name__)
+
+MAX_BATCH_FILES = 1000
+MAX_FILE_BYTES = 1024 * 1024
+# Every tar member (directories, links, skipped files) counts toward this
+MAX_ARCHIVE_MEMBERS = 4 * MAX_BATCH_FILES
+
+
+class BatchError(ValueError):
+    """Raised when a batch request cannot be accepted."""
+
+
+def content_hash(code: str) -> str:
+    return hashlib.sha256(code.encode("utf-8")).hexdigest()
+
+
+def extract_tarball(data: bytes, max_files: int = MAX_BATCH_FILES,
+                    max_file_bytes: int = MAX_FILE_BYTES,
+                    max_members: int = MAX_ARCHIVE_MEMBERS) -> List[Tuple[str, str]]:
+    """
+    Read the text files out of a (optionally compressed) tar archive.
+
+    Directories, links and other special members are ignored, as are files
+    that are too large or not valid UTF-8. Ignored members still count
+    toward ``max_members``, so an archive of empty entries cannot keep the
+    loop busy.
+
+    Returns:
+        List of (path, code) tuples in archive order
+
+    Raises:
+        BatchError: If the archive is unreadable or holds too many files or
+            members
+    """
+    files = []
+    try:
+        with tarfile.open(fileobj=io.BytesIO(data), mode="r:*") as archive:
+            for count, member in enumerate(archive, 1):
+                if count > max_members:
+                    raise BatchError(f"Archive holds more than {max_members} entries")
+                if not member.isfile():
+                    continue
+                if member.size > max_file_bytes:
+                    logger.info(f"Skipping {member.name}: {member.size} bytes")
+                    continue
+                if len(files) >= max_files:
+                    raise BatchError(f"Archive holds more than {max_files} files")
+                try:
+                    code = archive.extractfile(member).read().decode("utf-8")
+                except UnicodeDecodeError:
+                    continue
+                files.append((member.name, code))
+    except tarfile.TarError as e:
+        raise BatchError(f"Invalid tar archive: {str(e)}")
+    return files
+
+
+def analyze_batch(files: Sequence[Tuple[str, str]], analysis_type: str = "security",
+                  max_workers: int = 8,
+                  analyze: Optional[Callable[[str, str], Dict[str, Any]]] = None) -> Iterator[Dict[str, Any]]:
+    """
+    Analyze many files concurrently, yielding one record per file as it finishes.
+
+    Files with identical content are analyzed once and the result is reported
+    for every path that shares it. Closing the generator early (e.g. because
+    the client disconnected) cancels analyses that have not started yet.
+    ``analyze`` replaces analyze_code_with_cli, e.g. to run each analysis
+    under a tenant's limits.
+
+    Yields:
+        {'type': 'result', 'path', 'sha256', 'deduplicated', 'result'} for each
+        file, then one {'type': 'summary', ...} record
+    """
+    start_time = time.perf_counter()
+    paths_by_hash: Dict[str, List[str]] = {}
+    code_by_hash: Dict[str, str] = {}
+    for path, code in files:
+        digest = content_hash(code)
+        paths_by_hash.setdefault(digest, []).append(path)
+        code_by_hash.setdefault(digest, code)
+
+    analyze = analyze or analyze_code_with_cli
+    succeeded = failed = 0
+    executor = ThreadPoolExecutor(max_workers=max(1, min(max_workers, len(code_by_hash) or 1)))
+    pending = {
+        executor.submit(analyze, code, analysis_type): digest
+        for digest, code in code_by_hash.items()
+    }
+    try:
+        while pending:
+            done, _ = wait(pending, return_when=FIRST_COMPLETED)
+            for future in done:
+                digest = pending.pop(future)
+                try:
+                    result = future.result()
+                except Exception as e:
+                    logger.error(f"Batch analysis failed: {str(e)}")
+                    result = {"success": False, "error": str(e), "analysis_type": analysis_type}
+                for index, path in enumerate(paths_by_hash[digest]):
+                    if result.get("success"):
+                        succeeded += 1
+                    else:
+                        failed += 1
+                    yield {
+                        "type": "result",
+                        "path": path,
+                        "sha256": digest,
+                        "deduplicated": index > 0,
+                        "result": result
+                    }
+    finally:
+        for future in pending:
+            future.cancel()
+        executor.shutdown(wait=False)
+
+    yield {
+        "type": "summary",
+        "files": len(files),
+        "unique": len(code_by_hash),
+        "succeeded": succeeded,
+        "failed": failed,
+        "elapsed": round(time.perf_counter() - start_time, 3)
+    }
+
+
+async def ndjson_lines(records: Iterator[Dict[str, Any]]) -> AsyncIterator[bytes]:
+    """
+    NDJSON lines for an analyze_batch generator, advanced in a worker thread.
+
+    The generator is closed in a ``finally``, which cancels analyses that
+    have not started as soon as streaming stops. That happens when a client
+    disconnect cancels the response task, or when ClosingStreamingResponse
+    closes this iterator.
+    """
+    try:
+        async for record in iterate_in_threadpool(records):
+            yield dumps_bytes(record) + b"\n"
+    finally:
+        records.close()
@@ -0,0 +1,328 @@
+"""Helpers for splitting source code into analyzable chunks and merging results."""
+
+import ast
+import re
+from typing import Any, Dict, List, Optional, Tuple
+
+# Lines at column 0 that continue the previous top-level statement
+# rather than starting a new one.
+_CONTINUATION_PREFIXES = ("else", "elif", "except", "finally", "case", ")", "]", "}")
+
+_SEVERITY_RANK = {"none": 0, "low": 1, "medium": 2, "high": 3, "critical": 4}
+
+_LINE_NUMBER = re.compile(r"\d+")
+
+# Rough characters-per-token ratio used for prompt budgeting
+CHARS_PER_TOKEN = 4
+
+
+class CodeChunk:
+    """A contiguous slice of a source file."""
+
+    __slots__ = ("code", "start_line")
+
+    def __init__(self, code: str, start_line: int):
+        self.code = code
+        self.start_line = start_line  # 1-based line of the first line of code
+
+    @property
+    def line_offset(self) -> int:
+        """Number of lines preceding this chunk in the original source."""
+        return self.start_line - 1
+
+    def __repr__(self) -> str:
+        return f"CodeChunk(start_line={self.start_line}, lines={self.code.count(chr(10)) + 1})"
+
+
+class StreamingBlockSplitter:
+    """
+    Split Python source arriving in pieces into complete top-level blocks.
+
+    Text is fed as it is produced (e.g. line by line from Gemini CLI). Once a
+    new statement starts at column 0, everything before it is a finished
+    top-level region; it is emitted as a chunk when it parses on its own and
+    holds at least ``min_lines`` lines. Markdown fence lines are blanked out
+    so line numbers still match the generated output.
+    """
+
+    def __init__(self, min_lines: int = 20):
+        self.min_lines = min_lines
+        self._partial = ""
+        self._pending: List[str] = []
+        self._pending_start = 1
+        self._next_line = 1
+        self._started = False
+
+    def feed(self, text: str) -> List[CodeChunk]:
+        """Add generated text and return any chunks that are now complete."""
+        self._partial += text
+        *lines, self._partial = self._partial.split("\n")
+        chunks = []
+        for line in lines:
+            chunk = self._add_line(line)
+            if chunk is not None:
+                chunks.append(chunk)
+        return chunks
+
+    def flush(self) -> List[CodeChunk]:
+        """Return whatever is left once generation has finished."""
+        if self._partial:
+            self._add_line(self._partial)
+            self._partial = ""
+        chunk = self._emit(force=True)
+        return [chunk] if chunk is not None else []
+
+    def _add_line(self, line: str) -> Optional[CodeChunk]:
+        if not self._started:
+            if not line.strip():
+                # Leading blank lines are dropped by .strip() on the final code
+                return None
+            self._started = True
+
+        if line.lstrip().startswith("```"):
+            line = ""
+
+        chunk = None
+        if self._starts_top_level_statement(line) and len(self._pending) >= self.min_lines:
+            chunk = self._emit(force=False)
+
+        if not self._pending:
+            self._pending_start = self._next_line
+        self._pending.append(line)
+        self._next_line += 1
+        return chunk
+
+    @staticmethod
+    def _starts_top_level_statement(line: str) -> bool:
+        if not line or line[0].isspace() or line[0] == "#":
+            return False
+        return not line.startswith(_CONTINUATION_PREFIXES)
+
+    def _emit(self, force: bool) -> Optional[CodeChunk]:
+        # Decorators belong to the statement that follows them
+        split = len(self._pending)
+        while split > 0 and self._pending[split - 1].startswith("@"):
+            split -= 1
+
+        body = self._pending if force else self._pending[:split]
+        code = "\n".join(body)
+        if not code.strip():
+            return None
+
+        if not force:
+            try:
+                ast.parse(code)
+            except SyntaxError:
+                # e.g. an unterminated triple-quoted string; wait for more lines
+                return None
+
+        chunk = CodeChunk(code, self._pending_start)
+        self._pending = [] if force else self._pending[split:]
+        self._pending_start += len(body)
+        return chunk
+
+
+def estimate_tokens(text: str) -> int:
+    """Cheap token estimate for budgeting prompts (no tokenizer round trip)."""
+    return len(text) // CHARS_PER_TOKEN + 1
+
+
+def _node_span(node: ast.stmt) -> Tuple[int, int]:
+    """1-based (first, last) line of a statement, including decorators."""
+    decorators = getattr(node, "decorator_list", [])
+    start = min([node.lineno] + [d.lineno for d in decorators])
+    return start, node.end_lineno or node.lineno
+
+
+def _statement_units(body: List[ast.stmt], first_line: int, last_line: int) -> List[Tuple[int, int, ast.stmt]]:
+    """
+    Cover lines first_line..last_line with one span per statement.
+
+    Comments and blank lines between statements are attached to the statement
+    that follows them; trailing lines go to the last statement.
+    """
+    units = []
+    cursor = first_line
+    for index, node in enumerate(body):
+        _, end = _node_span(node)
+        if index == len(body) - 1:
+            end = last_line
+        units.append((cursor, end, node))
+        cursor = end + 1
+    return units
+
+
+def _split_lines(lines: List[str], first_line: int, max_tokens: int) -> List[Tuple[int, int]]:
+    """Fallback split of a line range into spans that fit the budget."""
+    spans = []
+    start = first_line
+    size = 0
+    for number in range(first_line, first_line + len(lines)):
+        line_tokens = estimate_tokens(lines[number - first_line])
+        if size and size + line_tokens > max_tokens:
+            spans.append((start, number - 1))
+            start, size = number, 0
+        size += line_tokens
+    spans.append((start, first_line + len(lines) - 1))
+    return spans
+
+
+def _split_unit(lines: List[str], start: int, end: int, node: Optional[ast.stmt],
+                max_tokens: int) -> List[Tuple[int, int]]:
+    """Split one oversized statement at its inner function/class boundaries."""
+    text = "\n".join(lines[start - 1:end])
+    if estimate_tokens(text) <= max_tokens:
+        return [(start, end)]
+
+    if isinstance(node, ast.ClassDef) and len(node.body) > 1:
+        # The class header stays with its first member, then one span per member
+        spans = []
+        for unit_start, unit_end, member in _statement_units(node.body, start, end):
+            spans.extend(_split_unit(lines, unit_start, unit_end, member, max_tokens))
+        return spans
+
+    return _split_lines(lines[start - 1:end], start, max_tokens)
+
+
+def split_source(code: str, max_tokens: int = 3000) -> List[CodeChunk]:
+    """
+    Split source code into chunks that each fit within a token budget.
+
+    Python code is split at top-level function/class boundaries (and at
+    method boundaries inside oversized classes) using ``ast``; adjacent small
+    statements are packed together. Code that does not parse as Python is
+    split on line boundaries.
+
+    Args:
+        code: Source code to split
+        max_tokens: Approximate token budget per chunk
+
+    Returns:
+        Chunks covering every line of the input, in order
+    """
+    lines = code.split("\n")
+    if estimate_tokens(code) <= max_tokens:
+        return [CodeChunk(code, 1)]
+
+    try:
+        tree = ast.parse(code)
+    except SyntaxError:
+        tree = None
+
+    if tree is None or not tree.body:
+        spans = _split_lines(lines, 1, max_tokens)
+    else:
+        spans = []
+        for start, end, node in _statement_units(tree.body, 1, len(lines)):
+            spans.extend(_split_unit(lines, start, end, node, max_tokens))
+
+    # Pack consecutive spans into chunks up to the budget
+    chunks = []
+    chunk_start, chunk_end, chunk_tokens = spans[0][0], spans[0][0] - 1, 0
+    for start, end in spans:
+        span_tokens = estimate_tokens("\n".join(lines[start - 1:end]))
+        if chunk_tokens and chunk_tokens + span_tokens > max_tokens:
+            chunks.append(CodeChunk("\n".join(lines[chunk_start - 1:chunk_end]), chunk_start))
+            chunk_start, chunk_tokens = start, 0
+        chunk_end = end
+        chunk_tokens += span_tokens
+    chunks.append(CodeChunk("\n".join(lines[chunk_start - 1:chunk_end]), chunk_start))
+    return chunks
+
+
+def remap_line(value: Any, offset: int) -> Any:
+    """Shift the line number(s) in an LLM-reported location by ``offset``."""
+    if offset == 0:
+        return value
+    if isinstance(value, bool):
+        return value
+    if isinstance(value, int):
+        return value + offset
+    if isinstance(value, str):
+        return _LINE_NUMBER.sub(lambda m: str(int(m.group()) + offset), value)
+    return value
+
+
+def _remap_findings(value: Any, offset: int) -> Any:
+    """Recursively remap every 'line' field in an analysis structure."""
+    if isinstance(value, dict):
+        return {
+            key: remap_line(item, offset) if key in ("line", "lines") else _remap_findings(item, offset)
+            for key, item in value.items()
+        }
+    if isinstance(value, list):
+        return [_remap_findings(item, offset) for item in value]
+    return value
+
+
+def _worse_score(current: Any, new: Any) -> Any:
+    """Keep the lower (worse) of two 1-10 style scores."""
+    try:
+        return new if float(new) < float(current) else current
+    except (TypeError, ValueError):
+        return current
+
+
+def _merge_into(merged: Dict[str, Any], analysis: Dict[str, Any]) -> None:
+    for key, value in analysis.items():
+        if key not in merged:
+            if isinstance(value, dict):
+                merged[key] = {}
+                _merge_into(merged[key], value)
+            elif isinstance(value, list):
+                merged[key] = list(value)
+            else:
+                merged[key] = value
+            continue
+
+        current = merged[key]
+        if isinstance(current, list) and isinstance(value, list):
+            current.extend(value)
+        elif isinstance(current, dict) and isinstance(value, dict):
+            _merge_into(current, value)
+        elif key == "severity":
+            if _SEVERITY_RANK.get(str(value).lower(), 0) > _SEVERITY_RANK.get(str(current).lower(), 0):
+                merged[key] = value
+        elif "score" in key:
+            merged[key] = _worse_score(current, value)
+        elif isinstance(current, str) and isinstance(value, str) and value and value not in current:
+            merged[key] = f"{current}\n{value}"
+
+
+def merge_analyses(results: List[Tuple[int, Dict[str, Any]]], analysis_type: str) -> Dict[str, Any]:
+    """
+    Merge per-chunk analyze_code_with_cli results into a single result.
+
+    Args:
+        results: (line_offset, result) pairs, one per analyzed chunk
+        analysis_type: Type of analysis that was run on every chunk
+
+    Returns:
+        Dict shaped like an analyze_code_with_cli result, with line numbers
+        remapped to the original source
+    """
+    merged: Dict[str, Any] = {}
+    errors = []
+
+    for offset, result in sorted(results, key=lambda item: item[0]):
+        if not result.get("success"):
+            errors.append(f"lines {offset + 1}+: {result.get('error')}")
+            continue
+        _merge_into(merged, _remap_findings(result.get("analysis", {}), offset))
+
+    if errors and not merged:
+        return {
+            "success": False,
+            "error": "; ".join(errors),
+            "analysis_type": analysis_type
+        }
+
+    response = {
+        "success": True,
+        "analysis": merged,
+        "analysis_type": analysis_type,
+        "chunks": len(results)
+    }
+    if errors:
+        response["partial_errors"] = errors
+    return response
@@ -0,0 +1,359 @@
+"""
+Tool registry and the middleware pipeline every tool call runs through.
+
+A call to ``ToolRegistry.execute`` passes through the registry's
+middleware layers in order before the tool implementation runs. The
+default chain in app.tools is cache -> single-flight -> rate limit ->
+retry -> timing -> backend. Each layer is a callable
+``layer(call, proceed) -> ToolResult`` that may answer the call itself or
+pass it on with ``proceed(call)``. Cross-cutting features (caching,
+coalescing, throttling, retries, tracing) therefore live in one place
+instead of in each tool.
+"""
+
+import logging
+import random
+import re
+import time
+from dataclasses import dataclass, field
+from enum import Enum
+from functools import partial
+from typing import Any, Callable, Dict, List, Optional, Sequence
+
+from app.utils.metrics import BACKEND_LATENCY, CACHE_HITS, RETRIES, TOOL_CALLS, TOOL_LATENCY
+from app.utils.singleflight import SingleFlight, make_cache_key
+
+logger = logging.getLogger(__name__)
+
+
+# The error taxonomy and RetryPolicy are kept identical to
+# my-gemini-agent/app/tools.py: both projects ship as their own top-level
+# `app` package, so neither can import the other.
+# tests/test_execution.py fails if the two copies drift apart.
+class ErrorKind(str, Enum):
+    """Classification of a failed call, used to decide whether to retry."""
+    TRANSIENT = "transient"              # Network blips, 5xx, unknown failures
+    QUOTA = "quota"                      # Rate limited / quota exhausted upstream
+    TIMEOUT = "timeout"                  # CLI did not finish in time
+    INVALID_REQUEST = "invalid_request"  # Bad or oversized prompt
+    AUTH = "auth"                        # Missing or rejected API key
+    NOT_INSTALLED = "not_installed"      # Gemini CLI binary not found
+    CIRCUIT_OPEN = "circuit_open"        # Backend marked down, call not attempted
+    DEADLINE = "deadline"                # Total retry deadline exhausted
+    RATE_LIMITED = "rate_limited"        # Refused by a local rate limit
+    NOT_FOUND = "not_found"              # No tool registered under that name
+
+
+# Checked in order against the error message; the first match wins
+_ERROR_PATTERNS = [
+    (ErrorKind.NOT_INSTALLED, re.compile(r"CLI not found", re.I)),
+    (ErrorKind.TIMEOUT, re.compile(r"timed out", re.I)),
+    (ErrorKind.QUOTA, re.compile(r"\b429\b|quota|rate.?limit|resource.?exhausted|too many requests", re.I)),
+    (ErrorKind.AUTH, re.compile(r"\b40[13]\b|api.?key|unauthori[sz]ed|unauthenticated|permission.?denied", re.I)),
+    (ErrorKind.INVALID_REQUEST, re.compile(
+        r"\b400\b|invalid.?argument|bad request|too long|token limit|context length|safety", re.I)),
+]
+
+
+def classify_error(error: Optional[str]) -> ErrorKind:
+    """
+    Classify a failure from its error message (e.g. the CLI's stderr).
+    
+    Returns:
+        The matching ErrorKind; unrecognised failures count as TRANSIENT
+    """
+    for kind, pattern in _ERROR_PATTERNS:
+        if pattern.search(error or ""):
+            return kind
+    return ErrorKind.TRANSIENT
+
+
+@dataclass
+class RetryPolicy:
+    """
+    When and how long to wait before retrying a failed call.
+    
+    Delays grow exponentially from ``base_delay`` and use "full jitter"
+    (a random delay between 0 and the exponential value) so that many
+    callers failing at once do not retry in lockstep. Quota errors back off
+    ``quota_multiplier`` times longer. No retry is scheduled that would
+    end after ``deadline`` seconds from the first attempt.
+    
+    Attributes:
+        max_retries: Retries after the first attempt
+        base_delay: Upper bound of the first backoff in seconds
+        max_delay: Cap on any single backoff in seconds
+        multiplier: Growth factor of the backoff per attempt
+        quota_multiplier: Extra backoff factor for quota errors
+        deadline: Total time budget for all attempts in seconds
+        retryable: Error kinds worth retrying
+    """
+    max_retries: int = 2
+    base_delay: float = 0.5
+    max_delay: float = 8.0
+    multiplier: float = 2.0
+    quota_multiplier: float = 4.0
+    deadline: float = 90.0
+    retryable: frozenset = field(default_factory=lambda: frozenset({
+        ErrorKind.TRANSIENT, ErrorKind.QUOTA, ErrorKind.TIMEOUT
+    }))
+    
+    def remaining(self, start_time: float) -> float:
+        """Seconds left before the deadline of a call started at start_time."""
+        return self.deadline - (time.monotonic() - start_time)
+    
+    def next_delay(self, attempt: int, kind: ErrorKind, start_time: float) -> Optional[float]:
+        """
+        Backoff before the next attempt, or None if the call should give up.
+        
+        Args:
+            attempt: Zero-based index of the attempt that just failed
+            kind: Classification of its failure
+            start_time: time.monotonic() when the first attempt started
+        """
+        if kind not in self.retryable or attempt >= self.max_retries:
+            return None
+        ceiling = self.base_delay * (self.multiplier ** attempt)
+        if kind == ErrorKind.QUOTA:
+            ceiling *= self.quota_multiplier
+        delay = random.uniform(0, min(self.max_delay, ceiling))
+        # Leave time for the next attempt to actually run
+        if delay >= self.remaining(start_time) - 1:
+            return None
+        return delay
+
+
+class ToolResult:
+    """
+    Outcome of one tool call.
+
+    ``data`` is the tool's own result dict (what the public tool functions
+    return); the other fields describe how the call was answered.
+    ``source`` is 'backend', 'cache' or 'singleflight'.
+    """
+
+    __slots__ = ("success", "data", "error", "execution_time", "tool_name", "metadata", "error_type", "source")
+
+    def __init__(self, success: bool, data: Dict[str, Any], error: Optional[str] = None,
+                 execution_time: float = 0.0, tool_name: str = "", metadata: Optional[Dict[str, Any]] = None,
+                 error_type: Optional[str] = None, source: str = "backend"):
+        self.success = success
+        self.data = data
+        self.error = error
+        self.execution_time = execution_time
+        self.tool_name = tool_name
+        self.metadata = metadata if metadata is not None else {}
+        self.error_type = error_type
+        self.source = source
+
+    @classmethod
+    def from_dict(cls, tool_name: str, data: Dict[str, Any], source: str = "backend") -> "ToolResult":
+        """Wrap a tool's result dict, classifying its error if it failed."""
+        success = bool(data.get("success"))
+        error = None if success else data.get("error")
+        error_type = None if success else data.get("error_type") or classify_error(error).value
+        return cls(success, data, error, tool_name=tool_name, error_type=error_type, source=source)
+
+    @classmethod
+    def failure(cls, tool_name: str, error: str, error_type: ErrorKind, **data: Any) -> "ToolResult":
+        """A failed result produced by the pipeline itself rather than the tool."""
+        payload = {"success": False, "error": error, "error_type": error_type.value, **data}
+        return cls(False, payload, error, tool_name=tool_name, error_type=error_type.value)
+
+    def copy(self, source: Optional[str] = None) -> "ToolResult":
+        """A copy with its own top-level data dict, for handing to another caller."""
+        return ToolResult(self.success, dict(self.data), self.error, self.execution_time, self.tool_name,
+                          dict(self.metadata), self.error_type, source or self.source)
+
+    def to_dict(self) -> Dict[str, Any]:
+        """All fields as a dictionary."""
+        return {name: getattr(self, name) for name in self.__slots__}
+
+    def __repr__(self) -> str:
+        return (f"ToolResult({self.tool_name!r}, success={self.success}, source={self.source!r}, "
+                f"error_type={self.error_type!r})")
+
+
+class ToolCall:
+    """A tool invocation travelling through the middleware chain."""
+
+    __slots__ = ("tool", "params", "labels", "_key")
+
+    def __init__(self, tool: str, params: Dict[str, Any]):
+        self.tool = tool
+        self.params = params
+        self.labels = {"tool": tool, "analysis_type": params.get("analysis_type", "none")}
+        self._key: Optional[str] = None
+
+    @property
+    def key(self) -> str:
+        """Stable key of the tool name and parameters (computed once)."""
+        if self._key is None:
+            self._key = make_cache_key(self.tool, **self.params)
+        return self._key
+
+
+Handler = Callable[[ToolCall], ToolResult]
+Middleware = Callable[..., ToolResult]
+
+
+class ResponseCache:
+    """
+    Serve repeated calls from a shared cache (an object with get/set).
+
+    Only successful, complete results computed by this caller are stored:
+    results with 'partial_errors' are worth retrying, and coalesced results
+    were already stored by the caller that computed them.
+    """
+
+    def __init__(self, cache: Optional[Any] = None):
+        self.cache = cache
+
+    def __call__(self, call: ToolCall, proceed: Handler) -> ToolResult:
+        cache = self.cache
+        if cache is None:
+            return proceed(call)
+        cached = cache.get(call.key)
+        if cached is not None:
+            CACHE_HITS.inc(source="cache", **call.labels)
+            return ToolResult.from_dict(call.tool, cached, source="cache")
+        result = proceed(call)
+        if result.success and result.source == "backend" and not result.data.get("partial_errors"):
+            cache.set(call.key, result.data)
+        return result
+
+
+class Coalesce:
+    """Let identical concurrent calls share one execution."""
+
+    def __init__(self, flight: Optional[SingleFlight] = None):
+        self.flight = flight or SingleFlight()
+
+    def __call__(self, call: ToolCall, proceed: Handler) -> ToolResult:
+        result, shared = self.flight.do(call.key, proceed, call)
+        if not shared:
+            return result
+        CACHE_HITS.inc(source="singleflight", **call.labels)
+        logger.info(f"Coalesced {call.tool} call with an in-flight request")
+        return result.copy(source="singleflight")
+
+
+class RateLimit:
+    """
+    Refuse calls beyond a rate limit instead of reaching the backend.
+
+    ``limiter`` has ``acquire(key) -> bool`` and ``retry_after() -> int``
+    (e.g. SharedRateLimiter); calls are bucketed by tool name.
+    """
+
+    def __init__(self, limiter: Optional[Any] = None):
+        self.limiter = limiter
+
+    def __call__(self, call: ToolCall, proceed: Handler) -> ToolResult:
+        limiter = self.limiter
+        if limiter is None or limiter.acquire(call.tool):
+            return proceed(call)
+        retry_after = limiter.retry_after()
+        logger.warning(f"Rate limit reached for {call.tool}, retry in {retry_after}s")
+        return ToolResult.failure(call.tool, f"Rate limit exceeded for {call.tool}", ErrorKind.RATE_LIMITED,
+                                  retry_after=retry_after)
+
+
+class Retry:
+    """
+    Retry failed calls whose error kind the RetryPolicy allows retrying.
+
+    Backoff, jitter and the total deadline come from the policy; the
+    default retries nothing.
+    """
+
+    def __init__(self, policy: Optional[RetryPolicy] = None, sleep: Callable[[float], None] = time.sleep):
+        self.policy = policy or RetryPolicy(max_retries=0)
+        self.sleep = sleep
+
+    def __call__(self, call: ToolCall, proceed: Handler) -> ToolResult:
+        policy = self.policy
+        start_time = time.monotonic()
+        attempt = 0
+        while True:
+            result = proceed(call)
+            delay = None if result.success else policy.next_delay(attempt, _error_kind(result), start_time)
+            if delay is None:
+                result.metadata["attempts"] = attempt + 1
+                return result
+            RETRIES.inc(**call.labels)
+            logger.info(f"Retrying {call.tool} after {result.error_type} error in {delay:.2f}s "
+                        f"({attempt + 1}/{policy.max_retries})")
+            self.sleep(delay)
+            attempt += 1
+
+
+def _error_kind(result: ToolResult) -> Optional[ErrorKind]:
+    """ErrorKind of a failed result, or None for an error_type set by a tool."""
+    try:
+        return ErrorKind(result.error_type)
+    except ValueError:
+        return None
+
+
+class Timing:
+    """Record how long the tool implementation itself ran."""
+
+    def __call__(self, call: ToolCall, proceed: Handler) -> ToolResult:
+        start_time = time.perf_counter()
+        result = proceed(call)
+        result.execution_time = time.perf_counter() - start_time
+        BACKEND_LATENCY.observe(result.execution_time, **call.labels)
+        return result
+
+
+class ToolRegistry:
+    """
+    Named tool implementations run through a shared middleware chain.
+
+    Implementations take keyword parameters and return a result dict with
+    a 'success' key. ``execute`` always returns a ToolResult; exceptions
+    raised by an implementation propagate to the caller.
+
+    Example:
+        registry = ToolRegistry([ResponseCache(cache), Coalesce(), Timing()])
+        registry.register("analyze_code", analyze)
+        result = registry.execute("analyze_code", code=code, analysis_type="security")
+    """
+
+    def __init__(self, middleware: Sequence[Middleware] = ()):
+        self.middleware: List[Middleware] = list(middleware)
+        self._tools: Dict[str, Callable[..., Dict[str, Any]]] = {}
+
+    def register(self, name: str, fn: Callable[..., Dict[str, Any]]) -> None:
+        self._tools[name] = fn
+
+    def names(self) -> List[str]:
+        return list(self._tools)
+
+    def __contains__(self, name: str) -> bool:
+        return name in self._tools
+
+    def execute(self, name: str, **params: Any) -> ToolResult:
+        """Run the named tool through every middleware layer."""
+        fn = self._tools.get(name)
+        if fn is None:
+            return ToolResult.failure(name, f"Tool {name} not found", ErrorKind.NOT_FOUND)
+
+        def backend(call: ToolCall) -> ToolResult:
+            return ToolResult.from_dict(call.tool, fn(**call.params))
+
+        handler: Handler = backend
+        for layer in reversed(self.middleware):
+            handler = partial(layer, proceed=handler)
+
+        call = ToolCall(name, params)
+        start_time = time.perf_counter()
+        try:
+            result = handler(call)
+        except Exception:
+            TOOL_CALLS.inc(status="error", **call.labels)
+            raise
+        TOOL_LATENCY.observe(time.perf_counter() - start_time, **call.labels)
+        TOOL_CALLS.inc(status="success" if result.success else "error", **call.labels)
+        return result
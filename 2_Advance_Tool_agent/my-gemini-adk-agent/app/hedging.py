@@ -0,0 +1,154 @@
+"""Hedged Gemini CLI execution across a primary and a fallback model."""
+
+import logging
+import subprocess
+import threading
+import time
+from collections import deque
+from concurrent.futures import FIRST_COMPLETED, Future, ThreadPoolExecutor, wait
+from typing import Any, Deque, Dict, Optional, Tuple
+
+from app.tools import GeminiCLIWrapper
+from app.utils.metrics import HEDGE_OUTCOMES
+
+logger = logging.getLogger(__name__)
+
+
+class LatencyTracker:
+    """Sliding window of successful call latencies per backend."""
+
+    def __init__(self, window: int = 200, min_samples: int = 20):
+        self.window = window
+        self.min_samples = min_samples
+        self._samples: Dict[str, Deque[float]] = {}
+        self._lock = threading.Lock()
+
+    def record(self, backend: str, seconds: float) -> None:
+        with self._lock:
+            samples = self._samples.get(backend)
+            if samples is None:
+                samples = self._samples[backend] = deque(maxlen=self.window)
+            samples.append(seconds)
+
+    def percentile(self, backend: str, pct: float) -> Optional[float]:
+        """Latency percentile for a backend, or None until min_samples are recorded."""
+        with self._lock:
+            samples = sorted(self._samples.get(backend, ()))
+        if len(samples) < self.min_samples:
+            return None
+        return samples[min(len(samples) - 1, int(len(samples) * pct / 100))]
+
+
+class _Attempt:
+    """One backend call that can be cancelled before or after its process starts."""
+
+    __slots__ = ("model", "started", "process", "cancelled", "_lock")
+
+    def __init__(self, model: str):
+        self.model = model
+        self.started = time.perf_counter()
+        self.process: Optional[subprocess.Popen] = None
+        self.cancelled = False
+        self._lock = threading.Lock()
+
+    def attach(self, process: subprocess.Popen) -> None:
+        with self._lock:
+            self.process = process
+            if self.cancelled:
+                process.kill()
+
+    def cancel(self) -> None:
+        with self._lock:
+            self.cancelled = True
+            if self.process is not None and self.process.poll() is None:
+                self.process.kill()
+
+
+class HedgedExecutor:
+    """
+    Runs a prompt on the primary model and, if it is slow, also on a fallback.
+
+    The fallback is started once the primary has been running longer than
+    its ``percentile`` latency (from recent successful calls), or
+    ``default_delay`` until enough samples exist; it is started immediately
+    if the primary fails. The first successful result wins and the other
+    CLI process is killed.
+
+    Only completed calls are recorded, so latencies of primaries killed after
+    losing a hedge are missing from the window; this biases the hedge delay
+    slightly low, which errs towards hedging.
+    """
+
+    def __init__(self, primary_model: str, fallback_model: str, percentile: float = 95,
+                 default_delay: float = 5.0, min_delay: float = 0.5, max_delay: float = 30.0,
+                 tracker: Optional[LatencyTracker] = None, max_workers: int = 32):
+        self.primary_model = primary_model
+        self.fallback_model = fallback_model
+        self.percentile = percentile
+        self.default_delay = default_delay
+        self.min_delay = min_delay
+        self.max_delay = max_delay
+        self.tracker = tracker or LatencyTracker()
+        self._pool = ThreadPoolExecutor(max_workers=max_workers, thread_name_prefix="hedge")
+
+    def hedge_delay(self) -> float:
+        """Seconds to wait for the primary before starting the fallback."""
+        observed = self.tracker.percentile(self.primary_model, self.percentile)
+        delay = self.default_delay if observed is None else observed
+        return min(self.max_delay, max(self.min_delay, delay))
+
+    def _start(self, model: str, prompt: str, timeout: int, tool: str) -> Tuple[_Attempt, Future]:
+        attempt = _Attempt(model)
+        wrapper = GeminiCLIWrapper(model=model)
+        future = self._pool.submit(wrapper.execute_cli_command, prompt, timeout, tool, attempt.attach)
+        return attempt, future
+
+    def _finish(self, attempt: _Attempt, result: Dict[str, Any]) -> None:
+        if result.get("success") and not attempt.cancelled:
+            self.tracker.record(attempt.model, time.perf_counter() - attempt.started)
+
+    def execute(self, prompt: str, timeout: int = 60, tool: str = "cli") -> Dict[str, Any]:
+        """
+        Execute a prompt with hedging.
+
+        Returns:
+            The winning result dict ('success', 'output', 'error') plus
+            'model' (the model that produced it, or whose failure is
+            returned) and 'hedged' (whether the
+            fallback was started)
+        """
+        primary, primary_future = self._start(self.primary_model, prompt, timeout, tool)
+        done, _ = wait([primary_future], timeout=self.hedge_delay())
+        if done:
+            result = primary_future.result()
+            self._finish(primary, result)
+            if result.get("success"):
+                HEDGE_OUTCOMES.inc(tool=tool, outcome="primary")
+                return dict(result, model=self.primary_model, hedged=False)
+            logger.info(f"Primary model {self.primary_model} failed, trying {self.fallback_model}")
+        else:
+            logger.info(f"Primary model {self.primary_model} slow, hedging with {self.fallback_model}")
+
+        fallback, fallback_future = self._start(self.fallback_model, prompt, timeout, tool)
+        attempts = {primary_future: primary, fallback_future: fallback}
+        if done:
+            pending, last_result, last_model = {fallback_future}, result, self.primary_model
+        else:
+            pending, last_result, last_model = {primary_future, fallback_future}, None, None
+
+        while pending:
+            finished, pending = wait(pending, return_when=FIRST_COMPLETED)
+            for future in finished:
+                attempt = attempts[future]
+                result = future.result()
+                self._finish(attempt, result)
+                if result.get("success"):
+                    for other in pending:
+                        attempts[other].cancel()
+                    outcome = "primary_after_hedge" if attempt is primary else "fallback"
+                    HEDGE_OUTCOMES.inc(tool=tool, outcome=outcome)
+                    return dict(result, model=attempt.model, hedged=True)
+                last_result, last_model = result, attempt.model
+
+        HEDGE_OUTCOMES.inc(tool=tool, outcome="failed")
+        return dict(last_result, model=last_model, hedged=True)
@@ -0,0 +1,197 @@
+"""Incremental re-analysis of files that are analyzed again after every edit."""
+
+import ast
+import hashlib
+import logging
+import threading
+import time
+from collections import OrderedDict
+from concurrent.futures import ThreadPoolExecutor
+from typing import Any, Callable, Dict, List, Optional, Tuple
+
+from app.chunking import merge_analyses
+
+logger = logging.getLogger(__name__)
+
+_DEFINITIONS = (ast.FunctionDef, ast.AsyncFunctionDef, ast.ClassDef)
+
+
+class Unit:
+    """A top-level function, class, or run of other module statements."""
+
+    __slots__ = ("name", "start_line", "code", "digest")
+
+    def __init__(self, name: str, start_line: int, code: str):
+        self.name = name
+        self.start_line = start_line  # 1-based line of the first line of code
+        self.code = code
+        self.digest = hashlib.sha256(code.encode("utf-8")).hexdigest()
+
+    def __repr__(self) -> str:
+        return f"Unit({self.name!r}, start_line={self.start_line})"
+
+
+def split_units(code: str) -> Optional[List[Unit]]:
+    """
+    Split Python source into top-level units.
+
+    Each function and class (with its decorators) is one unit; consecutive
+    other statements (imports, constants, module code) form one unit.
+    Comments before a statement belong to it. Leading and trailing blank
+    lines are left out, so they never make a unit look changed.
+
+    Returns:
+        The units in source order, or None if the code does not parse
+    """
+    try:
+        tree = ast.parse(code)
+    except (SyntaxError, ValueError):
+        return None
+    lines = code.split("\n")
+
+    spans: List[Tuple[int, int, str]] = []
+    cursor = 1
+    for node in tree.body:
+        start = min([node.lineno] + [d.lineno for d in getattr(node, "decorator_list", [])])
+        end = node.end_lineno or node.lineno
+        if isinstance(node, _DEFINITIONS):
+            spans.append((cursor, end, f"{'class' if isinstance(node, ast.ClassDef) else 'def'} {node.name}"))
+        elif spans and spans[-1][2] == "module":
+            spans[-1] = (spans[-1][0], end, "module")
+        else:
+            spans.append((cursor, end, "module"))
+        cursor = end + 1
+    if spans and cursor <= len(lines):
+        spans[-1] = (spans[-1][0], len(lines), spans[-1][2])
+
+    units = []
+    for start, end, name in spans:
+        while start < end and not lines[start - 1].strip():
+            start += 1
+        while end > start and not lines[end - 1].strip():
+            end -= 1
+        units.append(Unit(name, start, "\n".join(lines[start - 1:end])))
+    return units
+
+
+class _FileVersion:
+    """Per-unit results of the last analyzed version of one file."""
+
+    __slots__ = ("results", "last_active")
+
+    def __init__(self, results: Dict[str, Dict[str, Any]]):
+        self.results = results  # unit digest -> analysis result with unit-relative lines
+        self.last_active = time.monotonic()
+
+
+class IncrementalAnalyzer:
+    """
+    Re-analyze only the parts of a file that changed since its last analysis.
+
+    The last analyzed version of each (client, path, analysis type) is kept
+    as per-unit results (see split_units). On the next request, units whose
+    code is unchanged, even if they moved, reuse their findings. New or
+    edited units are analyzed concurrently, each on its own, and everything
+    is merged with line numbers mapped to the current file. The cost of a
+    re-analysis therefore follows the size of the edit. Code that does not
+    parse as Python is analyzed in full and not remembered.
+
+    At most ``max_files`` versions are kept, evicting the least recently
+    used, and versions idle for ``idle_ttl`` seconds are dropped.
+    """
+
+    def __init__(self, analyze: Callable[[str, str], Dict[str, Any]], max_files: int = 1000,
+                 idle_ttl: float = 3600, max_workers: int = 8):
+        """
+        Args:
+            analyze: Analysis function taking (code, analysis_type), e.g.
+                analyze_code_with_cli
+            max_files: File versions kept before the least recently used is evicted
+            idle_ttl: Seconds after which an unused file version is dropped
+            max_workers: Maximum concurrent analyses of changed units
+        """
+        self.analyze = analyze
+        self.max_files = max_files
+        self.idle_ttl = idle_ttl
+        self.max_workers = max_workers
+        self._files: "OrderedDict[Tuple[str, str, str], _FileVersion]" = OrderedDict()
+        self._lock = threading.Lock()
+
+    def analyze_file(self, client: str, path: str, code: str, analysis_type: str = "security") -> Dict[str, Any]:
+        """
+        Analyze a file, reusing results for units unchanged since the last call.
+
+        Returns:
+            Dict shaped like an analyze_code_with_cli result plus an
+            'incremental' report: units in the file and how many were
+            'reanalyzed' or 'reused'
+        """
+        key = (client, path, analysis_type)
+        units = split_units(code)
+        if not units:
+            self.forget(client, path)
+            result = dict(self.analyze(code, analysis_type))
+            result["incremental"] = {"units": 0, "reanalyzed": 0, "reused": 0, "full": True}
+            return result
+
+        previous = self._get(key)
+        known = previous.results if previous is not None else {}
+        changed = list({unit.digest: unit for unit in units if unit.digest not in known}.values())
+        if changed:
+            logger.info(f"Re-analyzing {len(changed)}/{len(units)} units of {path}")
+            with ThreadPoolExecutor(max_workers=min(self.max_workers, len(changed))) as pool:
+                futures = [(unit.digest, pool.submit(self.analyze, unit.code, analysis_type)) for unit in changed]
+                fresh = {digest: future.result() for digest, future in futures}
+        else:
+            fresh = {}
+
+        unit_results = {unit.digest: fresh.get(unit.digest) or known[unit.digest] for unit in units}
+        result = merge_analyses(
+            [(unit.start_line - 1, unit_results[unit.digest]) for unit in units], analysis_type
+        )
+        result.pop("chunks", None)
+        # Failed or partial unit results are analyzed again next time
+        self._put(key, {
+            digest: unit_result for digest, unit_result in unit_results.items()
+            if unit_result.get("success") and not unit_result.get("partial_errors")
+        })
+        result["incremental"] = {
+            "units": len(units),
+            "reanalyzed": sum(unit.digest in fresh for unit in units),
+            "reused": sum(unit.digest not in fresh for unit in units),
+            "full": False
+        }
+        return result
+
+    def _get(self, key: Tuple[str, str, str]) -> Optional[_FileVersion]:
+        with self._lock:
+            self._expire_idle()
+            version = self._files.get(key)
+            if version is not None:
+                self._files.move_to_end(key)
+            return version
+
+    def _put(self, key: Tuple[str, str, str], results: Dict[str, Dict[str, Any]]) -> None:
+        with self._lock:
+            self._files[key] = _FileVersion(results)
+            self._files.move_to_end(key)
+            while len(self._files) > self.max_files:
+                self._files.popitem(last=False)
+
+    def _expire_idle(self) -> None:
+        cutoff = time.monotonic() - self.idle_ttl
+        while self._files:
+            key, version = next(iter(self._files.items()))
+            if version.last_active >= cutoff:
+                break
+            del self._files[key]
+
+    def forget(self, client: str, path: str) -> None:
+        """Drop every remembered version of a file."""
+        with self._lock:
+            for key in [key for key in self._files if key[:2] == (client, path)]:
+                del self._files[key]
+
+    def __len__(self) -> int:
+        with self._lock:
+            return len(self._files)
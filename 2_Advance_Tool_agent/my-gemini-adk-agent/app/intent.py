@@ -0,0 +1,116 @@
+"""Single-pass intent classification for natural language agent requests."""
+
+import re
+from typing import Dict, Set
+
+# One alternative per feature; each is anchored on word boundaries so that,
+# e.g., "js" does not fire inside "adjust" or "all" inside "install".
+# "node" and "all" are also everyday words, so they only decide the
+# language or analysis type when nothing explicit is mentioned.
+_FEATURES = {
+    "generate": r"generat\w*|creat\w*|build\w*|write|writes|writing|mak(?:e|es|ing)|develop\w*",
+    "analyze": r"analy[sz]\w*|check\w*|review\w*|audit\w*|inspect\w*|scan\w*|find\s+vulnerabilit\w*",
+    "javascript": r"javascript|js|node\.?js",
+    "node": r"node",
+    "python": r"python\d?|py",
+    "go": (
+        r"golang"
+        r"|(?<=in )go|(?<=using )go|(?<=with )go"
+        r"|go(?=\s+(?:code|program|service|api|server|function|module|script|app|application|cli)\b)"
+    ),
+    "simple": r"simple|basic",
+    "complex": r"complex|advanced",
+    "performance": r"performance",
+    "style": r"style|best\s+practices?",
+    "security": r"secur\w*|vulnerab\w*|exploit\w*",
+    "comprehensive": r"comprehensive\w*|everything",
+    "all": r"all",
+}
+
+
+def _leading_letters(pattern: str) -> str:
+    """First letter of every top-level alternative in a feature pattern."""
+    letters = set()
+    depth = 0
+    alternative_start = True
+    index = 0
+    while index < len(pattern):
+        char = pattern[index]
+        if alternative_start and pattern.startswith("(?<=", index):
+            # A lookbehind does not consume input; the match starts after it
+            index = pattern.index(")", index) + 1
+            continue
+        if alternative_start:
+            letters.add(char)
+            alternative_start = False
+        if char == "(":
+            depth += 1
+        elif char == ")":
+            depth -= 1
+        elif char == "|" and depth == 0:
+            alternative_start = True
+        index += 1
+    return "".join(sorted(letters))
+
+
+_ALTERNATIVES = "|".join(f"(?P<{name}>{pattern})" for name, pattern in _FEATURES.items())
+_FIRST_LETTERS = "".join(sorted(set("".join(_leading_letters(p) for p in _FEATURES.values()))))
+
+# Matched against lowercased text. The word boundary and a first-letter
+# lookahead are factored out of the alternation so most positions are
+# rejected before any alternative is tried.
+INTENT_PATTERN = re.compile(rf"\b(?=[{_FIRST_LETTERS}])(?:{_ALTERNATIVES})\b")
+
+
+def extract_features(text: str) -> Set[str]:
+    """Return the names of every feature mentioned in the text (one regex pass)."""
+    return {match.lastgroup for match in INTENT_PATTERN.finditer(text.lower())}
+
+
+def classify(text: str) -> Dict[str, object]:
+    """
+    Classify a request into action flags, language, complexity and analysis type.
+
+    Explicit words win over incidental ones: a named language beats
+    "node", and a named analysis ("security", "performance", ...) beats
+    "all". Among explicit mentions the original keyword precedence holds:
+    javascript over go over python, simple over complex, and performance
+    over style over security over comprehensive.
+
+    Returns:
+        Dict with 'generate' and 'analyze' booleans plus 'language',
+        'complexity' and 'analysis_type' strings
+    """
+    features = extract_features(text)
+
+    language = "python"
+    if "javascript" in features:
+        language = "javascript"
+    elif "go" in features:
+        language = "go"
+    elif "node" in features and "python" not in features:
+        language = "javascript"
+
+    complexity = "medium"
+    if "simple" in features:
+        complexity = "simple"
+    elif "complex" in features:
+        complexity = "complex"
+
+    analysis_type = "security"
+    if "performance" in features:
+        analysis_type = "performance"
+    elif "style" in features:
+        analysis_type = "style"
+    elif "security" in features:
+        analysis_type = "security"
+    elif "comprehensive" in features or "all" in features:
+        analysis_type = "all"
+
+    return {
+        "generate": "generate" in features,
+        "analyze": "analyze" in features,
+        "language": language,
+        "complexity": complexity,
+        "analysis_type": analysis_type
+    }
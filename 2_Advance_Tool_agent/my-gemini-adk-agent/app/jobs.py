@@ -0,0 +1,272 @@
+"""Persistent job queue and worker pool for long-running agent requests."""
+
+import json
+import logging
+import sqlite3
+import threading
+import time
+import uuid
+from typing import Any, Callable, Dict, Iterable, Optional
+
+from app.utils.metrics import QUEUE_WAIT
+from app.utils.shared_store import SQLiteStore
+
+logger = logging.getLogger(__name__)
+
+# Lower value = served first
+PRIORITIES = {"interactive": 0, "normal": 1, "batch": 2}
+
+# Share of max_pending each priority class may fill, so a burst of batch
+# jobs cannot use up the capacity reserved for interactive ones.
+PRIORITY_CAPACITY = {"interactive": 1.0, "normal": 0.8, "batch": 0.5}
+
+_SCHEMA = """
+CREATE TABLE IF NOT EXISTS jobs (
+    id TEXT PRIMARY KEY,
+    request TEXT NOT NULL,
+    priority INTEGER NOT NULL,
+    status TEXT NOT NULL,
+    created_at REAL NOT NULL,
+    started_at REAL,
+    heartbeat_at REAL,
+    finished_at REAL,
+    attempts INTEGER NOT NULL DEFAULT 0,
+    result TEXT,
+    error TEXT
+);
+CREATE INDEX IF NOT EXISTS jobs_queued ON jobs (status, priority, created_at);
+"""
+
+
+class QueueFullError(Exception):
+    """Raised when a job cannot be accepted because its priority class is at capacity."""
+
+    def __init__(self, priority: str, pending: int, limit: int):
+        super().__init__(f"Job queue full for '{priority}' jobs ({pending}/{limit} pending)")
+        self.priority = priority
+        self.pending = pending
+        self.limit = limit
+
+
+class JobQueue(SQLiteStore):
+    """
+    SQLite-backed job queue that survives process restarts.
+
+    Jobs move through queued -> running -> succeeded/failed. The worker
+    running a job renews its lease (see ``renew``); a job whose lease has
+    not been renewed for ``lease_seconds`` (e.g. because the process died)
+    is put back in the queue, or failed once it has been claimed
+    ``max_attempts`` times. Several server processes may share one queue
+    file; claims are atomic, so each job runs in exactly one of them.
+    """
+
+    schema = _SCHEMA
+
+    def __init__(self, path: str = "jobs.db", max_pending: int = 100,
+                 lease_seconds: float = 300, retention_seconds: float = 86400,
+                 max_attempts: int = 3):
+        self.max_pending = max_pending
+        self.lease_seconds = lease_seconds
+        self.retention_seconds = retention_seconds
+        self.max_attempts = max_attempts
+        super().__init__(path)
+        with self._connect() as conn:
+            columns = {row["name"] for row in conn.execute("PRAGMA table_info(jobs)")}
+            if "heartbeat_at" not in columns:
+                # Queue files created before lease renewal
+                conn.execute("ALTER TABLE jobs ADD COLUMN heartbeat_at REAL")
+
+    @staticmethod
+    def _to_dict(row: sqlite3.Row) -> Dict[str, Any]:
+        job = dict(row)
+        job.pop("heartbeat_at", None)
+        job["request"] = json.loads(job["request"])
+        job["result"] = json.loads(job["result"]) if job["result"] else None
+        job["priority"] = next(name for name, value in PRIORITIES.items() if value == job["priority"])
+        return job
+
+    def enqueue(self, request: Dict[str, Any], priority: str = "normal") -> Dict[str, Any]:
+        """
+        Add a job to the queue.
+
+        Raises:
+            ValueError: If the priority class is unknown
+            QueueFullError: If the priority class has reached its pending limit
+        """
+        if priority not in PRIORITIES:
+            raise ValueError(f"Unknown priority '{priority}'. Use one of: {', '.join(PRIORITIES)}")
+
+        limit = max(1, int(self.max_pending * PRIORITY_CAPACITY[priority]))
+        job_id = uuid.uuid4().hex
+        with self._transaction() as conn:
+            pending = conn.execute(
+                "SELECT COUNT(*) FROM jobs WHERE status = 'queued'"
+            ).fetchone()[0]
+            if pending >= limit:
+                raise QueueFullError(priority, pending, limit)
+            conn.execute(
+                "INSERT INTO jobs (id, request, priority, status, created_at) VALUES (?, ?, ?, 'queued', ?)",
+                (job_id, json.dumps(request), PRIORITIES[priority], time.time())
+            )
+        return self.get(job_id)
+
+    def claim(self) -> Optional[Dict[str, Any]]:
+        """Atomically take the highest-priority, oldest queued job."""
+        now = time.time()
+        expired = "status = 'running' AND COALESCE(heartbeat_at, started_at) < ?"
+        with self._transaction() as conn:
+            # Requeue jobs whose worker disappeared, unless they have used up their attempts
+            conn.execute(
+                f"UPDATE jobs SET status = 'failed', error = ?, finished_at = ? WHERE {expired} AND attempts >= ?",
+                (f"Job abandoned after {self.max_attempts} attempts", now, now - self.lease_seconds,
+                 self.max_attempts)
+            )
+            conn.execute(
+                f"UPDATE jobs SET status = 'queued', started_at = NULL, heartbeat_at = NULL WHERE {expired}",
+                (now - self.lease_seconds,)
+            )
+            row = conn.execute(
+                "SELECT * FROM jobs WHERE status = 'queued' ORDER BY priority, created_at LIMIT 1"
+            ).fetchone()
+            if row is None:
+                return None
+            conn.execute(
+                "UPDATE jobs SET status = 'running', started_at = ?, heartbeat_at = ?, attempts = attempts + 1 "
+                "WHERE id = ?",
+                (now, now, row["id"])
+            )
+        job = self._to_dict(row)
+        job.update(status="running", started_at=now, attempts=job["attempts"] + 1)
+        return job
+
+    def renew(self, job_ids: Iterable[str]) -> None:
+        """Extend the lease of running jobs so they are not handed to another worker."""
+        job_ids = list(job_ids)
+        if not job_ids:
+            return
+        with self._connect() as conn:
+            conn.execute(
+                f"UPDATE jobs SET heartbeat_at = ? WHERE status = 'running' "
+                f"AND id IN ({', '.join('?' * len(job_ids))})",
+                (time.time(), *job_ids)
+            )
+
+    def complete(self, job_id: str, result: Dict[str, Any]) -> None:
+        """Store a job's result and mark it finished."""
+        status = "succeeded" if result.get("success") else "failed"
+        with self._connect() as conn:
+            conn.execute(
+                "UPDATE jobs SET status = ?, result = ?, error = ?, finished_at = ? WHERE id = ?",
+                (status, json.dumps(result), result.get("error"), time.time(), job_id)
+            )
+
+    def fail(self, job_id: str, error: str) -> None:
+        """Mark a job as failed without a result."""
+        with self._connect() as conn:
+            conn.execute(
+                "UPDATE jobs SET status = 'failed', error = ?, finished_at = ? WHERE id = ?",
+                (error, time.time(), job_id)
+            )
+
+    def get(self, job_id: str) -> Optional[Dict[str, Any]]:
+        """Look up a job by id."""
+        with self._connect() as conn:
+            row = conn.execute("SELECT * FROM jobs WHERE id = ?", (job_id,)).fetchone()
+        return self._to_dict(row) if row else None
+
+    def purge(self) -> int:
+        """Delete finished jobs older than the retention period."""
+        with self._connect() as conn:
+            cursor = conn.execute(
+                "DELETE FROM jobs WHERE status IN ('succeeded', 'failed') AND finished_at < ?",
+                (time.time() - self.retention_seconds,)
+            )
+        return cursor.rowcount
+
+    def stats(self) -> Dict[str, int]:
+        """Count jobs by status."""
+        with self._connect() as conn:
+            rows = conn.execute("SELECT status, COUNT(*) FROM jobs GROUP BY status").fetchall()
+        return {status: count for status, count in rows}
+
+
+class JobWorkerPool:
+    """
+    Background threads that execute queued jobs with a handler function.
+
+    A heartbeat thread renews the lease of every running job a third of
+    the way through the lease period, so jobs may run longer than the lease.
+    """
+
+    def __init__(self, queue: JobQueue, handler: Callable[[Dict[str, Any]], Dict[str, Any]],
+                 workers: int = 2, poll_interval: float = 1.0):
+        self.queue = queue
+        self.handler = handler
+        self.workers = workers
+        self.poll_interval = poll_interval
+        self._wakeup = threading.Event()
+        self._stopping = threading.Event()
+        self._threads = []
+        self._last_purge = 0.0
+        self._running = set()
+        self._running_lock = threading.Lock()
+
+    def start(self) -> None:
+        for index in range(self.workers):
+            thread = threading.Thread(target=self._run, name=f"job-worker-{index}", daemon=True)
+            thread.start()
+            self._threads.append(thread)
+        heartbeat = threading.Thread(target=self._heartbeat, name="job-heartbeat", daemon=True)
+        heartbeat.start()
+        self._threads.append(heartbeat)
+        logger.info(f"Started {self.workers} job workers ({self.queue.path})")
+
+    def stop(self, timeout: float = 5.0) -> None:
+        self._stopping.set()
+        self._wakeup.set()
+        for thread in self._threads:
+            thread.join(timeout=timeout)
+        self._threads = []
+
+    def notify(self) -> None:
+        """Wake idle workers after a job has been enqueued."""
+        self._wakeup.set()
+
+    def _run(self) -> None:
+        while not self._stopping.is_set():
+            job = self.queue.claim()
+            if job is None:
+                self._maybe_purge()
+                self._wakeup.wait(self.poll_interval)
+                self._wakeup.clear()
+                continue
+
+            QUEUE_WAIT.observe(job["started_at"] - job["created_at"], tool="job", analysis_type="none")
+            logger.info(f"Running job {job['id']} ({job['priority']}, attempt {job['attempts']})")
+            with self._running_lock:
+                self._running.add(job["id"])
+            try:
+                self.queue.complete(job["id"], self.handler(job["request"]))
+            except Exception as e:
+                logger.error(f"Job {job['id']} failed: {str(e)}")
+                self.queue.fail(job["id"], str(e))
+            finally:
+                with self._running_lock:
+                    self._running.discard(job["id"])
+
+    def _heartbeat(self) -> None:
+        while not self._stopping.wait(self.queue.lease_seconds / 3):
+            with self._running_lock:
+                running = list(self._running)
+            try:
+                self.queue.renew(running)
+            except sqlite3.Error as e:
+                logger.error(f"Failed to renew job leases: {str(e)}")
+
+    def _maybe_purge(self) -> None:
+        if time.time() - self._last_purge < 60:
+            return
+        self._last_purge = time.time()
+        removed = self.queue.purge()
+        if removed:
+            logger.info(f"Purged {removed} finished jobs")
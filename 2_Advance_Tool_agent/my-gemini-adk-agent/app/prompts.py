@@ -0,0 +1,398 @@
+"""Versioned, precompiled prompt templates for the Gemini CLI tools."""
+
+import hashlib
+import os
+from string import Formatter
+from typing import Dict, List, Optional, Tuple
+
+from app.chunking import estimate_tokens
+
+VARIANTS = ("full", "compact")
+
+# "compact" keeps every checklist item and the exact JSON schema of "full"
+# but drops repeated boilerplate; tests/fixtures/prompt_golden.json pins both.
+DEFAULT_VARIANT = os.getenv("AGENT_PROMPT_VARIANT", "compact")
+
+
+class PromptTemplate:
+    """
+    A prompt parsed once into literal text and named fields.
+
+    Uses str.format syntax (``{field}``, with ``{{``/``}}`` for literal
+    braces) but renders by joining the pre-split parts, so the template text
+    is not re-parsed on every call.
+    """
+
+    __slots__ = ("name", "variant", "version", "text", "fields", "static_tokens", "fingerprint", "_parts")
+
+    def __init__(self, name: str, variant: str, version: int, text: str):
+        self.name = name
+        self.variant = variant
+        self.version = version
+        self.text = text
+        parts: List[Tuple[bool, str]] = []
+        literals = []
+        for literal, field, spec, conversion in Formatter().parse(text):
+            if literal:
+                parts.append((False, literal))
+                literals.append(literal)
+            if field is not None:
+                if not field.isidentifier() or spec or conversion:
+                    raise ValueError(f"Prompt {name}/{variant}: unsupported field '{{{field}}}'")
+                parts.append((True, field))
+        self._parts = tuple(parts)
+        self.fields = frozenset(value for is_field, value in parts if is_field)
+        # Instruction tokens paid on every call, before any user input
+        self.static_tokens = estimate_tokens("".join(literals))
+        self.fingerprint = hashlib.sha256(text.encode("utf-8")).hexdigest()
+
+    def render(self, **values: str) -> str:
+        missing = self.fields - values.keys()
+        if missing:
+            raise KeyError(f"Prompt {self.name}/{self.variant} needs: {', '.join(sorted(missing))}")
+        return "".join(values[value] if is_field else value for is_field, value in self._parts)
+
+
+_REGISTRY: Dict[Tuple[str, str], PromptTemplate] = {}
+
+
+def register(name: str, version: int, full: str, compact: str) -> None:
+    """Register both variants of a prompt. Bump ``version`` whenever either text changes."""
+    _REGISTRY[(name, "full")] = PromptTemplate(name, "full", version, full)
+    _REGISTRY[(name, "compact")] = PromptTemplate(name, "compact", version, compact)
+
+
+def get_template(name: str, variant: Optional[str] = None) -> PromptTemplate:
+    variant = variant or DEFAULT_VARIANT
+    if variant not in VARIANTS:
+        raise ValueError(f"Unknown prompt variant '{variant}'. Use one of: {', '.join(VARIANTS)}")
+    return _REGISTRY[(name, variant)]
+
+
+def render(name: str, variant: Optional[str] = None, **values: str) -> str:
+    """Render a registered prompt with the given field values."""
+    return get_template(name, variant).render(**values)
+
+
+def templates() -> List[PromptTemplate]:
+    return list(_REGISTRY.values())
+
+
+def footprint() -> Dict[str, Dict[str, Dict[str, int]]]:
+    """Version and static token cost of every registered prompt, by name and variant."""
+    report: Dict[str, Dict[str, Dict[str, int]]] = {}
+    for template in _REGISTRY.values():
+        report.setdefault(template.name, {})[template.variant] = {
+            "version": template.version,
+            "static_tokens": template.static_tokens
+        }
+    return report
+
+
+register(
+    "generate.python_api", version=1,
+    full="""Generate a complete Python REST API using FastAPI for the following requirement:
+
+{task}
+
+Requirements:
+- Use FastAPI framework
+- Include proper error handling
+- Add input validation with Pydantic models
+- Include authentication if mentioned
+- Add docstrings and comments
+- Make it production-ready
+
+Provide only the complete, runnable code without explanations.""",
+    compact="""Write a complete, production-ready FastAPI REST API for:
+
+{task}
+
+Use Pydantic validation, error handling, docstrings/comments, and authentication if mentioned.
+Output only runnable code.""",
+)
+
+register(
+    "generate.javascript_api", version=1,
+    full="""Generate a complete Node.js REST API using Express for the following requirement:
+
+{task}
+
+Requirements:
+- Use Express framework
+- Include proper error handling
+- Add input validation
+- Include authentication if mentioned
+- Add comments
+- Make it production-ready
+
+Provide only the complete, runnable code without explanations.""",
+    compact="""Write a complete, production-ready Node.js Express REST API for:
+
+{task}
+
+Use input validation, error handling, comments, and authentication if mentioned.
+Output only runnable code.""",
+)
+
+register(
+    "generate.code", version=1,
+    full="""Generate {complexity} {language} code for the following task:
+
+{task}
+
+Requirements:
+- Write clean, well-documented code
+- Include error handling
+- Add comments explaining key logic
+- Follow best practices for {language}
+- Make it production-ready
+
+Provide only the complete, runnable code without explanations.""",
+    compact="""Write {complexity}, production-ready {language} code for:
+
+{task}
+
+Clean and documented, with error handling, comments on key logic, and {language} best practices.
+Output only runnable code.""",
+)
+
+register(
+    "generate.continue", version=1,
+    full="""The following {language} code for this task was cut off before it was finished:
+
+Task: {task}
+
+These are the last lines that were generated:
+```
+{tail}
+```
+
+Continue the code from the line right after the last line shown.
+Do not repeat any of the lines above and do not restart the program. Keep the
+same indentation and style, and finish every open function, class and block.
+
+Return ONLY the remaining code, no explanations or markdown.""",
+    compact="""Continue this cut-off {language} code (task: {task}) from the line after the last one shown. Do not repeat lines; finish all open blocks.
+
+```
+{tail}
+```
+
+Return ONLY the remaining code, no explanations or markdown.""",
+)
+
+register(
+    "generate.repair", version=1,
+    full="""This block of generated {language} code does not parse:
+
+```
+{block}
+```
+
+Error: {error}
+
+Fix the error while keeping the code's behaviour, names and indentation.
+Change as little as possible.
+
+Return ONLY the corrected block, no explanations or markdown.""",
+    compact="""Fix this {language} block so it parses (error: {error}). Change as little as possible; keep names and indentation.
+
+```
+{block}
+```
+
+Return ONLY the corrected block, no explanations or markdown.""",
+)
+
+register(
+    "analyze.security", version=1,
+    full="""Analyze this code for security vulnerabilities:
+
+```
+{code}
+```
+
+Look for:
+- Use of dangerous functions (exec, eval, etc.)
+- SQL injection vulnerabilities
+- Command injection risks
+- Insecure deserialization
+- Hardcoded credentials
+- Path traversal issues
+- XSS vulnerabilities
+
+Return your findings as JSON with this structure:
+{{
+  "severity": "high|medium|low",
+  "vulnerabilities": [
+    {{
+      "type": "vulnerability type",
+      "line": "line number or range",
+      "description": "detailed description",
+      "recommendation": "how to fix"
+    }}
+  ],
+  "summary": "overall security assessment"
+}}""",
+    compact="""Find security vulnerabilities: dangerous functions (exec, eval), SQL injection, command injection, insecure deserialization, hardcoded credentials, path traversal, XSS.
+
+```
+{code}
+```
+
+Reply with JSON only:
+{{"severity": "high|medium|low", "vulnerabilities": [{{"type": "", "line": "line or range", "description": "", "recommendation": "how to fix"}}], "summary": ""}}""",
+)
+
+register(
+    "analyze.security_followup", version=3,
+    full="""Analyze this code for security vulnerabilities:
+
+```
+{code}
+```
+
+A local static analysis pass already reported these findings (blank lines
+are docstrings and literal constants it settled and omitted):
+{findings}
+
+Do not repeat the findings above. Review the code for anything they miss,
+such as:
+- SQL injection vulnerabilities
+- Command injection risks
+- Insecure deserialization
+- Path traversal issues
+- XSS vulnerabilities
+- Weak cryptography or predictable randomness for secrets
+- Hardcoded credentials and broken authentication (e.g. unverified tokens)
+- Insecure configuration (debug mode, binding to all interfaces)
+- Unsafe handling of untrusted input
+
+Return your additional findings as JSON with this structure:
+{{
+  "severity": "high|medium|low",
+  "vulnerabilities": [
+    {{
+      "type": "vulnerability type",
+      "line": "line number or range",
+      "description": "detailed description",
+      "recommendation": "how to fix"
+    }}
+  ],
+  "summary": "overall security assessment"
+}}""",
+    compact="""Find security vulnerabilities not in the known findings: SQL injection, command injection, insecure deserialization, path traversal, XSS, weak crypto or randomness, hardcoded credentials, unverified tokens, insecure configuration (debug mode), unsafe handling of untrusted input. Blank lines were settled locally.
+
+Known findings (do not repeat):
+{findings}
+
+```
+{code}
+```
+
+Reply with JSON only:
+{{"severity": "high|medium|low", "vulnerabilities": [{{"type": "", "line": "line or range", "description": "", "recommendation": "how to fix"}}], "summary": ""}}""",
+)
+
+register(
+    "analyze.performance", version=1,
+    full="""Analyze this code for performance issues:
+
+```
+{code}
+```
+
+Look for:
+- Inefficient algorithms
+- Memory leaks
+- Unnecessary loops
+- Database query optimization
+- Caching opportunities
+- Resource management
+
+Return your findings as JSON with this structure:
+{{
+  "performance_score": "1-10",
+  "issues": [
+    {{
+      "type": "issue type",
+      "line": "line number or range",
+      "description": "detailed description",
+      "recommendation": "how to optimize"
+    }}
+  ],
+  "summary": "overall performance assessment"
+}}""",
+    compact="""Find performance issues: inefficient algorithms, memory leaks, unnecessary loops, database query optimization, caching opportunities, resource management.
+
+```
+{code}
+```
+
+Reply with JSON only:
+{{"performance_score": "1-10", "issues": [{{"type": "", "line": "line or range", "description": "", "recommendation": "how to optimize"}}], "summary": ""}}""",
+)
+
+register(
+    "analyze.style", version=1,
+    full="""Analyze this code for style and best practices:
+
+```
+{code}
+```
+
+Look for:
+- Code formatting issues
+- Naming conventions
+- Documentation quality
+- Code organization
+- Best practice violations
+
+Return your findings as JSON with this structure:
+{{
+  "style_score": "1-10",
+  "issues": [
+    {{
+      "type": "issue type",
+      "line": "line number or range",
+      "description": "detailed description",
+      "recommendation": "how to improve"
+    }}
+  ],
+  "summary": "overall style assessment"
+}}""",
+    compact="""Find style issues: formatting, naming conventions, documentation quality, code organization, best practice violations.
+
+```
+{code}
+```
+
+Reply with JSON only:
+{{"style_score": "1-10", "issues": [{{"type": "", "line": "line or range", "description": "", "recommendation": "how to improve"}}], "summary": ""}}""",
+)
+
+register(
+    "analyze.all", version=1,
+    full="""Perform a comprehensive code analysis covering security, performance, and style:
+
+```
+{code}
+```
+
+Return your findings as JSON with this structure:
+{{
+  "security": {{"severity": "...", "issues": [...]}},
+  "performance": {{"score": "...", "issues": [...]}},
+  "style": {{"score": "...", "issues": [...]}},
+  "overall_summary": "comprehensive assessment"
+}}""",
+    compact="""Analyze this code for security, performance and style.
+
+```
+{code}
+```
+
+Reply with JSON only:
+{{"security": {{"severity": "", "issues": []}}, "performance": {{"score": "", "issues": []}}, "style": {{"score": "", "issues": []}}, "overall_summary": ""}}""",
+)
@@ -0,0 +1,68 @@
+"""Fast JSON encoding, streaming and lean response shaping for the API."""
+
+import json
+from typing import Any, Dict
+
+from fastapi.responses import JSONResponse, StreamingResponse
+from starlette.types import Receive, Scope, Send
+
+try:
+    import orjson
+except ImportError:  # Optional: pip install "advanced-tool-agent[fast]"
+    orjson = None
+
+# Keys that only repeat data already present elsewhere in a result
+LEAN_DROP_KEYS = frozenset({"raw_output", "formatted_response"})
+
+
+def dumps_bytes(content: Any) -> bytes:
+    """
+    Serialize to compact, single-line UTF-8 JSON, using orjson when it is installed.
+
+    The one JSON encoder for API output: response bodies, NDJSON and SSE lines.
+    """
+    if orjson is not None:
+        return orjson.dumps(content, option=orjson.OPT_NON_STR_KEYS)
+    return json.dumps(content, ensure_ascii=False, separators=(",", ":")).encode("utf-8")
+
+
+class FastJSONResponse(JSONResponse):
+    """
+    JSONResponse that encodes with orjson (or compact json as a fallback).
+
+    Endpoints return it directly with plain result dicts so FastAPI skips its
+    jsonable_encoder pass, which would otherwise walk and copy every string.
+    """
+
+    def render(self, content: Any) -> bytes:
+        return dumps_bytes(content)
+
+
+class ClosingStreamingResponse(StreamingResponse):
+    """
+    StreamingResponse that closes its body iterator however streaming ends.
+
+    A client disconnect otherwise leaves an async generator body suspended
+    until it is garbage-collected, so its ``finally`` (e.g. cancelling
+    queued work) runs late or not at all.
+    """
+
+    async def __call__(self, scope: Scope, receive: Receive, send: Send) -> None:
+        try:
+            await super().__call__(scope, receive, send)
+        finally:
+            await self.body_iterator.aclose()
+
+
+def lean_result(result: Dict[str, Any]) -> Dict[str, Any]:
+    """
+    Copy of a result without redundant keys (see LEAN_DROP_KEYS), at any depth.
+
+    Only the dicts on the path are copied; strings and lists are shared with
+    the original, which is left untouched (it may be a cached result).
+    """
+    return {
+        key: lean_result(value) if isinstance(value, dict) else value
+        for key, value in result.items()
+        if key not in LEAN_DROP_KEYS
+    }
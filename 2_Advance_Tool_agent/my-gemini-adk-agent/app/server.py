@@ -1,21 +1,240 @@
 """FastAPI server for the Advanced Tool Agent."""
 
-from fastapi import FastAPI, HTTPException
+from contextlib import asynccontextmanager
+from fastapi import FastAPI, HTTPException, Request
+from fastapi.concurrency import iterate_in_threadpool, run_in_threadpool
+from fastapi.responses import JSONResponse, PlainTextResponse, StreamingResponse
 from pydantic import BaseModel
-from typing import Optional
+from typing import Any, Callable, Dict, List, Optional
+import asyncio
+import base64
+import binascii
 import logging
-from app.agent import AdvancedToolAgent
+import os
+import threading
+import time
+from app.jobs import JobQueue, JobWorkerPool, QueueFullError
+from app.responses import ClosingStreamingResponse, FastJSONResponse, dumps_bytes, lean_result
+from app.sessions import SessionStore
+from app.tenancy import (
+    FairScheduler, TenantBusyError, TenantGate, TenantRegistry, TokenQuota, current_tenant, scoped_session
+)
+from app.utils.metrics import EVENT_LOOP_LAG, QUEUE_WAIT, REGISTRY
+from app.utils.shared_store import SharedCache, SharedRateLimiter, state_path
 
 logging.basicConfig(level=logging.INFO)
 logger = logging.getLogger(__name__)
 
+# The agent, the tools module and its cache and hedging are set up on first
+# use rather than at import, so a cold worker answers /health as soon as
+# FastAPI itself is loaded. AGENT_WARMUP starts that setup in a background
+# thread right after startup instead of on the first tool request.
+_init_lock = threading.Lock()
+_tools = None
+_agent = None
+_incremental = None
+
+
+def get_tools():
+    """The app.tools module, with the response cache and hedging configured."""
+    global _tools
+    if _tools is None:
+        with _init_lock:
+            if _tools is None:
+                from app import tools
+                # Cache, rate limiter and job queue live in SQLite files under
+                # AGENT_STATE_DIR so that every worker process of a multi-worker
+                # server sees the same state. The response cache is opt-in:
+                # it also replays generated code, which is not deterministic.
+                cache_ttl = float(os.getenv("AGENT_CACHE_TTL", "0"))
+                if cache_ttl > 0:
+                    tools.configure_response_cache(SharedCache(state_path("cache.db"), ttl=cache_ttl))
+                tool_rate_limit = float(os.getenv("AGENT_TOOL_RATE_LIMIT", "0"))
+                if tool_rate_limit > 0:
+                    tools.configure_rate_limit(SharedRateLimiter(state_path("tool_ratelimit.db"), tool_rate_limit))
+                if os.getenv("AGENT_HEDGE_MODEL"):
+                    from app.hedging import HedgedExecutor
+                    tools.configure_hedging(HedgedExecutor(
+                        primary_model=tools.MODEL,
+                        fallback_model=os.environ["AGENT_HEDGE_MODEL"],
+                        percentile=float(os.getenv("AGENT_HEDGE_PERCENTILE", "95")),
+                        default_delay=float(os.getenv("AGENT_HEDGE_DELAY", "5"))
+                    ))
+                _tools = tools
+    return _tools
+
+
+def get_agent():
+    """The shared AdvancedToolAgent, created on first use."""
+    global _agent
+    if _agent is None:
+        get_tools()
+        with _init_lock:
+            if _agent is None:
+                from app.agent import AdvancedToolAgent
+                _agent = AdvancedToolAgent(
+                    pipelined=os.getenv("AGENT_PIPELINED", "false").lower() == "true",
+                    sessions=SessionStore(
+                        max_sessions=int(os.getenv("AGENT_MAX_SESSIONS", "1000")),
+                        idle_ttl=float(os.getenv("AGENT_SESSION_TTL", "3600"))
+                    )
+                )
+    return _agent
+
+
+def _tool(name: str) -> Callable[..., Dict[str, Any]]:
+    """Call app.tools.<name>, initializing the backend on the first call."""
+    def call(*args: Any, **kwargs: Any) -> Dict[str, Any]:
+        return getattr(get_tools(), name)(*args, **kwargs)
+    return call
+
+
+def get_incremental():
+    """The IncrementalAnalyzer behind /analyze requests that name a path."""
+    global _incremental
+    if _incremental is None:
+        with _init_lock:
+            if _incremental is None:
+                from app.incremental import IncrementalAnalyzer
+                _incremental = IncrementalAnalyzer(
+                    _tool("analyze_code_with_cli"),
+                    max_files=int(os.getenv("AGENT_INCREMENTAL_MAX_FILES", "1000")),
+                    idle_ttl=float(os.getenv("AGENT_SESSION_TTL", "3600"))
+                )
+    return _incremental
+
+
+def _process_request(*args: Any, **kwargs: Any) -> Dict[str, Any]:
+    return get_agent().process_request(*args, **kwargs)
+
+
+_rate_limit = float(os.getenv("AGENT_RATE_LIMIT", "0"))
+rate_limiter = SharedRateLimiter(state_path("ratelimit.db"), _rate_limit) if _rate_limit > 0 else None
+
+# API-key tenants (AGENT_TENANTS). When configured, every tool call goes
+# through a weighted fair queue with per-tenant concurrency caps, and usage
+# is charged against per-tenant token quotas.
+tenants = TenantRegistry.from_env()
+gate = TenantGate(
+    tenants,
+    FairScheduler(capacity=int(os.getenv("AGENT_TOOL_CONCURRENCY", "16"))),
+    TokenQuota(state_path("quota.db"))
+) if tenants is not None else None
+
+
+def _process_job(job_request: Dict[str, Any]) -> Dict[str, Any]:
+    """Job handler: runs the agent under the submitting tenant's limits."""
+    tenant = tenants.get(job_request.get("tenant")) if tenants is not None else None
+    if gate is not None and tenant is not None:
+        return gate.call(tenant, _process_request, job_request["request"], job_request.get("session_id"))
+    return _process_request(job_request["request"], job_request.get("session_id"))
+
+
+@asynccontextmanager
+async def lifespan(app: FastAPI):
+    """Start the background job workers for the lifetime of the server."""
+    app.state.jobs = JobQueue(
+        os.getenv("AGENT_JOBS_DB") or state_path("jobs.db"),
+        max_pending=int(os.getenv("AGENT_JOBS_MAX_PENDING", "100"))
+    )
+    app.state.job_workers = JobWorkerPool(
+        app.state.jobs,
+        _process_job,
+        workers=int(os.getenv("AGENT_JOB_WORKERS", "2"))
+    )
+    app.state.job_workers.start()
+    if os.getenv("AGENT_WARMUP", "true").lower() == "true":
+        threading.Thread(target=get_agent, name="agent-warmup", daemon=True).start()
+    lag_interval = float(os.getenv("AGENT_LOOP_LAG_INTERVAL", "0.25"))
+    lag_monitor = asyncio.create_task(_monitor_event_loop(lag_interval)) if lag_interval > 0 else None
+    yield
+    if lag_monitor is not None:
+        lag_monitor.cancel()
+    app.state.job_workers.stop()
+
+
+async def _monitor_event_loop(interval: float) -> None:
+    """Record how late the event loop resumes a task sleeping for ``interval``."""
+    loop = asyncio.get_running_loop()
+    while True:
+        start = loop.time()
+        await asyncio.sleep(interval)
+        EVENT_LOOP_LAG.observe(max(0.0, loop.time() - start - interval))
+
+
 app = FastAPI(
     title="Advanced Tool Agent API",
     description="AI agent that generates and analyzes code using Gemini CLI",
-    version="1.0.0"
+    version="1.0.0",
+    lifespan=lifespan,
+    default_response_class=FastJSONResponse
 )
 
-agent = AdvancedToolAgent()
+# Default for the ``lean`` query parameter of result endpoints
+LEAN_RESPONSES = os.getenv("AGENT_LEAN_RESPONSES", "false").lower() == "true"
+
+
+def _respond(result: Dict[str, Any], lean_mode: Optional[bool]) -> FastJSONResponse:
+    """Encode a result directly, dropping redundant copies in lean mode."""
+    if lean_mode is None:
+        lean_mode = LEAN_RESPONSES
+    if lean_mode:
+        result = lean_result(result)
+    return FastJSONResponse(result)
+
+
+@app.middleware("http")
+async def rate_limit(request: Request, call_next):
+    """Limit POST requests per client address when AGENT_RATE_LIMIT is set."""
+    if rate_limiter is not None and request.method == "POST":
+        client = request.client.host if request.client else "unknown"
+        if not await run_in_threadpool(rate_limiter.acquire, client):
+            return JSONResponse(
+                status_code=429,
+                content={"detail": "Rate limit exceeded"},
+                headers={"Retry-After": str(rate_limiter.retry_after())}
+            )
+    return await call_next(request)
+
+
+# Paths served without an API key when tenants are configured
+_PUBLIC_PATHS = frozenset({"/", "/health", "/metrics", "/docs", "/redoc", "/openapi.json"})
+
+
+def _api_key(request: Request) -> Optional[str]:
+    """API key from the X-API-Key header or an 'Authorization: Bearer' header."""
+    key = request.headers.get("x-api-key")
+    if key:
+        return key
+    scheme, _, token = request.headers.get("authorization", "").partition(" ")
+    return token.strip() if scheme.lower() == "bearer" else None
+
+
+@app.middleware("http")
+async def authenticate(request: Request, call_next):
+    """Resolve the calling tenant and enforce its token quota when AGENT_TENANTS is set."""
+    if tenants is None or request.url.path in _PUBLIC_PATHS:
+        return await call_next(request)
+    tenant = tenants.authenticate(_api_key(request))
+    if tenant is None:
+        return JSONResponse(
+            status_code=401,
+            content={"detail": "Invalid or missing API key"},
+            headers={"WWW-Authenticate": "Bearer"}
+        )
+    if request.method == "POST":
+        retry_after = await run_in_threadpool(gate.admit, tenant)
+        if retry_after is not None:
+            return JSONResponse(
+                status_code=429,
+                content={"detail": f"Token quota exhausted for tenant '{tenant.name}'"},
+                headers={"Retry-After": str(retry_after)}
+            )
+    token = current_tenant.set(tenant)
+    try:
+        return await call_next(request)
+    finally:
+        current_tenant.reset(token)
 
 
 class GenerateRequest(BaseModel):
@@ -27,10 +246,29 @@ class GenerateRequest(BaseModel):
 class AnalyzeRequest(BaseModel):
     code: str
     analysis_type: str = "security"
+    path: Optional[str] = None  # enables incremental re-analysis of this file
+
+
+class BatchFile(BaseModel):
+    path: str
+    code: str
+
+
+class BatchAnalyzeRequest(BaseModel):
+    files: List[BatchFile] = []
+    tarball: Optional[str] = None  # base64-encoded .tar, .tar.gz or .tar.bz2
+    analysis_type: str = "security"
 
 
 class AgentRequest(BaseModel):
     request: str
+    session_id: Optional[str] = None
+
+
+class JobRequest(BaseModel):
+    request: str
+    priority: str = "normal"
+    session_id: Optional[str] = None
 
 
 @app.get("/")
@@ -49,60 +287,322 @@ async def health():
     return {"status": "healthy"}
 
 
+@app.get("/metrics", response_class=PlainTextResponse)
+async def metrics():
+    """Prometheus metrics endpoint."""
+    return PlainTextResponse(REGISTRY.render(), media_type="text/plain; version=0.0.4")
+
+
+async def _run_tool(tool: str, analysis_type: str, fn: Callable[..., Dict[str, Any]], /,
+                    *args: Any, **kwargs: Any) -> Dict[str, Any]:
+    """
+    Run a blocking tool call in the threadpool, recording how long it queued.
+    
+    Calls made for a tenant wait for a slot in the fair queue first; a
+    tenant with too many calls already waiting gets a 429.
+    """
+    enqueued = time.perf_counter()
+    
+    def run(*call_args: Any, **call_kwargs: Any) -> Dict[str, Any]:
+        QUEUE_WAIT.observe(time.perf_counter() - enqueued, tool=tool, analysis_type=analysis_type)
+        return fn(*call_args, **call_kwargs)
+    
+    tenant = current_tenant.get()
+    if gate is None or tenant is None:
+        return await run_in_threadpool(run, *args, **kwargs)
+    try:
+        return await gate.acall(tenant, run, *args, **kwargs)
+    except TenantBusyError as e:
+        raise HTTPException(status_code=429, detail=str(e), headers={"Retry-After": "5"})
+
+
+def _raise_for_failure(result: Dict[str, Any]) -> None:
+    """Turn a failed tool result into an HTTP error (429 when rate limited)."""
+    if result.get("success"):
+        return
+    if result.get("error_type") == "rate_limited":
+        raise HTTPException(status_code=429, detail=result.get("error"),
+                            headers={"Retry-After": str(result.get("retry_after", 60))})
+    raise HTTPException(status_code=500, detail=result.get("error"))
+
+
 @app.post("/generate")
-async def generate_code(request: GenerateRequest):
+async def generate_code(request: GenerateRequest, lean: Optional[bool] = None):
     """Generate code using Gemini CLI."""
     try:
-        from app.tools import generate_code_with_cli
-        result = generate_code_with_cli(
+        result = await _run_tool(
+            "generate_code", "none", _tool("generate_code_with_cli"),
             task=request.task,
             language=request.language,
             complexity=request.complexity
         )
         
-        if not result.get("success"):
-            raise HTTPException(status_code=500, detail=result.get("error"))
+        _raise_for_failure(result)
         
-        return result
+        return _respond(result, lean)
+    except HTTPException:
+        raise
     except Exception as e:
         logger.error(f"Generation failed: {str(e)}")
         raise HTTPException(status_code=500, detail=str(e))
 
 
+def _format_sse(event: str, data: Dict[str, Any]) -> str:
+    """Encode a single Server-Sent Event."""
+    return f"event: {event}\ndata: {dumps_bytes(data).decode('utf-8')}\n\n"
+
+
+def _stream_tool(name: str, **params: Any) -> ClosingStreamingResponse:
+    """
+    Serve the events of a streaming tool as Server-Sent Events.
+    
+    The blocking event generator is advanced in a worker thread and closed
+    as soon as the client goes away, which kills the CLI process and frees
+    the tenant's slot instead of running on until the CLI timeout.
+    """
+    stream = _tool(name)
+    tenant = current_tenant.get()
+    if gate is not None and tenant is not None:
+        events = gate.iterate(tenant, stream, **params)
+    else:
+        events = stream(**params)
+    
+    async def event_stream():
+        try:
+            async for event in iterate_in_threadpool(events):
+                yield _format_sse(event["event"], event["data"])
+        finally:
+            events.close()
+    
+    return ClosingStreamingResponse(
+        event_stream(),
+        media_type="text/event-stream",
+        headers={"Cache-Control": "no-cache", "X-Accel-Buffering": "no"}
+    )
+
+
+@app.post("/generate/stream")
+async def generate_code_stream(request: GenerateRequest):
+    """Stream generated code as Server-Sent Events while Gemini CLI produces it."""
+    return _stream_tool(
+        "stream_code_with_cli", task=request.task, language=request.language, complexity=request.complexity
+    )
+
+
+@app.post("/analyze/stream")
+async def analyze_code_stream(request: AnalyzeRequest):
+    """
+    Stream an analysis as Server-Sent Events.
+    
+    Security analyses send the local static pre-pass findings as a
+    ``findings`` event right away; the ``result`` event follows once the
+    LLM has reviewed the rest. ``path`` (incremental analysis) is not
+    supported here.
+    """
+    if request.path:
+        raise HTTPException(status_code=400, detail="path is only supported by /analyze")
+    return _stream_tool("stream_analysis_with_cli", code=request.code, analysis_type=request.analysis_type)
+
+
 @app.post("/analyze")
-async def analyze_code(request: AnalyzeRequest):
-    """Analyze code using Gemini CLI."""
+async def analyze_code(request: AnalyzeRequest, http_request: Request, lean: Optional[bool] = None):
+    """
+    Analyze code using Gemini CLI.
+    
+    When ``path`` is given, the file's last analyzed version for this client
+    is remembered and only the functions and classes changed since then are
+    analyzed again; the response has an ``incremental`` report.
+    
+    With ``lean=true`` the response omits ``raw_output``, which repeats the
+    CLI output already parsed into ``analysis``.
+    """
     try:
-        from app.tools import analyze_code_with_cli
-        result = analyze_code_with_cli(
-            code=request.code,
-            analysis_type=request.analysis_type
-        )
+        if request.path:
+            tenant = current_tenant.get()
+            client = tenant.name if tenant is not None else (
+                http_request.client.host if http_request.client else "unknown"
+            )
+            result = await _run_tool(
+                "analyze_code", request.analysis_type, get_incremental().analyze_file,
+                client, request.path, request.code, request.analysis_type
+            )
+        else:
+            result = await _run_tool(
+                "analyze_code", request.analysis_type, _tool("analyze_code_with_cli"),
+                code=request.code,
+                analysis_type=request.analysis_type
+            )
         
-        if not result.get("success"):
-            raise HTTPException(status_code=500, detail=result.get("error"))
+        _raise_for_failure(result)
         
-        return result
+        return _respond(result, lean)
+    except HTTPException:
+        raise
     except Exception as e:
         logger.error(f"Analysis failed: {str(e)}")
         raise HTTPException(status_code=500, detail=str(e))
 
 
+@app.post("/analyze/batch")
+async def analyze_batch_endpoint(request: BatchAnalyzeRequest):
+    """
+    Analyze many files in one request, streaming NDJSON results as they complete.
+    
+    Files come from ``files`` and/or a base64 ``tarball``. Identical file
+    contents are analyzed once. Each line is a JSON object: one 'result'
+    record per file followed by a final 'summary' record.
+    """
+    await run_in_threadpool(get_tools)
+    from app.batch import MAX_BATCH_FILES, BatchError, analyze_batch, extract_tarball, ndjson_lines
+    
+    files = [(f.path, f.code) for f in request.files]
+    if request.tarball:
+        try:
+            data = base64.b64decode(request.tarball, validate=True)
+            files.extend(await run_in_threadpool(extract_tarball, data))
+        except (binascii.Error, BatchError) as e:
+            raise HTTPException(status_code=400, detail=str(e))
+    if not files:
+        raise HTTPException(status_code=400, detail="No files to analyze")
+    if len(files) > MAX_BATCH_FILES:
+        raise HTTPException(status_code=400, detail=f"At most {MAX_BATCH_FILES} files per batch")
+    
+    tenant = current_tenant.get()
+    analyze = None
+    if gate is not None and tenant is not None:
+        def analyze(code: str, analysis_type: str) -> Dict[str, Any]:
+            return gate.call(tenant, _tool("analyze_code_with_cli"), code, analysis_type)
+    
+    records = analyze_batch(
+        files,
+        request.analysis_type,
+        max_workers=int(os.getenv("AGENT_BATCH_WORKERS", "8")),
+        analyze=analyze
+    )
+    return ClosingStreamingResponse(ndjson_lines(records), media_type="application/x-ndjson")
+
+
 @app.post("/agent")
-async def process_agent_request(request: AgentRequest):
-    """Process a natural language request through the agent."""
+async def process_agent_request(request: AgentRequest, lean: Optional[bool] = None, format: bool = False):
+    """
+    Process a natural language request through the agent.
+    
+    With ``lean=true`` the response omits ``raw_output`` and only builds
+    ``formatted_response`` when ``format=true`` is also given.
+    """
+    lean_mode = LEAN_RESPONSES if lean is None else lean
     try:
-        result = agent.process_request(request.request)
+        result = await _run_tool(
+            "agent", "none", _process_request, request.request,
+            scoped_session(current_tenant.get(), request.session_id),
+            format_response=not lean_mode
+        )
         
-        if not result.get("success"):
-            raise HTTPException(status_code=500, detail=result.get("error"))
+        _raise_for_failure(result)
         
-        return result
+        if lean_mode:
+            result = lean_result(result)
+            if format:
+                result["formatted_response"] = get_agent().format_result(result)
+        return FastJSONResponse(result)
+    except HTTPException:
+        raise
     except Exception as e:
         logger.error(f"Agent request failed: {str(e)}")
         raise HTTPException(status_code=500, detail=str(e))
 
 
+_FINISHED_JOB_STATES = ("succeeded", "failed")
+
+
+def _job_view(job: Dict[str, Any]) -> Dict[str, Any]:
+    """Public representation of a job."""
+    return {
+        "job_id": job["id"],
+        "status": job["status"],
+        "priority": job["priority"],
+        "created_at": job["created_at"],
+        "started_at": job["started_at"],
+        "finished_at": job["finished_at"],
+        "attempts": job["attempts"],
+        "result": job["result"],
+        "error": job["error"]
+    }
+
+
+async def _get_job_or_404(job_id: str) -> Dict[str, Any]:
+    job = await run_in_threadpool(app.state.jobs.get, job_id)
+    tenant = current_tenant.get()
+    # Other tenants' jobs look like missing ones
+    if job is None or (tenant is not None and job["request"].get("tenant") != tenant.name):
+        raise HTTPException(status_code=404, detail=f"Job {job_id} not found")
+    return job
+
+
+@app.post("/jobs", status_code=202)
+async def submit_job(request: JobRequest):
+    """Queue a natural language request for background processing."""
+    tenant = current_tenant.get()
+    job_request = {"request": request.request, "session_id": scoped_session(tenant, request.session_id)}
+    if tenant is not None:
+        job_request["tenant"] = tenant.name
+    try:
+        job = await run_in_threadpool(app.state.jobs.enqueue, job_request, request.priority)
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+    except QueueFullError as e:
+        raise HTTPException(status_code=429, detail=str(e), headers={"Retry-After": "30"})
+    
+    app.state.job_workers.notify()
+    return _job_view(job)
+
+
+@app.get("/jobs/{job_id}")
+async def get_job(job_id: str, wait: float = 0, lean: Optional[bool] = None):
+    """
+    Get a job's status and result.
+    
+    With ``wait`` > 0 the call long-polls for up to that many seconds
+    (capped at 60) until the job finishes.
+    """
+    deadline = time.monotonic() + min(max(wait, 0), 60)
+    job = await _get_job_or_404(job_id)
+    while job["status"] not in _FINISHED_JOB_STATES and time.monotonic() < deadline:
+        await asyncio.sleep(0.5)
+        job = await _get_job_or_404(job_id)
+    return _respond(_job_view(job), lean)
+
+
+@app.get("/jobs/{job_id}/stream")
+async def stream_job(job_id: str):
+    """Stream a job's status changes as Server-Sent Events until it finishes."""
+    job = await _get_job_or_404(job_id)
+    
+    async def event_stream():
+        current = job
+        last_status = None
+        while True:
+            if current["status"] != last_status:
+                last_status = current["status"]
+                event = "result" if last_status in _FINISHED_JOB_STATES else "status"
+                yield _format_sse(event, _job_view(current))
+            if last_status in _FINISHED_JOB_STATES:
+                return
+            await asyncio.sleep(0.5)
+            current = await run_in_threadpool(app.state.jobs.get, job_id) or current
+    
+    return StreamingResponse(
+        event_stream(),
+        media_type="text/event-stream",
+        headers={"Cache-Control": "no-cache", "X-Accel-Buffering": "no"}
+    )
+
+
 if __name__ == "__main__":
     import uvicorn
-    uvicorn.run(app, host="0.0.0.0", port=8080)
+    workers = int(os.getenv("WEB_CONCURRENCY", "1"))
+    if workers > 1:
+        # Worker processes import the app themselves, so pass it by name
+        uvicorn.run("app.server:app", host="0.0.0.0", port=8080, workers=workers)
+    else:
+        uvicorn.run(app, host="0.0.0.0", port=8080)
@@ -0,0 +1,102 @@
+"""Bounded per-session conversation history."""
+
+import threading
+import time
+from collections import OrderedDict, deque
+from typing import Any, Deque, Dict
+
+from app.chunking import CHARS_PER_TOKEN, estimate_tokens
+
+DEFAULT_SESSION = "default"
+
+
+class SessionHistory:
+    """Recent turns of one session plus a digest of older ones."""
+
+    __slots__ = ("turns", "digest", "tokens", "last_active")
+
+    def __init__(self):
+        self.turns: Deque[Dict[str, Any]] = deque()
+        self.digest = ""
+        self.tokens = 0
+        self.last_active = time.monotonic()
+
+
+class SessionStore:
+    """
+    Conversation history for many sessions with bounded memory.
+
+    Each session keeps its most recent turns within ``token_budget``; turns
+    that slide out of the window are folded into a short digest capped at
+    ``digest_chars``. At most ``max_sessions`` sessions are kept, evicting
+    the least recently used, and sessions idle for ``idle_ttl`` seconds are
+    dropped.
+    """
+
+    def __init__(self, max_sessions: int = 1000, token_budget: int = 2000,
+                 digest_chars: int = 1000, idle_ttl: float = 3600):
+        self.max_sessions = max_sessions
+        self.token_budget = token_budget
+        self.digest_chars = digest_chars
+        self.idle_ttl = idle_ttl
+        self._sessions: "OrderedDict[str, SessionHistory]" = OrderedDict()
+        self._lock = threading.Lock()
+
+    def append(self, session_id: str, role: str, content: str) -> None:
+        """Record a turn, compacting and evicting as needed."""
+        # A single oversized turn (e.g. pasted code) must not blow the budget
+        content = content[:self.token_budget * CHARS_PER_TOKEN]
+        turn = {"role": role, "content": content, "timestamp": time.time()}
+        tokens = estimate_tokens(content)
+        with self._lock:
+            self._expire_idle()
+            session = self._sessions.get(session_id)
+            if session is None:
+                session = self._sessions[session_id] = SessionHistory()
+                while len(self._sessions) > self.max_sessions:
+                    self._sessions.popitem(last=False)
+            self._sessions.move_to_end(session_id)
+            session.last_active = time.monotonic()
+
+            session.turns.append(turn)
+            session.tokens += tokens
+            while session.tokens > self.token_budget and len(session.turns) > 1:
+                self._compact(session, session.turns.popleft())
+
+    def _compact(self, session: SessionHistory, turn: Dict[str, Any]) -> None:
+        """Fold a turn that left the window into the session digest."""
+        session.tokens -= estimate_tokens(turn["content"])
+        line = " ".join(turn["content"].split())
+        if len(line) > 120:
+            line = line[:117] + "..."
+        digest = f"{session.digest}\n{turn['role']}: {line}" if session.digest else f"{turn['role']}: {line}"
+        if len(digest) > self.digest_chars:
+            # Keep the most recent part of the digest, starting on a whole entry
+            digest = digest[-self.digest_chars:]
+            digest = digest[digest.find("\n") + 1:] if "\n" in digest else digest
+        session.digest = digest
+
+    def _expire_idle(self) -> None:
+        cutoff = time.monotonic() - self.idle_ttl
+        while self._sessions:
+            session_id, session = next(iter(self._sessions.items()))
+            if session.last_active >= cutoff:
+                break
+            del self._sessions[session_id]
+
+    def history(self, session_id: str) -> Dict[str, Any]:
+        """Digest and recent turns of a session (empty if unknown or expired)."""
+        with self._lock:
+            self._expire_idle()
+            session = self._sessions.get(session_id)
+            if session is None:
+                return {"digest": "", "turns": []}
+            return {"digest": session.digest, "turns": list(session.turns)}
+
+    def clear(self, session_id: str) -> None:
+        with self._lock:
+            self._sessions.pop(session_id, None)
+
+    def __len__(self) -> int:
+        with self._lock:
+            return len(self._sessions)
@@ -0,0 +1,424 @@
+"""Local AST and regex security checks run before asking the LLM."""
+
+import ast
+import re
+from typing import Any, Dict, List, Optional, Set, Tuple
+
+from app.chunking import merge_analyses
+
+_SEVERITY_ORDER = ("low", "medium", "high")
+
+# Calls that are a finding wherever they appear:
+# qualified name -> (type, severity, description, recommendation)
+DANGEROUS_CALLS = {
+    "eval": ("Code injection", "high", "eval() executes arbitrary code built from its argument",
+             "Parse the input explicitly, or use ast.literal_eval for literals"),
+    "exec": ("Code injection", "high", "exec() executes arbitrary code",
+             "Call the intended code directly instead of executing strings"),
+    "os.system": ("Command injection", "high", "os.system() runs its argument through the shell",
+                  "Use subprocess.run with an argument list and shell=False"),
+    "os.popen": ("Command injection", "high", "os.popen() runs its argument through the shell",
+                 "Use subprocess.run with an argument list and shell=False"),
+    "pickle.load": ("Insecure deserialization", "high", "pickle can execute arbitrary code while loading",
+                    "Use a data-only format such as JSON for untrusted input"),
+    "pickle.loads": ("Insecure deserialization", "high", "pickle can execute arbitrary code while loading",
+                     "Use a data-only format such as JSON for untrusted input"),
+    "marshal.load": ("Insecure deserialization", "high", "marshal is not safe against malicious data",
+                     "Use a data-only format such as JSON for untrusted input"),
+    "marshal.loads": ("Insecure deserialization", "high", "marshal is not safe against malicious data",
+                      "Use a data-only format such as JSON for untrusted input"),
+    "tempfile.mktemp": ("Insecure temporary file", "low", "tempfile.mktemp() is open to file creation races",
+                        "Use tempfile.mkstemp or tempfile.NamedTemporaryFile"),
+}
+
+_SUBPROCESS_CALLS = frozenset({
+    "subprocess.run", "subprocess.call", "subprocess.check_call", "subprocess.check_output", "subprocess.Popen"
+})
+_REQUESTS_CALLS = frozenset({
+    "requests.get", "requests.post", "requests.put", "requests.patch", "requests.delete",
+    "requests.head", "requests.request"
+})
+_SAFE_YAML_LOADERS = frozenset({"SafeLoader", "CSafeLoader", "BaseLoader"})
+_SQL_METHODS = frozenset({"execute", "executemany", "executescript", "raw"})
+
+_SECRET_NAME = re.compile(
+    r"(?i)(passw(?:or)?d|pwd|secret|secret_?key|api_?key|access_?key|private_?key|token|credentials?)$"
+)
+_PLACEHOLDER = re.compile(r"(?i)^(?:<[^>]*>|\$\{[^}]*\}|\*+|x+|changeme|your[_\- ].*|\.\.\.)$")
+
+# (pattern, type, severity, description, recommendation), applied to every line
+SECRET_PATTERNS = [
+    (re.compile(r"\b(?:AKIA|ASIA)[0-9A-Z]{16}\b"), "Hardcoded credentials", "high",
+     "AWS access key ID in source", "Load credentials from the environment or a secret manager"),
+    (re.compile(r"-----BEGIN (?:[A-Z]+ )?PRIVATE KEY-----"), "Hardcoded credentials", "high",
+     "Private key embedded in source", "Store keys outside the codebase and load them at runtime"),
+    (re.compile(r"\bgh[pousr]_[A-Za-z0-9]{36,}\b"), "Hardcoded credentials", "high",
+     "GitHub token in source", "Load credentials from the environment or a secret manager"),
+    (re.compile(r"\bAIza[0-9A-Za-z_\-]{35}\b"), "Hardcoded credentials", "high",
+     "Google API key in source", "Load credentials from the environment or a secret manager"),
+    (re.compile(r"\bxox[abprs]-[0-9A-Za-z\-]{10,}"), "Hardcoded credentials", "high",
+     "Slack token in source", "Load credentials from the environment or a secret manager"),
+]
+
+# Extra line patterns for code that is not Python (mostly JavaScript)
+SOURCE_PATTERNS = [
+    (re.compile(r"(?<![\w.])eval\s*\("), "Code injection", "high",
+     "eval() executes arbitrary code built from its argument", "Parse the input explicitly instead of using eval"),
+    (re.compile(r"\bnew\s+Function\s*\("), "Code injection", "high",
+     "new Function() compiles arbitrary code", "Avoid constructing functions from strings"),
+    (re.compile(r"\.innerHTML\s*=|\bdocument\.write\s*\("), "XSS", "medium",
+     "HTML is written into the page without escaping", "Use textContent or sanitize the HTML first"),
+    (re.compile(r"\bchild_process\.exec(?:Sync)?\s*\(|\bexec(?:Sync)?\s*\(\s*`[^`]*\$\{"), "Command injection", "high",
+     "Command line built for the shell", "Use execFile or spawn with an argument array"),
+    (re.compile(r"""(?i)\b(?:password|passwd|secret|api_?key|token)\s*[:=]\s*['"][^'"\s]{4,}['"]"""),
+     "Hardcoded credentials", "high", "Credential assigned as a string literal",
+     "Load credentials from the environment or a secret manager"),
+]
+
+
+def _finding(line: int, kind: str, severity: str, description: str, recommendation: str) -> Dict[str, Any]:
+    return {
+        "type": kind,
+        "line": line,
+        "description": description,
+        "recommendation": recommendation,
+        "severity": severity,
+        "source": "static",
+    }
+
+
+def finding_key(finding: Dict[str, Any]) -> Tuple[str, str]:
+    """Identity of a finding for de-duplication: (line, lower-cased type)."""
+    return str(finding.get("line")), str(finding.get("type", "")).lower()
+
+
+class _UnitScanner(ast.NodeVisitor):
+    """Collects deterministic findings in one top-level statement."""
+
+    def __init__(self, aliases: Dict[str, str]):
+        self.aliases = aliases
+        self.findings: List[Dict[str, Any]] = []
+
+    def _qualify(self, node: ast.AST) -> Optional[str]:
+        if isinstance(node, ast.Name):
+            return self.aliases.get(node.id, node.id)
+        if isinstance(node, ast.Attribute):
+            base = self._qualify(node.value)
+            return f"{base}.{node.attr}" if base else None
+        return None
+
+    def _add(self, node: ast.AST, kind: str, severity: str, description: str, recommendation: str) -> None:
+        self.findings.append(_finding(node.lineno, kind, severity, description, recommendation))
+
+    def _check_secret(self, node: ast.AST, name: Optional[str], value: ast.AST) -> None:
+        if not name or not _SECRET_NAME.search(name):
+            return
+        if isinstance(value, ast.Constant) and isinstance(value.value, str):
+            text = value.value.strip()
+            if len(text) >= 4 and not _PLACEHOLDER.match(text):
+                self._add(node, "Hardcoded credentials", "high", f"'{name}' is set to a string literal",
+                          "Load credentials from the environment or a secret manager")
+
+    def _check_call(self, node: ast.Call, qualname: Optional[str], method: Optional[str]) -> None:
+        """Record a finding if the call is deterministically unsafe."""
+        keywords = {keyword.arg: keyword.value for keyword in node.keywords if keyword.arg}
+
+        if qualname in DANGEROUS_CALLS:
+            self._add(node, *DANGEROUS_CALLS[qualname])
+        elif qualname in _SUBPROCESS_CALLS:
+            shell = keywords.get("shell")
+            if isinstance(shell, ast.Constant) and shell.value is True:
+                self._add(node, "Command injection", "high", f"{qualname}() with shell=True",
+                          "Pass an argument list and leave shell=False")
+        elif qualname == "yaml.load":
+            loader = keywords.get("Loader")
+            if loader is None and len(node.args) > 1:
+                loader = node.args[1]
+            loader_name = self._qualify(loader) if loader is not None else None
+            if not loader_name or loader_name.rsplit(".", 1)[-1] not in _SAFE_YAML_LOADERS:
+                self._add(node, "Insecure deserialization", "medium", "yaml.load() without a safe Loader",
+                          "Use yaml.safe_load")
+        elif qualname in _REQUESTS_CALLS:
+            verify = keywords.get("verify")
+            if isinstance(verify, ast.Constant) and verify.value is False:
+                self._add(node, "Insecure TLS", "medium", "TLS certificate verification is disabled",
+                          "Remove verify=False")
+        elif method in _SQL_METHODS and node.args and self._is_built_string(node.args[0]):
+            self._add(node, "SQL injection", "high", "SQL query built with string formatting",
+                      "Use a parameterized query and pass values separately")
+
+    @staticmethod
+    def _is_built_string(node: ast.AST) -> bool:
+        if isinstance(node, ast.JoinedStr):
+            return any(isinstance(value, ast.FormattedValue) for value in node.values)
+        if isinstance(node, ast.BinOp) and isinstance(node.op, (ast.Add, ast.Mod)):
+            return any(
+                isinstance(side, ast.JoinedStr) or (isinstance(side, ast.Constant) and isinstance(side.value, str))
+                for side in (node.left, node.right)
+            )
+        return (
+            isinstance(node, ast.Call) and isinstance(node.func, ast.Attribute)
+            and node.func.attr == "format" and isinstance(node.func.value, ast.Constant)
+        )
+
+    def visit_Call(self, node: ast.Call) -> None:
+        qualname = self._qualify(node.func)
+        method = node.func.attr if isinstance(node.func, ast.Attribute) else qualname
+        self._check_call(node, qualname, method)
+        for keyword in node.keywords:
+            self._check_secret(keyword.value, keyword.arg, keyword.value)
+        self.generic_visit(node)
+
+    def visit_Assign(self, node: ast.Assign) -> None:
+        for target in node.targets:
+            name = target.id if isinstance(target, ast.Name) else getattr(target, "attr", None)
+            self._check_secret(node, name, node.value)
+        self.generic_visit(node)
+
+    def visit_AnnAssign(self, node: ast.AnnAssign) -> None:
+        if node.value is not None:
+            name = node.target.id if isinstance(node.target, ast.Name) else getattr(node.target, "attr", None)
+            self._check_secret(node, name, node.value)
+        self.generic_visit(node)
+
+    def visit_Dict(self, node: ast.Dict) -> None:
+        for key, value in zip(node.keys, node.values):
+            if isinstance(key, ast.Constant) and isinstance(key.value, str):
+                self._check_secret(value, key.value, value)
+        self.generic_visit(node)
+
+
+def _import_aliases(tree: ast.Module) -> Dict[str, str]:
+    """Local name -> qualified name for every import in the module."""
+    aliases = {}
+    for node in ast.walk(tree):
+        if isinstance(node, ast.Import):
+            for alias in node.names:
+                if alias.asname:
+                    aliases[alias.asname] = alias.name
+                else:
+                    top = alias.name.split(".", 1)[0]
+                    aliases[top] = top
+        elif isinstance(node, ast.ImportFrom) and node.module and not node.level:
+            for alias in node.names:
+                aliases[alias.asname or alias.name] = f"{node.module}.{alias.name}"
+    return aliases
+
+
+def _is_literal(node: Optional[ast.AST]) -> bool:
+    """A constant, or a tuple/list/set/dict built only from constants."""
+    if isinstance(node, ast.Constant):
+        return True
+    if isinstance(node, ast.UnaryOp) and isinstance(node.op, (ast.USub, ast.UAdd)):
+        return isinstance(node.operand, ast.Constant)
+    if isinstance(node, (ast.Tuple, ast.List, ast.Set)):
+        return all(_is_literal(element) for element in node.elts)
+    if isinstance(node, ast.Dict):
+        return all(key is not None and _is_literal(key) for key in node.keys) and all(
+            _is_literal(value) for value in node.values)
+    return False
+
+
+def is_trivial(node: ast.stmt) -> bool:
+    """
+    Whether a top-level statement provably needs no security review.
+
+    Only imports, ``pass``, bare literals (docstrings) and assignments of
+    literals to plain names qualify; a hardcoded secret in such an
+    assignment is still reported as a finding.
+    """
+    if isinstance(node, (ast.Import, ast.ImportFrom, ast.Pass)):
+        return True
+    if isinstance(node, ast.Expr):
+        return _is_literal(node.value)
+    if isinstance(node, ast.Assign):
+        return all(isinstance(target, ast.Name) for target in node.targets) and _is_literal(node.value)
+    if isinstance(node, ast.AnnAssign):
+        return isinstance(node.target, ast.Name) and (node.value is None or _is_literal(node.value))
+    return False
+
+
+def _docstring_lines(tree: ast.Module, lines: List[str]) -> Set[int]:
+    """Lines holding nothing but a function or class docstring."""
+    numbers: Set[int] = set()
+    for node in ast.walk(tree):
+        if not isinstance(node, (ast.FunctionDef, ast.AsyncFunctionDef, ast.ClassDef)):
+            continue
+        first = node.body[0]
+        if not (isinstance(first, ast.Expr) and isinstance(first.value, ast.Constant)
+                and isinstance(first.value.value, str)):
+            continue
+        end = first.end_lineno or first.lineno
+        # Keep docstrings sharing a line with other code (``def f(): "doc"; ...``)
+        if lines[first.lineno - 1][:first.col_offset].strip():
+            continue
+        tail = lines[end - 1][first.end_col_offset:].strip() if first.end_col_offset is not None else ""
+        if tail and not tail.startswith("#"):
+            continue
+        numbers.update(range(first.lineno, end + 1))
+    return numbers
+
+
+class StaticReport:
+    """Outcome of the local pre-pass over one piece of code."""
+
+    __slots__ = ("findings", "units", "review_units", "llm_code")
+
+    def __init__(self, findings: List[Dict[str, Any]], units: int, review_units: int, llm_code: str = ""):
+        self.findings = findings
+        self.units = units
+        # Statements that are not provably trivial and need an LLM review
+        self.review_units = review_units
+        # The code to send to the LLM: settled statements and docstrings are
+        # blanked out (imports are kept as context), so line numbers stay the same
+        self.llm_code = llm_code
+
+    @property
+    def needs_llm(self) -> bool:
+        return self.review_units > 0
+
+    @property
+    def severity(self) -> str:
+        severities = [_SEVERITY_ORDER.index(finding["severity"]) for finding in self.findings]
+        return _SEVERITY_ORDER[max(severities, default=0)]
+
+    def context(self, line_offset: int = 0, line_count: Optional[int] = None) -> str:
+        """
+        The findings as a bullet list for the follow-up prompt.
+
+        With ``line_offset``/``line_count``, only findings inside that slice
+        of the code are listed, numbered relative to it (for chunked analysis).
+        """
+        last = line_offset + line_count if line_count is not None else None
+        lines = [
+            f"- line {finding['line'] - line_offset}: {finding['type']}: {finding['description']}"
+            for finding in self.findings
+            if finding["line"] > line_offset and (last is None or finding["line"] <= last)
+        ]
+        return "\n".join(lines) or "- none"
+
+    def summary(self) -> Dict[str, Any]:
+        """Pre-pass statistics included in analysis results as 'prepass'."""
+        return {
+            "findings": len(self.findings),
+            "units": self.units,
+            "llm_units": self.review_units,
+            "llm_lines": sum(bool(line.strip()) for line in self.llm_code.split("\n")) if self.needs_llm else 0,
+            "llm": self.needs_llm,
+        }
+
+    def to_result(self) -> Dict[str, Any]:
+        """
+        The findings as an analyze_code_with_cli security result.
+
+        Used on its own only for trivial code. The summary never claims the
+        code is clean: the local checks cannot prove the absence of issues.
+        """
+        if self.findings:
+            summary = f"Local static analysis found {len(self.findings)} issue(s)."
+        elif self.units:
+            summary = "Not reviewed by the LLM: the code only contains imports and literal definitions."
+        else:
+            summary = "Not reviewed: the code is empty."
+        return {
+            "success": True,
+            "analysis": {
+                "severity": self.severity,
+                "vulnerabilities": [dict(finding) for finding in self.findings],
+                "summary": summary,
+            },
+            "analysis_type": "security",
+            "prepass": self.summary(),
+        }
+
+
+def _scan_lines(lines: List[str], patterns) -> List[Dict[str, Any]]:
+    findings = []
+    for number, line in enumerate(lines, 1):
+        for pattern, *details in patterns:
+            if pattern.search(line):
+                findings.append(_finding(number, *details))
+    return findings
+
+
+def _dedupe(findings: List[Dict[str, Any]]) -> List[Dict[str, Any]]:
+    seen: Set[Tuple[str, str]] = set()
+    unique = []
+    for finding in sorted(findings, key=lambda item: item["line"]):
+        key = finding_key(finding)
+        if key not in seen:
+            seen.add(key)
+            unique.append(finding)
+    return unique
+
+
+def scan(code: str) -> StaticReport:
+    """
+    Run the local security pre-pass over a code snippet.
+
+    Python is parsed and every top-level statement is checked for
+    deterministic findings. Provably trivial statements (see is_trivial)
+    are settled locally; only the others go to the LLM, without their
+    docstrings and with the local findings as context, and the LLM is
+    skipped when nothing is left. Code
+    that does not parse as Python only gets line-pattern checks and always
+    goes to the LLM in full.
+    """
+    lines = code.split("\n")
+    if not code.strip():
+        return StaticReport([], 0, 0)
+
+    try:
+        tree = ast.parse(code)
+    except (SyntaxError, ValueError):
+        findings = _scan_lines(lines, SECRET_PATTERNS + SOURCE_PATTERNS)
+        return StaticReport(_dedupe(findings), 1, 1, code)
+
+    findings = _scan_lines(lines, SECRET_PATTERNS)
+    aliases = _import_aliases(tree)
+    review_units = 0
+    kept: Set[int] = set()
+    settled: Set[int] = set()
+    for node in tree.body:
+        scanner = _UnitScanner(aliases)
+        scanner.visit(node)
+        findings.extend(scanner.findings)
+        start = min([node.lineno] + [decorator.lineno for decorator in getattr(node, "decorator_list", [])])
+        span = range(start, (node.end_lineno or node.lineno) + 1)
+        if not is_trivial(node):
+            review_units += 1
+            kept.update(span)
+        elif isinstance(node, (ast.Import, ast.ImportFrom)):
+            kept.update(span)
+        else:
+            settled.update(span)
+
+    # A line shared with a statement under review (``x = 1; run(x)``) is kept
+    settled = (settled - kept) | _docstring_lines(tree, lines)
+    llm_code = "\n".join("" if number in settled else line for number, line in enumerate(lines, 1))
+    return StaticReport(_dedupe(findings), len(tree.body), review_units, llm_code)
+
+
+def combine(report: StaticReport, llm_result: Dict[str, Any]) -> Dict[str, Any]:
+    """
+    Merge the local findings with the LLM's result for the remaining code.
+
+    LLM findings repeating a local one (same line and type) are dropped. If
+    the LLM call failed, the local findings are returned with the error in
+    'partial_errors'.
+    """
+    merged = merge_analyses([(0, report.to_result()), (0, llm_result)], "security")
+    merged.pop("chunks", None)
+    analysis = merged["analysis"]
+    vulnerabilities = analysis.get("vulnerabilities")
+    if isinstance(vulnerabilities, list):
+        local_keys = {finding_key(finding) for finding in report.findings}
+        analysis["vulnerabilities"] = [
+            finding for finding in vulnerabilities
+            if not isinstance(finding, dict) or finding.get("source") == "static"
+            or finding_key(finding) not in local_keys
+        ]
+    if "raw_output" in llm_result:
+        merged["raw_output"] = llm_result["raw_output"]
+    merged["prepass"] = report.summary()
+    return merged
@@ -0,0 +1,377 @@
+"""API-key tenants with concurrency caps, token quotas and weighted fair scheduling."""
+
+import asyncio
+import hashlib
+import json
+import os
+import threading
+import time
+from collections import deque
+from concurrent.futures import Future
+from contextlib import asynccontextmanager, contextmanager
+from contextvars import ContextVar
+from typing import Any, AsyncIterator, Callable, Deque, Dict, Iterable, Iterator, Optional, Tuple
+
+from fastapi.concurrency import run_in_threadpool
+
+from app.chunking import estimate_tokens
+from app.responses import dumps_bytes, lean_result
+from app.utils.metrics import TENANT_QUEUE_WAIT, TENANT_REQUESTS, TENANT_TOKENS
+from app.utils.shared_store import SQLiteStore
+
+# Tenant of the request being handled, set by the server's auth middleware
+current_tenant: ContextVar[Optional["Tenant"]] = ContextVar("current_tenant", default=None)
+
+# Fixed per-call overhead, in tokens, added to the scheduling cost
+CALL_OVERHEAD_TOKENS = 200
+
+
+class Tenant:
+    """A caller identified by an API key, with its share and limits."""
+
+    __slots__ = ("name", "weight", "max_concurrency", "max_queued", "token_quota", "quota_window")
+
+    def __init__(self, name: str, weight: float = 1.0, max_concurrency: int = 4, max_queued: int = 100,
+                 token_quota: int = 0, quota_window: float = 86400):
+        if weight <= 0 or max_concurrency < 1 or max_queued < 0 or token_quota < 0 or quota_window <= 0:
+            raise ValueError(f"Invalid limits for tenant '{name}'")
+        self.name = name
+        self.weight = float(weight)
+        self.max_concurrency = int(max_concurrency)
+        self.max_queued = int(max_queued)
+        self.token_quota = int(token_quota)  # tokens per quota_window; 0 is unlimited
+        self.quota_window = float(quota_window)
+
+    def __repr__(self) -> str:
+        return f"Tenant({self.name!r}, weight={self.weight:g}, max_concurrency={self.max_concurrency})"
+
+
+def hash_api_key(api_key: str) -> str:
+    return hashlib.sha256(api_key.encode("utf-8")).hexdigest()
+
+
+_TENANT_OPTIONS = ("weight", "max_concurrency", "max_queued", "token_quota", "quota_window")
+
+
+class TenantRegistry:
+    """
+    Maps API keys to tenants.
+
+    Keys are held only as SHA-256 digests. An optional anonymous tenant
+    serves requests that carry no key at all.
+    """
+
+    def __init__(self, tenants: Iterable[Tuple[str, Tenant]], anonymous: Optional[Tenant] = None):
+        self._by_key: Dict[str, Tenant] = {}
+        self._by_name: Dict[str, Tenant] = {}
+        for key_hash, tenant in tenants:
+            self._by_key[key_hash] = tenant
+            self._by_name[tenant.name] = tenant
+        self.anonymous = anonymous
+        if anonymous is not None:
+            self._by_name[anonymous.name] = anonymous
+
+    @classmethod
+    def from_config(cls, config: Dict[str, Any]) -> "TenantRegistry":
+        """
+        Build a registry from a config dict::
+
+            {"tenants": [{"name": "web", "api_key": "...", "weight": 4, "max_concurrency": 8},
+                         {"name": "ci", "api_key_sha256": "...", "token_quota": 2000000}],
+             "anonymous": {"weight": 1, "max_concurrency": 1}}
+
+        Raises:
+            ValueError: If a tenant has no name or key, or invalid limits
+        """
+        tenants = []
+        for entry in config.get("tenants", []):
+            name = entry.get("name")
+            key_hash = entry.get("api_key_sha256") or (hash_api_key(entry["api_key"]) if entry.get("api_key") else None)
+            if not name or not key_hash:
+                raise ValueError("Every tenant needs a 'name' and an 'api_key' or 'api_key_sha256'")
+            tenants.append((key_hash.lower(), Tenant(name, **{k: entry[k] for k in _TENANT_OPTIONS if k in entry})))
+        anonymous = config.get("anonymous")
+        if anonymous is not None:
+            anonymous = Tenant("anonymous", **{k: anonymous[k] for k in _TENANT_OPTIONS if k in anonymous})
+        return cls(tenants, anonymous)
+
+    @classmethod
+    def from_env(cls) -> Optional["TenantRegistry"]:
+        """Registry from AGENT_TENANTS (inline JSON or a JSON file path), or None if unset."""
+        value = os.getenv("AGENT_TENANTS", "").strip()
+        if not value:
+            return None
+        if not value.startswith("{"):
+            with open(value, encoding="utf-8") as f:
+                value = f.read()
+        return cls.from_config(json.loads(value))
+
+    def authenticate(self, api_key: Optional[str]) -> Optional[Tenant]:
+        """The tenant for an API key (the anonymous tenant if no key), or None."""
+        if not api_key:
+            return self.anonymous
+        return self._by_key.get(hash_api_key(api_key))
+
+    def get(self, name: Optional[str]) -> Optional[Tenant]:
+        return self._by_name.get(name) if name else None
+
+    def __len__(self) -> int:
+        return len(self._by_name)
+
+
+class TokenQuota(SQLiteStore):
+    """Per-tenant token usage in fixed windows, shared across worker processes."""
+
+    schema = """
+    CREATE TABLE IF NOT EXISTS usage (
+        tenant TEXT PRIMARY KEY,
+        window_start REAL NOT NULL,
+        used INTEGER NOT NULL
+    );
+    """
+
+    @staticmethod
+    def _window_start(tenant: Tenant, now: float) -> float:
+        return now - now % tenant.quota_window
+
+    def used(self, tenant: Tenant) -> int:
+        """Tokens charged to the tenant in the current window."""
+        with self._connect() as conn:
+            row = conn.execute("SELECT window_start, used FROM usage WHERE tenant = ?", (tenant.name,)).fetchone()
+        if row is None or row["window_start"] != self._window_start(tenant, time.time()):
+            return 0
+        return row["used"]
+
+    def remaining(self, tenant: Tenant) -> Optional[int]:
+        """Tokens left in the current window, or None for an unlimited tenant."""
+        if not tenant.token_quota:
+            return None
+        return max(0, tenant.token_quota - self.used(tenant))
+
+    def charge(self, tenant: Tenant, tokens: int) -> int:
+        """Add tokens to the tenant's usage and return the new total for the window."""
+        window_start = self._window_start(tenant, time.time())
+        with self._transaction() as conn:
+            row = conn.execute("SELECT window_start, used FROM usage WHERE tenant = ?", (tenant.name,)).fetchone()
+            used = tokens if row is None or row["window_start"] != window_start else row["used"] + tokens
+            conn.execute(
+                "INSERT OR REPLACE INTO usage (tenant, window_start, used) VALUES (?, ?, ?)",
+                (tenant.name, window_start, used)
+            )
+        TENANT_TOKENS.inc(tokens, tenant=tenant.name)
+        return used
+
+    def retry_after(self, tenant: Tenant) -> int:
+        """Seconds until the tenant's current window ends."""
+        now = time.time()
+        return max(1, int(self._window_start(tenant, now) + tenant.quota_window - now + 0.999))
+
+
+class TenantBusyError(Exception):
+    """Raised when a tenant already has max_queued calls waiting for a slot."""
+
+    def __init__(self, tenant: Tenant):
+        super().__init__(f"Too many queued requests for tenant '{tenant.name}' ({tenant.max_queued} waiting)")
+        self.tenant = tenant
+
+
+class _Waiter:
+    __slots__ = ("tag", "tenant", "future", "enqueued")
+
+    def __init__(self, tag: float, tenant: Tenant):
+        self.tag = tag
+        self.tenant = tenant
+        self.future: Future = Future()
+        self.enqueued = time.perf_counter()
+
+
+class FairScheduler:
+    """
+    Weighted fair queue in front of the tool executor.
+
+    At most ``capacity`` calls run at once, and at most ``max_concurrency``
+    per tenant. Waiting calls are ordered by start-time fair queuing: each
+    call is tagged with its tenant's virtual finish time so far, advanced by
+    cost / weight, and the eligible call with the smallest tag runs next. A
+    tenant flooding the queue only pushes its own later calls back, so a
+    light interactive tenant keeps getting slots at its weighted share while
+    a batch tenant uses whatever capacity is left.
+
+    Thread-safe: slots can be taken from the event loop (aslot) or from
+    worker threads (slot).
+    """
+
+    def __init__(self, capacity: int = 16):
+        if capacity < 1:
+            raise ValueError("capacity must be at least 1")
+        self.capacity = capacity
+        self._lock = threading.Lock()
+        self._queues: Dict[str, Deque[_Waiter]] = {}
+        self._running: Dict[str, int] = {}
+        self._finish_tags: Dict[str, float] = {}
+        self._running_total = 0
+        self._virtual_time = 0.0
+
+    def submit(self, tenant: Tenant, cost: float = 1.0) -> Future:
+        """
+        Queue a call; the returned future completes when it may start.
+
+        Cancel the future to give up waiting; if cancel() returns False the
+        slot was already granted and must be released.
+
+        Raises:
+            TenantBusyError: If the tenant has max_queued calls waiting
+        """
+        with self._lock:
+            queue = self._queues.setdefault(tenant.name, deque())
+            blocked = (self._running.get(tenant.name, 0) >= tenant.max_concurrency
+                       or self._running_total >= self.capacity)
+            if blocked and len(queue) >= tenant.max_queued:
+                raise TenantBusyError(tenant)
+            start = max(self._virtual_time, self._finish_tags.get(tenant.name, 0.0))
+            self._finish_tags[tenant.name] = start + max(cost, 1.0) / tenant.weight
+            waiter = _Waiter(start, tenant)
+            queue.append(waiter)
+            self._dispatch()
+        return waiter.future
+
+    def release(self, tenant: Tenant) -> None:
+        """Free a slot granted by submit()."""
+        with self._lock:
+            self._running[tenant.name] -= 1
+            self._running_total -= 1
+            self._dispatch()
+
+    def _dispatch(self) -> None:
+        while self._running_total < self.capacity:
+            best: Optional[_Waiter] = None
+            for name, queue in self._queues.items():
+                while queue and queue[0].future.cancelled():
+                    queue.popleft()
+                if not queue or self._running.get(name, 0) >= queue[0].tenant.max_concurrency:
+                    continue
+                if best is None or queue[0].tag < best.tag:
+                    best = queue[0]
+            if best is None:
+                return
+            self._queues[best.tenant.name].popleft()
+            if not best.future.set_running_or_notify_cancel():
+                continue
+            name = best.tenant.name
+            self._running[name] = self._running.get(name, 0) + 1
+            self._running_total += 1
+            self._virtual_time = best.tag
+            TENANT_QUEUE_WAIT.observe(time.perf_counter() - best.enqueued, tenant=name)
+            best.future.set_result(None)
+
+    @contextmanager
+    def slot(self, tenant: Tenant, cost: float = 1.0) -> Iterator[None]:
+        """Block the calling thread until the tenant may run a call."""
+        self.submit(tenant, cost).result()
+        try:
+            yield
+        finally:
+            self.release(tenant)
+
+    @asynccontextmanager
+    async def aslot(self, tenant: Tenant, cost: float = 1.0) -> AsyncIterator[None]:
+        """Wait on the event loop until the tenant may run a call."""
+        future = self.submit(tenant, cost)
+        try:
+            await asyncio.wrap_future(future)
+        except asyncio.CancelledError:
+            if not future.cancel():
+                self.release(tenant)
+            raise
+        try:
+            yield
+        finally:
+            self.release(tenant)
+
+    def stats(self) -> Dict[str, Dict[str, int]]:
+        """Running and queued calls per tenant."""
+        with self._lock:
+            names = set(self._queues) | set(self._running)
+            return {
+                name: {
+                    "running": self._running.get(name, 0),
+                    "queued": sum(not w.future.cancelled() for w in self._queues.get(name, ())),
+                }
+                for name in sorted(names)
+            }
+
+
+def request_tokens(*values: Any) -> int:
+    """Estimated tokens in the string arguments of a tool call."""
+    return sum(estimate_tokens(value) for value in values if isinstance(value, str))
+
+
+def result_tokens(result: Any) -> int:
+    """Estimated tokens in a tool result, without redundant copies."""
+    if isinstance(result, dict):
+        result = lean_result(result)
+    return estimate_tokens(dumps_bytes(result).decode("utf-8"))
+
+
+class TenantGate:
+    """Runs tool calls for tenants through the fair scheduler and charges their quota."""
+
+    def __init__(self, registry: TenantRegistry, scheduler: FairScheduler, quota: TokenQuota):
+        self.registry = registry
+        self.scheduler = scheduler
+        self.quota = quota
+
+    def _cost(self, args: Tuple[Any, ...], kwargs: Dict[str, Any]) -> int:
+        return request_tokens(*args, *kwargs.values())
+
+    def call(self, tenant: Tenant, fn: Callable[..., Any], *args: Any, **kwargs: Any) -> Any:
+        """Run fn in the calling thread once the tenant gets a slot."""
+        tokens = self._cost(args, kwargs)
+        with self.scheduler.slot(tenant, tokens + CALL_OVERHEAD_TOKENS):
+            result = fn(*args, **kwargs)
+        self.quota.charge(tenant, tokens + result_tokens(result))
+        return result
+
+    async def acall(self, tenant: Tenant, fn: Callable[..., Any], *args: Any, **kwargs: Any) -> Any:
+        """Run blocking fn in the threadpool once the tenant gets a slot."""
+        tokens = self._cost(args, kwargs)
+        async with self.scheduler.aslot(tenant, tokens + CALL_OVERHEAD_TOKENS):
+            result = await run_in_threadpool(fn, *args, **kwargs)
+        await run_in_threadpool(self.quota.charge, tenant, tokens + result_tokens(result))
+        return result
+
+    def iterate(self, tenant: Tenant, fn: Callable[..., Iterable[Any]], *args: Any, **kwargs: Any) -> Iterator[Any]:
+        """
+        Yield from a streaming tool, holding one slot for the whole stream.
+
+        What was streamed is charged even if the consumer stops early.
+        """
+        tokens = self._cost(args, kwargs)
+        with self.scheduler.slot(tenant, tokens + CALL_OVERHEAD_TOKENS):
+            try:
+                for item in fn(*args, **kwargs):
+                    tokens += result_tokens(item)
+                    yield item
+            finally:
+                self.quota.charge(tenant, tokens)
+
+    def admit(self, tenant: Tenant) -> Optional[int]:
+        """
+        Check the tenant's quota before accepting a request.
+
+        Returns:
+            None if the request may proceed, else seconds until the quota resets
+        """
+        remaining = self.quota.remaining(tenant)
+        if remaining is not None and remaining <= 0:
+            TENANT_REQUESTS.inc(tenant=tenant.name, outcome="quota_exceeded")
+            return self.quota.retry_after(tenant)
+        TENANT_REQUESTS.inc(tenant=tenant.name, outcome="admitted")
+        return None
+
+
+def scoped_session(tenant: Optional[Tenant], session_id: Optional[str]) -> Optional[str]:
+    """Prefix a session id with the tenant name so tenants cannot share sessions."""
+    if tenant is None or not session_id:
+        return session_id
+    return f"{tenant.name}:{session_id}"
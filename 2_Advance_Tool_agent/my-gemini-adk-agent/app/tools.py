@@ -4,76 +4,159 @@ import subprocess
 import os
 import json
 import logging
-from typing import Dict, Any, Optional
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+from typing import TYPE_CHECKING, Any, Callable, Dict, Iterator, List, Optional, Tuple
+from app import prompts, static_analysis, validation
+from app.chunking import estimate_tokens, merge_analyses, split_source
+from app.execution import (
+    Coalesce, ErrorKind, RateLimit, ResponseCache, Retry, RetryPolicy, Timing, ToolRegistry
+)
+from app.utils.metrics import CACHE_HITS, CODE_REPAIRS, PROMPT_SIZE, RESPONSE_SIZE, SUBPROCESS_SPAWN
+from app.utils.shared_store import SharedCache, SharedRateLimiter
+from app.utils.singleflight import SingleFlight
+
+if TYPE_CHECKING:
+    from app.hedging import HedgedExecutor
 
 logger = logging.getLogger(__name__)
 
+# Code larger than this many (estimated) tokens is split at function/class
+# boundaries and the pieces are analyzed concurrently.
+ANALYSIS_CHUNK_TOKENS = 3000
+ANALYSIS_MAX_WORKERS = 8
+
+# Follow-up calls allowed to complete truncated or fix unparsable generated code
+REPAIR_ATTEMPTS = int(os.getenv("AGENT_REPAIR_ATTEMPTS", "2"))
+
+# Run the local static pre-pass before sending security analyses to the LLM
+STATIC_PREPASS = os.getenv("AGENT_STATIC_PREPASS", "true").lower() == "true"
+
+# Gemini model for every CLI call (the primary model when hedging)
+MODEL = os.getenv("AGENT_MODEL", "gemini-2.0-flash-exp")
+
+# Backend retries per tool call for transient or quota errors
+TOOL_RETRIES = int(os.getenv("AGENT_TOOL_RETRIES", "0"))
+
+# Every tool call runs through one middleware chain: cached results and
+# identical in-flight calls are reused, then the (optional) rate limit and
+# retries apply around the timed implementation.
+_response_cache = ResponseCache()
+_rate_limit = RateLimit()
+registry = ToolRegistry([
+    _response_cache,
+    Coalesce(SingleFlight()),
+    _rate_limit,
+    Retry(RetryPolicy(max_retries=TOOL_RETRIES, retryable=frozenset({ErrorKind.TRANSIENT, ErrorKind.QUOTA}))),
+    Timing(),
+])
+
+
+def configure_response_cache(cache: Optional[SharedCache]) -> None:
+    """Enable (or, with None, disable) caching of successful tool results."""
+    _response_cache.cache = cache
+
+
+def configure_rate_limit(limiter: Optional[SharedRateLimiter]) -> None:
+    """Enable (or, with None, disable) a per-tool limit on backend calls."""
+    _rate_limit.limiter = limiter
+
+
+# Optional hedging of code generation across two models
+_hedger: Optional["HedgedExecutor"] = None
+
+
+def configure_hedging(hedger: Optional["HedgedExecutor"]) -> None:
+    """Enable (or, with None, disable) hedged execution for code generation."""
+    global _hedger
+    _hedger = hedger
+
 
 class GeminiCLIWrapper:
     """Wrapper for Gemini CLI commands with proper error handling."""
     
-    def __init__(self, api_key: Optional[str] = None, model: str = "gemini-2.0-flash-exp"):
+    def __init__(self, api_key: Optional[str] = None, model: Optional[str] = None):
         self.api_key = api_key or os.getenv("GEMINI_API_KEY")
-        self.model = model
+        self.model = model or MODEL
         
         if not self.api_key:
             raise ValueError("GEMINI_API_KEY not found in environment")
     
-    def execute_cli_command(self, prompt: str, timeout: int = 60) -> Dict[str, Any]:
+    def _build_command(self, prompt: str) -> list:
+        """Construct the Gemini CLI command for a prompt."""
+        return [
+            "gemini",
+            "--model", self.model,
+            "think",
+            "-p", prompt
+        ]
+    
+    def _build_env(self) -> Dict[str, str]:
+        """Build the subprocess environment with the API key set."""
+        env = os.environ.copy()
+        env["GEMINI_API_KEY"] = self.api_key
+        return env
+    
+    def execute_cli_command(self, prompt: str, timeout: int = 60, tool: str = "cli",
+                            on_spawn: Optional[Callable[[subprocess.Popen], None]] = None) -> Dict[str, Any]:
         """
         Execute Gemini CLI command in non-interactive mode.
         
         Args:
             prompt: The prompt to send to Gemini
             timeout: Command timeout in seconds
+            tool: Tool name used to label process spawn metrics
+            on_spawn: Called with the CLI process right after it starts, so
+                another thread can kill it early
             
         Returns:
-            Dict with 'success', 'output', and 'error' keys
+            Dict with 'success', 'output', and 'error' keys; a timed-out
+            call also has 'partial_output' with whatever was printed
         """
         try:
-            # Construct the Gemini CLI command
-            cmd = [
-                "gemini",
-                "--model", self.model,
-                "think",
-                "-p", prompt
-            ]
-            
+            cmd = self._build_command(prompt)
             logger.info(f"Executing Gemini CLI: {' '.join(cmd[:4])}...")
             
-            # Set environment with API key
-            env = os.environ.copy()
-            env["GEMINI_API_KEY"] = self.api_key
-            
             # Execute command
-            result = subprocess.run(
+            spawn_start = time.perf_counter()
+            process = subprocess.Popen(
                 cmd,
-                capture_output=True,
+                stdout=subprocess.PIPE,
+                stderr=subprocess.PIPE,
                 text=True,
-                timeout=timeout,
-                env=env
+                env=self._build_env()
             )
+            SUBPROCESS_SPAWN.observe(time.perf_counter() - spawn_start, tool=tool)
+            if on_spawn is not None:
+                on_spawn(process)
             
-            if result.returncode == 0:
+            try:
+                stdout, stderr = process.communicate(timeout=timeout)
+            except subprocess.TimeoutExpired:
+                process.kill()
+                partial, _ = process.communicate()
+                logger.error(f"Command timed out after {timeout} seconds")
+                return {
+                    "success": False,
+                    "output": None,
+                    "error": f"Command timed out after {timeout} seconds",
+                    "partial_output": (partial or "").strip() or None
+                }
+            
+            if process.returncode == 0:
                 return {
                     "success": True,
-                    "output": result.stdout.strip(),
+                    "output": stdout.strip(),
                     "error": None
                 }
             else:
                 return {
                     "success": False,
                     "output": None,
-                    "error": result.stderr.strip() or "Command failed with no error message"
+                    "error": stderr.strip() or "Command failed with no error message"
                 }
                 
-        except subprocess.TimeoutExpired:
-            logger.error(f"Command timed out after {timeout} seconds")
-            return {
-                "success": False,
-                "output": None,
-                "error": f"Command timed out after {timeout} seconds"
-            }
         except FileNotFoundError:
             logger.error("Gemini CLI not found. Please install it first.")
             return {
@@ -89,6 +172,103 @@ class GeminiCLIWrapper:
                 "error": f"Unexpected error: {str(e)}"
             }
 
+    
+    def stream_cli_command(self, prompt: str, timeout: int = 60, tool: str = "cli") -> Iterator[Dict[str, Any]]:
+        """
+        Execute Gemini CLI command and yield its stdout line by line.
+        
+        Output is forwarded as soon as the CLI flushes it instead of being
+        buffered until the process exits.
+        
+        Args:
+            prompt: The prompt to send to Gemini
+            timeout: Command timeout in seconds
+            tool: Tool name used to label process spawn metrics
+            
+        Yields:
+            Dicts with 'type' set to 'chunk' (with 'data') for each line of
+            output, followed by one 'done' dict with 'success' and 'error' keys
+        """
+        cmd = self._build_command(prompt)
+        logger.info(f"Streaming Gemini CLI: {' '.join(cmd[:4])}...")
+        
+        try:
+            spawn_start = time.perf_counter()
+            process = subprocess.Popen(
+                cmd,
+                stdout=subprocess.PIPE,
+                stderr=subprocess.PIPE,
+                text=True,
+                bufsize=1,
+                env=self._build_env()
+            )
+            SUBPROCESS_SPAWN.observe(time.perf_counter() - spawn_start, tool=tool)
+        except FileNotFoundError:
+            logger.error("Gemini CLI not found. Please install it first.")
+            yield {
+                "type": "done",
+                "success": False,
+                "error": "Gemini CLI not found. Install with: npm install -g @google/generative-ai-cli"
+            }
+            return
+        except Exception as e:
+            logger.error(f"Unexpected error: {str(e)}")
+            yield {"type": "done", "success": False, "error": f"Unexpected error: {str(e)}"}
+            return
+        
+        # Drain stderr in the background so a chatty CLI cannot block on a full pipe
+        stderr_lines = []
+        stderr_reader = threading.Thread(
+            target=lambda: stderr_lines.extend(process.stderr),
+            daemon=True
+        )
+        stderr_reader.start()
+        
+        timed_out = threading.Event()
+        
+        def _kill_on_timeout():
+            timed_out.set()
+            process.kill()
+        
+        watchdog = threading.Timer(timeout, _kill_on_timeout)
+        watchdog.start()
+        
+        try:
+            for line in process.stdout:
+                yield {"type": "chunk", "data": line}
+            process.wait()
+        finally:
+            watchdog.cancel()
+            if process.poll() is None:
+                # Consumer went away mid-stream; don't leave the CLI running
+                process.kill()
+                process.wait()
+            stderr_reader.join(timeout=1)
+        
+        if timed_out.is_set():
+            logger.error(f"Command timed out after {timeout} seconds")
+            yield {"type": "done", "success": False, "error": f"Command timed out after {timeout} seconds"}
+        elif process.returncode == 0:
+            yield {"type": "done", "success": True, "error": None}
+        else:
+            yield {
+                "type": "done",
+                "success": False,
+                "error": "".join(stderr_lines).strip() or "Command failed with no error message"
+            }
+
+
+def _build_generate_prompt(task: str, language: str, complexity: str) -> str:
+    """Build the code generation prompt for a task."""
+    # Detect if this is a REST API request
+    is_api = any(keyword in task.lower() for keyword in ["api", "rest", "endpoint", "flask", "fastapi", "express"])
+    
+    if is_api and language == "python":
+        return prompts.render("generate.python_api", task=task)
+    if is_api and language == "javascript":
+        return prompts.render("generate.javascript_api", task=task)
+    return prompts.render("generate.code", task=task, language=language, complexity=complexity)
+
 
 def generate_code_with_cli(task: str, language: str = "python", complexity: str = "medium") -> Dict[str, Any]:
     """
@@ -100,83 +280,194 @@ def generate_code_with_cli(task: str, language: str = "python", complexity: str
         complexity: Complexity level (simple, medium, complex)
         
     Returns:
-        Dict with generated code and metadata
+        Dict with generated code (markdown fences removed) and metadata,
+        including a 'validation' report
     """
+    return registry.execute("generate_code", task=task, language=language, complexity=complexity).data
+
+
+def _run_generation(prompt: str) -> Dict[str, Any]:
+    """Execute a code generation prompt, hedged when configured."""
+    PROMPT_SIZE.observe(len(prompt.encode("utf-8")), tool="generate_code", analysis_type="none")
+    hedger = _hedger
+    if hedger is not None:
+        result = hedger.execute(prompt, tool="generate_code")
+    else:
+        result = GeminiCLIWrapper().execute_cli_command(prompt, tool="generate_code")
+    if result["success"]:
+        RESPONSE_SIZE.observe(len(result["output"].encode("utf-8")), tool="generate_code", analysis_type="none")
+    return result
+
+
+def _generate_code(task: str, language: str, complexity: str) -> Dict[str, Any]:
+    """Generate code with a Gemini CLI call, then validate and repair it."""
     logger.info(f"Generating {language} code for: {task}")
     
-    # Detect if this is a REST API request
-    is_api = any(keyword in task.lower() for keyword in ["api", "rest", "endpoint", "flask", "fastapi", "express"])
+    result = _run_generation(_build_generate_prompt(task, language, complexity))
     
-    # Build the prompt based on task type
-    if is_api and language == "python":
-        prompt = f"""Generate a complete Python REST API using FastAPI for the following requirement:
-
-{task}
+    if result["success"]:
+        return finish_generation(result["output"], task, language, complexity)
+    if result.get("partial_output") and REPAIR_ATTEMPTS > 0:
+        # Timed out part-way: continue from what was produced
+        logger.warning(f"Generation failed ({result['error']}), continuing from partial output")
+        return finish_generation(result["partial_output"], task, language, complexity, complete=False)
+    return {
+        "success": False,
+        "error": result["error"],
+        "task": task
+    }
 
-Requirements:
-- Use FastAPI framework
-- Include proper error handling
-- Add input validation with Pydantic models
-- Include authentication if mentioned
-- Add docstrings and comments
-- Make it production-ready
 
-Provide only the complete, runnable code without explanations."""
+def finish_generation(output: str, task: str, language: str, complexity: str,
+                      complete: bool = True) -> Dict[str, Any]:
+    """
+    Turn raw generation output into a generate_code result.
     
-    elif is_api and language == "javascript":
-        prompt = f"""Generate a complete Node.js REST API using Express for the following requirement:
-
-{task}
+    Markdown fences are removed and the code is validated and repaired, so
+    streamed and single-call generation return the same code.
+    
+    Args:
+        output: Text produced by the CLI
+        complete: False when the output was cut off
+    """
+    code, fenced_complete = validation.strip_fences(output, language)
+    code, report = _validate_and_repair(code, complete and fenced_complete, task, language)
+    return {
+        "success": True,
+        "code": code,
+        "language": language,
+        "task": task,
+        "complexity": complexity,
+        "validation": report
+    }
 
-Requirements:
-- Use Express framework
-- Include proper error handling
-- Add input validation
-- Include authentication if mentioned
-- Add comments
-- Make it production-ready
 
-Provide only the complete, runnable code without explanations."""
+def _validate_and_repair(code: str, complete: bool, task: str, language: str) -> Tuple[str, Dict[str, Any]]:
+    """
+    Syntax-check generated code and fix it with targeted follow-up calls.
     
-    else:
-        prompt = f"""Generate {complexity} {language} code for the following task:
-
-{task}
+    Truncated code gets a continuation request showing only its last lines;
+    code that does not parse gets a repair request for just the top-level
+    block holding the error. Up to REPAIR_ATTEMPTS follow-ups are made.
+    
+    Returns:
+        (code, report) where report has the final 'status' (ok, unchecked,
+        truncated or invalid), the number of 'repairs' made and, if the
+        code is still broken, the remaining 'error'
+    """
+    check = validation.validate(code, language, complete)
+    label = validation.normalize_language(language) or language
+    repairs = 0
+    
+    while not check.ok and repairs < REPAIR_ATTEMPTS:
+        kind = "continue" if check.status == validation.TRUNCATED else "repair"
+        if kind == "continue":
+            kept, tail = validation.continuation_point(code)
+            prompt = prompts.render("generate.continue", language=language, task=task, tail=tail)
+        else:
+            lines = code.split("\n")
+            start, end = validation.enclosing_block(code, check.line) if check.line else (1, len(lines))
+            error = f"line {check.line - start + 1}: {check.message}" if check.line else check.message
+            prompt = prompts.render("generate.repair", language=language, block="\n".join(lines[start - 1:end]),
+                                    error=error)
+        logger.info(f"Generated {language} code is {check.status} ({check.message}), requesting {kind}")
+        
+        result = _run_generation(prompt)
+        repairs += 1
+        output = result["output"] if result["success"] else result.get("partial_output")
+        if not output:
+            CODE_REPAIRS.inc(language=label, kind=kind, outcome="error")
+            break
+        
+        text, text_complete = validation.strip_fences(output, language)
+        if kind == "continue":
+            code = validation.stitch(kept, text)
+            complete = text_complete and result["success"]
+        else:
+            repaired = validation.splice(code, start, end, text)
+            if repaired == code:
+                CODE_REPAIRS.inc(language=label, kind=kind, outcome="unchanged")
+                break
+            code = repaired
+        check = validation.validate(code, language, complete)
+        CODE_REPAIRS.inc(language=label, kind=kind, outcome="fixed" if check.ok else "failed")
+    
+    report: Dict[str, Any] = {"status": check.status, "repairs": repairs}
+    if not check.ok:
+        report["error"] = f"line {check.line}: {check.message}" if check.line else check.message
+    return code, report
 
-Requirements:
-- Write clean, well-documented code
-- Include error handling
-- Add comments explaining key logic
-- Follow best practices for {language}
-- Make it production-ready
 
-Provide only the complete, runnable code without explanations."""
+def stream_code_with_cli(task: str, language: str = "python", complexity: str = "medium") -> Iterator[Dict[str, Any]]:
+    """
+    Generate code using Gemini CLI, yielding output as it is produced.
     
-    # Execute CLI command
-    cli = GeminiCLIWrapper()
-    result = cli.execute_cli_command(prompt)
+    Args:
+        task: Description of what code to generate
+        language: Programming language (python, javascript, go)
+        complexity: Complexity level (simple, medium, complex)
+        
+    Yields:
+        Dicts with 'event' and 'data' keys: one 'chunk' event per line of
+        generated code, then a single 'metadata' event (on success) or
+        'error' event carrying timing information
+    """
+    logger.info(f"Streaming {language} code for: {task}")
     
-    if result["success"]:
-        return {
-            "success": True,
-            "code": result["output"],
-            "language": language,
-            "task": task,
-            "complexity": complexity
-        }
-    else:
-        return {
-            "success": False,
-            "error": result["error"],
-            "task": task
+    start_time = time.perf_counter()
+    first_chunk_time = None
+    lines = 0
+    size = 0
+    
+    try:
+        cli = GeminiCLIWrapper()
+    except ValueError as e:
+        yield {"event": "error", "data": {"success": False, "error": str(e), "task": task}}
+        return
+    
+    prompt = _build_generate_prompt(task, language, complexity)
+    
+    for item in cli.stream_cli_command(prompt, tool="generate_code"):
+        if item["type"] == "chunk":
+            if first_chunk_time is None:
+                first_chunk_time = time.perf_counter() - start_time
+            lines += 1
+            size += len(item["data"])
+            yield {"event": "chunk", "data": {"text": item["data"]}}
+            continue
+        
+        timing = {
+            "time_to_first_chunk": round(first_chunk_time, 4) if first_chunk_time is not None else None,
+            "total_time": round(time.perf_counter() - start_time, 4),
+            "lines": lines,
+            "bytes": size
         }
-
+        if item["success"]:
+            yield {
+                "event": "metadata",
+                "data": {
+                    "success": True,
+                    "language": language,
+                    "task": task,
+                    "complexity": complexity,
+                    **timing
+                }
+            }
+        else:
+            yield {
+                "event": "error",
+                "data": {"success": False, "error": item["error"], "task": task, **timing}
+            }
 
 
 def analyze_code_with_cli(code: str, analysis_type: str = "security") -> Dict[str, Any]:
     """
     Analyze code using Gemini CLI.
     
+    Large inputs are transparently split and analyzed chunk by chunk
+    (see analyze_code_chunked). Security analyses first run a local static
+    pre-pass (see analyze_security).
+    
     Args:
         code: Code snippet to analyze
         analysis_type: Type of analysis (security, performance, style, all)
@@ -184,116 +475,156 @@ def analyze_code_with_cli(code: str, analysis_type: str = "security") -> Dict[st
     Returns:
         Dict with analysis results in JSON format
     """
+    return registry.execute("analyze_code", code=code, analysis_type=analysis_type).data
+
+
+def _analyze_code(code: str, analysis_type: str) -> Dict[str, Any]:
+    """Pick the analysis implementation for the input."""
+    if analysis_type == "security" and STATIC_PREPASS:
+        return analyze_security(code, analysis_type)
+    if estimate_tokens(code) > ANALYSIS_CHUNK_TOKENS:
+        return analyze_code_chunked(code, analysis_type)
+    return _analyze_code_once(code, analysis_type)
+
+
+def analyze_security(code: str, analysis_type: str = "security") -> Dict[str, Any]:
+    """
+    Security analysis with a local static pre-pass.
+    
+    Deterministic findings (eval/exec, shell commands, hardcoded secrets,
+    ...) come from local AST and regex checks and are passed to the LLM as
+    context. Only the statements the pre-pass cannot settle are sent, with
+    docstrings and literal constants blanked out. The LLM call is skipped
+    only when the code is provably trivial (imports and literal
+    definitions); the result then says it was not reviewed rather than
+    reporting the code as clean. stream_analysis_with_cli returns the local
+    findings before the LLM answers.
+    
+    Args:
+        code: Code snippet to analyze
+        analysis_type: Accepted for symmetry with the other analyzers
+        
+    Returns:
+        Dict with analysis results, plus 'prepass' statistics
+    """
+    report = static_analysis.scan(code)
+    if not report.needs_llm:
+        CACHE_HITS.inc(source="static", tool="analyze_code", analysis_type="security")
+        logger.info(f"Static pre-pass: trivial code, no LLM call ({len(report.findings)} findings)")
+        return report.to_result()
+    
+    logger.info(f"Static pre-pass found {len(report.findings)} issue(s); "
+                f"sending {report.review_units}/{report.units} statements to the LLM")
+    if estimate_tokens(report.llm_code) > ANALYSIS_CHUNK_TOKENS:
+        llm_result = analyze_code_chunked(report.llm_code, "security", prepass=report)
+    else:
+        llm_result = _analyze_code_once(report.llm_code, "security", context=report.context())
+    return static_analysis.combine(report, llm_result)
+
+
+def stream_analysis_with_cli(code: str, analysis_type: str = "security") -> Iterator[Dict[str, Any]]:
+    """
+    Analyze code, yielding the local pre-pass findings before the LLM result.
+    
+    Args:
+        code: Code snippet to analyze
+        analysis_type: Type of analysis (security, performance, style, all)
+        
+    Yields:
+        Dicts with 'event' and 'data' keys: for security analyses with the
+        pre-pass enabled, a 'findings' event with the local findings as soon
+        as they are known, then a single 'result' event carrying what
+        analyze_code_with_cli returns
+    """
+    if analysis_type == "security" and STATIC_PREPASS:
+        # analyze_code_with_cli scans again; the pre-pass takes milliseconds
+        report = static_analysis.scan(code)
+        yield {
+            "event": "findings",
+            "data": {
+                "severity": report.severity,
+                "vulnerabilities": [dict(finding) for finding in report.findings],
+                "prepass": report.summary(),
+            }
+        }
+    yield {"event": "result", "data": analyze_code_with_cli(code, analysis_type)}
+
+
+def analyze_code_chunked(
+    code: str,
+    analysis_type: str = "security",
+    max_tokens_per_chunk: int = ANALYSIS_CHUNK_TOKENS,
+    max_workers: int = ANALYSIS_MAX_WORKERS,
+    prepass: Optional[static_analysis.StaticReport] = None
+) -> Dict[str, Any]:
+    """
+    Analyze a large source file as concurrently processed chunks.
+    
+    Python sources are split at function/class boundaries so each prompt
+    stays within the token budget; findings are merged and their line
+    numbers remapped to the original file.
+    
+    Args:
+        code: Source code to analyze
+        analysis_type: Type of analysis (security, performance, style, all)
+        max_tokens_per_chunk: Approximate token budget per chunk
+        max_workers: Maximum number of concurrent Gemini CLI calls
+        prepass: Static pre-pass report for the code; each chunk's prompt
+            lists the local findings inside that chunk, and chunks made
+            only of settled statements are skipped
+        
+    Returns:
+        Dict with merged analysis results and the number of chunks analyzed
+    """
+    chunks = split_source(code, max_tokens_per_chunk)
+    if prepass is not None:
+        # Chunks holding only settled (blanked) statements need no LLM call
+        chunks = [chunk for chunk in chunks if chunk.code.strip()]
+    if len(chunks) == 1:
+        if prepass is None:
+            return _analyze_code_once(code, analysis_type)
+        return _analyze_code_once(code, analysis_type, context=prepass.context())
+    
+    logger.info(f"Analyzing code in {len(chunks)} chunks for: {analysis_type}")
+    
+    def analyze_chunk(chunk):
+        if prepass is None:
+            return _analyze_code_once(chunk.code, analysis_type)
+        context = prepass.context(chunk.line_offset, chunk.code.count("\n") + 1)
+        return _analyze_code_once(chunk.code, analysis_type, context=context)
+    
+    with ThreadPoolExecutor(max_workers=min(max_workers, len(chunks))) as pool:
+        futures = [(chunk.line_offset, pool.submit(analyze_chunk, chunk)) for chunk in chunks]
+        results = [(offset, future.result()) for offset, future in futures]
+    
+    return merge_analyses(results, analysis_type)
+
+
+def _analyze_code_once(code: str, analysis_type: str, context: Optional[str] = None) -> Dict[str, Any]:
+    """
+    Analyze code with a single Gemini CLI call.
+    
+    ``context`` lists findings already reported by the static pre-pass
+    (security analysis only).
+    """
     logger.info(f"Analyzing code for: {analysis_type}")
     
-    # Build analysis prompt
-    if analysis_type == "security":
-        prompt = f"""Analyze this code for security vulnerabilities:
-
-```
-{code}
-```
-
-Look for:
-- Use of dangerous functions (exec, eval, etc.)
-- SQL injection vulnerabilities
-- Command injection risks
-- Insecure deserialization
-- Hardcoded credentials
-- Path traversal issues
-- XSS vulnerabilities
-
-Return your findings as JSON with this structure:
-{{
-  "severity": "high|medium|low",
-  "vulnerabilities": [
-    {{
-      "type": "vulnerability type",
-      "line": "line number or range",
-      "description": "detailed description",
-      "recommendation": "how to fix"
-    }}
-  ],
-  "summary": "overall security assessment"
-}}"""
-    
-    elif analysis_type == "performance":
-        prompt = f"""Analyze this code for performance issues:
-
-```
-{code}
-```
-
-Look for:
-- Inefficient algorithms
-- Memory leaks
-- Unnecessary loops
-- Database query optimization
-- Caching opportunities
-- Resource management
-
-Return your findings as JSON with this structure:
-{{
-  "performance_score": "1-10",
-  "issues": [
-    {{
-      "type": "issue type",
-      "line": "line number or range",
-      "description": "detailed description",
-      "recommendation": "how to optimize"
-    }}
-  ],
-  "summary": "overall performance assessment"
-}}"""
-    
-    elif analysis_type == "style":
-        prompt = f"""Analyze this code for style and best practices:
-
-```
-{code}
-```
-
-Look for:
-- Code formatting issues
-- Naming conventions
-- Documentation quality
-- Code organization
-- Best practice violations
-
-Return your findings as JSON with this structure:
-{{
-  "style_score": "1-10",
-  "issues": [
-    {{
-      "type": "issue type",
-      "line": "line number or range",
-      "description": "detailed description",
-      "recommendation": "how to improve"
-    }}
-  ],
-  "summary": "overall style assessment"
-}}"""
-    
-    else:  # all
-        prompt = f"""Perform a comprehensive code analysis covering security, performance, and style:
-
-```
-{code}
-```
-
-Return your findings as JSON with this structure:
-{{
-  "security": {{"severity": "...", "issues": [...]}},
-  "performance": {{"score": "...", "issues": [...]}},
-  "style": {{"score": "...", "issues": [...]}},
-  "overall_summary": "comprehensive assessment"
-}}"""
+    # Build analysis prompt; unknown types get the comprehensive analysis
+    if context is not None and analysis_type == "security":
+        prompt = prompts.render("analyze.security_followup", code=code, findings=context)
+    else:
+        template = analysis_type if analysis_type in ("security", "performance", "style") else "all"
+        prompt = prompts.render(f"analyze.{template}", code=code)
+    
+    labels = {"tool": "analyze_code", "analysis_type": analysis_type}
+    PROMPT_SIZE.observe(len(prompt.encode("utf-8")), **labels)
     
     # Execute CLI command
     cli = GeminiCLIWrapper()
-    result = cli.execute_cli_command(prompt)
+    result = cli.execute_cli_command(prompt, tool="analyze_code")
     
     if result["success"]:
+        RESPONSE_SIZE.observe(len(result["output"].encode("utf-8")), **labels)
         # Try to parse JSON from output
         try:
             # Extract JSON from markdown code blocks if present
@@ -324,3 +655,23 @@ Return your findings as JSON with this structure:
             "error": result["error"],
             "analysis_type": analysis_type
         }
+
+
+registry.register("generate_code", _generate_code)
+registry.register("analyze_code", _analyze_code)
+
+# Public tool functions by name
+AVAILABLE_TOOLS = {
+    "generate_code": generate_code_with_cli,
+    "analyze_code": analyze_code_with_cli
+}
+
+
+def get_tool(tool_name: str) -> Optional[Callable[..., Dict[str, Any]]]:
+    """Retrieve a tool function by name, or None if there is none."""
+    return AVAILABLE_TOOLS.get(tool_name)
+
+
+def list_available_tools() -> List[str]:
+    """Names of all available tools."""
+    return list(AVAILABLE_TOOLS)
@@ -0,0 +1,227 @@
+"""Lightweight Prometheus-compatible metrics (counters and histograms)."""
+
+import bisect
+import threading
+import time
+from contextlib import contextmanager
+from typing import Dict, Iterator, List, Sequence, Tuple
+
+LATENCY_BUCKETS = (0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0, 20.0, 30.0, 60.0, 120.0)
+SPAWN_BUCKETS = (0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0)
+QUEUE_BUCKETS = (0.001, 0.005, 0.01, 0.05, 0.1, 0.5, 1.0, 5.0, 10.0, 30.0)
+LOOP_LAG_BUCKETS = (0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0)
+SIZE_BUCKETS = (256, 1024, 4096, 16384, 65536, 262144, 1048576, 4194304)
+
+
+def _format_value(value: float) -> str:
+    if value == float("inf"):
+        return "+Inf"
+    if float(value).is_integer():
+        return str(int(value))
+    return repr(float(value))
+
+
+def _escape(value: str) -> str:
+    return str(value).replace("\\", "\\\\").replace("\n", "\\n").replace('"', '\\"')
+
+
+def _format_labels(names: Sequence[str], values: Sequence[str]) -> str:
+    if not names:
+        return ""
+    pairs = ",".join(f'{name}="{_escape(value)}"' for name, value in zip(names, values))
+    return "{" + pairs + "}"
+
+
+class _Metric:
+    """Base class holding per-label-set series."""
+
+    kind = ""
+
+    def __init__(self, name: str, documentation: str, labelnames: Sequence[str] = ()):
+        self.name = name
+        self.documentation = documentation
+        self.labelnames = tuple(labelnames)
+        self._lock = threading.Lock()
+        self._series: Dict[Tuple[str, ...], object] = {}
+
+    def _key(self, labels: Dict[str, str]) -> Tuple[str, ...]:
+        if set(labels) != set(self.labelnames):
+            raise ValueError(f"{self.name} expects labels {self.labelnames}, got {tuple(labels)}")
+        return tuple(str(labels[name]) for name in self.labelnames)
+
+    @property
+    def family(self) -> str:
+        """Name the HELP and TYPE lines declare; every sample starts with it."""
+        return self.name
+
+    def render(self) -> List[str]:
+        lines = [f"# HELP {self.family} {self.documentation}", f"# TYPE {self.family} {self.kind}"]
+        with self._lock:
+            series = sorted(self._series.items())
+        for key, value in series:
+            lines.extend(self._render_series(key, value))
+        return lines
+
+    def _render_series(self, key: Tuple[str, ...], value: object) -> List[str]:
+        raise NotImplementedError
+
+
+class Counter(_Metric):
+    """Monotonically increasing counter."""
+
+    kind = "counter"
+
+    @property
+    def family(self) -> str:
+        # Text format 0.0.4 declares a counter under its sample name, as prometheus_client does
+        return f"{self.name}_total"
+
+    def inc(self, amount: float = 1.0, **labels: str) -> None:
+        key = self._key(labels)
+        with self._lock:
+            self._series[key] = self._series.get(key, 0.0) + amount
+
+    def value(self, **labels: str) -> float:
+        with self._lock:
+            return self._series.get(self._key(labels), 0.0)
+
+    def _render_series(self, key, value):
+        return [f"{self.family}{_format_labels(self.labelnames, key)} {_format_value(value)}"]
+
+
+class Histogram(_Metric):
+    """Cumulative histogram with fixed bucket boundaries."""
+
+    kind = "histogram"
+
+    def __init__(self, name: str, documentation: str, labelnames: Sequence[str] = (),
+                 buckets: Sequence[float] = LATENCY_BUCKETS):
+        super().__init__(name, documentation, labelnames)
+        self.buckets = tuple(sorted(buckets))
+
+    def observe(self, value: float, **labels: str) -> None:
+        key = self._key(labels)
+        index = bisect.bisect_left(self.buckets, value)
+        with self._lock:
+            series = self._series.get(key)
+            if series is None:
+                # Per-bucket counts (last slot is +Inf), sum, count
+                series = self._series[key] = [[0] * (len(self.buckets) + 1), 0.0, 0]
+            series[0][index] += 1
+            series[1] += value
+            series[2] += 1
+
+    @contextmanager
+    def time(self, **labels: str) -> Iterator[None]:
+        """Observe the wall-clock duration of a block."""
+        start = time.perf_counter()
+        try:
+            yield
+        finally:
+            self.observe(time.perf_counter() - start, **labels)
+
+    def count(self, **labels: str) -> int:
+        with self._lock:
+            series = self._series.get(self._key(labels))
+            return series[2] if series else 0
+
+    def _render_series(self, key, value):
+        counts, total, count = value
+        lines = []
+        cumulative = 0
+        for bound, bucket_count in zip(self.buckets + (float("inf"),), counts):
+            cumulative += bucket_count
+            labels = _format_labels(self.labelnames + ("le",), key + (_format_value(bound),))
+            lines.append(f"{self.name}_bucket{labels} {cumulative}")
+        labels = _format_labels(self.labelnames, key)
+        lines.append(f"{self.name}_sum{labels} {_format_value(total)}")
+        lines.append(f"{self.name}_count{labels} {count}")
+        return lines
+
+
+class MetricsRegistry:
+    """Collection of metrics rendered together in Prometheus text format."""
+
+    def __init__(self):
+        self._metrics: List[_Metric] = []
+
+    def counter(self, name: str, documentation: str, labelnames: Sequence[str] = ()) -> Counter:
+        metric = Counter(name, documentation, labelnames)
+        self._metrics.append(metric)
+        return metric
+
+    def histogram(self, name: str, documentation: str, labelnames: Sequence[str] = (),
+                  buckets: Sequence[float] = LATENCY_BUCKETS) -> Histogram:
+        metric = Histogram(name, documentation, labelnames, buckets)
+        self._metrics.append(metric)
+        return metric
+
+    def render(self) -> str:
+        lines = []
+        for metric in self._metrics:
+            lines.extend(metric.render())
+        return "\n".join(lines) + "\n"
+
+
+REGISTRY = MetricsRegistry()
+
+TOOL_LATENCY = REGISTRY.histogram(
+    "agent_tool_latency_seconds", "End-to-end tool execution time.",
+    ("tool", "analysis_type"), LATENCY_BUCKETS
+)
+BACKEND_LATENCY = REGISTRY.histogram(
+    "agent_tool_backend_seconds", "Time spent in a tool implementation, excluding cache and coalesced hits.",
+    ("tool", "analysis_type"), LATENCY_BUCKETS
+)
+SUBPROCESS_SPAWN = REGISTRY.histogram(
+    "agent_subprocess_spawn_seconds", "Time to start the Gemini CLI process.",
+    ("tool",), SPAWN_BUCKETS
+)
+QUEUE_WAIT = REGISTRY.histogram(
+    "agent_queue_wait_seconds", "Time a request waited before its tool started executing.",
+    ("tool", "analysis_type"), QUEUE_BUCKETS
+)
+PROMPT_SIZE = REGISTRY.histogram(
+    "agent_prompt_bytes", "Size of prompts sent to Gemini CLI.",
+    ("tool", "analysis_type"), SIZE_BUCKETS
+)
+RESPONSE_SIZE = REGISTRY.histogram(
+    "agent_response_bytes", "Size of Gemini CLI output.",
+    ("tool", "analysis_type"), SIZE_BUCKETS
+)
+RETRIES = REGISTRY.counter(
+    "agent_tool_retries", "Backend call retries.",
+    ("tool", "analysis_type")
+)
+CACHE_HITS = REGISTRY.counter(
+    "agent_tool_cache_hits", "Tool calls answered without a new backend execution.",
+    ("tool", "analysis_type", "source")
+)
+TOOL_CALLS = REGISTRY.counter(
+    "agent_tool_calls", "Tool calls by outcome.",
+    ("tool", "analysis_type", "status")
+)
+CODE_REPAIRS = REGISTRY.counter(
+    "agent_code_repairs", "Follow-up calls made to complete or fix generated code.",
+    ("language", "kind", "outcome")
+)
+TENANT_REQUESTS = REGISTRY.counter(
+    "agent_tenant_requests", "Requests per tenant by admission outcome.",
+    ("tenant", "outcome")
+)
+TENANT_TOKENS = REGISTRY.counter(
+    "agent_tenant_tokens", "Estimated tokens (request plus result) charged to each tenant's quota.",
+    ("tenant",)
+)
+TENANT_QUEUE_WAIT = REGISTRY.histogram(
+    "agent_tenant_queue_wait_seconds", "Time a tenant's tool call waited in the fair queue for a slot.",
+    ("tenant",), QUEUE_BUCKETS
+)
+HEDGE_OUTCOMES = REGISTRY.counter(
+    "agent_hedge_outcomes", "Hedged calls by which model answered (primary, primary_after_hedge, fallback, failed).",
+    ("tool", "outcome")
+)
+EVENT_LOOP_LAG = REGISTRY.histogram(
+    "agent_event_loop_lag_seconds", "How late the server's event loop woke a sleeping monitor task.",
+    (), LOOP_LAG_BUCKETS
+)
@@ -0,0 +1,138 @@
+"""SQLite-backed state shared by every server worker process on a host."""
+
+import json
+import os
+import sqlite3
+import time
+from contextlib import contextmanager
+from typing import Any, Iterator, Optional
+
+
+def state_path(filename: str) -> str:
+    """Path of a state file inside AGENT_STATE_DIR (created on demand)."""
+    state_dir = os.getenv("AGENT_STATE_DIR", ".")
+    os.makedirs(state_dir, exist_ok=True)
+    return os.path.join(state_dir, filename)
+
+
+class SQLiteStore:
+    """
+    Base class for small SQLite stores opened in WAL mode.
+
+    WAL lets readers in other processes proceed while one process writes, so
+    several uvicorn workers can share one file. A connection is opened per
+    operation, which keeps instances safe to use from any thread.
+    """
+
+    schema = ""
+
+    def __init__(self, path: str):
+        self.path = path
+        with self._connect() as conn:
+            conn.execute("PRAGMA journal_mode=WAL")
+            conn.executescript(self.schema)
+
+    @contextmanager
+    def _connect(self) -> Iterator[sqlite3.Connection]:
+        conn = sqlite3.connect(self.path, timeout=30, isolation_level=None)
+        conn.row_factory = sqlite3.Row
+        conn.execute("PRAGMA synchronous=NORMAL")
+        try:
+            yield conn
+        finally:
+            conn.close()
+
+    @contextmanager
+    def _transaction(self) -> Iterator[sqlite3.Connection]:
+        """Connection holding the write lock until the block exits."""
+        with self._connect() as conn:
+            conn.execute("BEGIN IMMEDIATE")
+            try:
+                yield conn
+            except BaseException:
+                conn.execute("ROLLBACK")
+                raise
+            conn.execute("COMMIT")
+
+
+class SharedCache(SQLiteStore):
+    """Response cache with per-entry expiry, shared across worker processes."""
+
+    schema = """
+    CREATE TABLE IF NOT EXISTS cache (
+        key TEXT PRIMARY KEY,
+        value TEXT NOT NULL,
+        expires_at REAL NOT NULL
+    );
+    CREATE INDEX IF NOT EXISTS cache_expiry ON cache (expires_at);
+    """
+
+    def __init__(self, path: str, ttl: float = 600, max_entries: int = 10000):
+        self.ttl = ttl
+        self.max_entries = max_entries
+        super().__init__(path)
+
+    def get(self, key: str) -> Optional[Any]:
+        """Return the cached value, or None if missing or expired."""
+        with self._connect() as conn:
+            row = conn.execute(
+                "SELECT value FROM cache WHERE key = ? AND expires_at > ?", (key, time.time())
+            ).fetchone()
+        return json.loads(row["value"]) if row else None
+
+    def set(self, key: str, value: Any) -> None:
+        """Store a JSON-serializable value, evicting expired and oldest entries."""
+        now = time.time()
+        with self._transaction() as conn:
+            conn.execute(
+                "INSERT OR REPLACE INTO cache (key, value, expires_at) VALUES (?, ?, ?)",
+                (key, json.dumps(value), now + self.ttl)
+            )
+            conn.execute("DELETE FROM cache WHERE expires_at <= ?", (now,))
+            conn.execute(
+                "DELETE FROM cache WHERE key IN ("
+                "SELECT key FROM cache ORDER BY expires_at DESC LIMIT -1 OFFSET ?)",
+                (self.max_entries,)
+            )
+
+    def __len__(self) -> int:
+        with self._connect() as conn:
+            return conn.execute("SELECT COUNT(*) FROM cache WHERE expires_at > ?", (time.time(),)).fetchone()[0]
+
+
+class SharedRateLimiter(SQLiteStore):
+    """Token-bucket rate limiter whose buckets are shared across worker processes."""
+
+    schema = """
+    CREATE TABLE IF NOT EXISTS buckets (
+        key TEXT PRIMARY KEY,
+        tokens REAL NOT NULL,
+        updated_at REAL NOT NULL
+    );
+    """
+
+    def __init__(self, path: str, rate_per_minute: float, burst: Optional[float] = None):
+        self.rate = rate_per_minute / 60.0
+        self.burst = burst if burst is not None else max(1.0, rate_per_minute)
+        super().__init__(path)
+
+    def acquire(self, key: str, cost: float = 1.0) -> bool:
+        """Take ``cost`` tokens from the key's bucket; False if not enough are left."""
+        now = time.time()
+        with self._transaction() as conn:
+            row = conn.execute("SELECT tokens, updated_at FROM buckets WHERE key = ?", (key,)).fetchone()
+            tokens = self.burst
+            if row is not None:
+                tokens = min(self.burst, row["tokens"] + (now - row["updated_at"]) * self.rate)
+            allowed = tokens >= cost
+            if allowed:
+                tokens -= cost
+            conn.execute(
+                "INSERT OR REPLACE INTO buckets (key, tokens, updated_at) VALUES (?, ?, ?)",
+                (key, tokens, now)
+            )
+        return allowed
+
+    def retry_after(self, cost: float = 1.0) -> int:
+        """Seconds until an empty bucket holds ``cost`` tokens again."""
+        return max(1, int(cost / self.rate + 0.999)) if self.rate > 0 else 60
@@ -0,0 +1,83 @@
+"""Single-flight deduplication of identical concurrent calls."""
+
+import hashlib
+import json
+import threading
+from typing import Any, Callable, Dict, Tuple
+
+
+def make_cache_key(tool_name: str, **params: Any) -> str:
+    """Build a stable key for a tool invocation from its name and parameters."""
+    payload = json.dumps({"tool": tool_name, "params": params}, sort_keys=True, default=str)
+    return hashlib.sha256(payload.encode("utf-8")).hexdigest()
+
+
+class _Call:
+    """An in-flight execution that other callers can wait on."""
+
+    __slots__ = ("done", "result", "error", "waiters")
+
+    def __init__(self):
+        self.done = threading.Event()
+        self.result: Any = None
+        self.error: BaseException = None
+        self.waiters = 0
+
+
+class SingleFlight:
+    """
+    Collapse concurrent calls that share a key into one execution.
+
+    The first caller for a key runs the function; callers arriving while it
+    is still running block until it finishes and receive the same result
+    (or exception). Nothing is cached once the call completes.
+
+    Example:
+        flight = SingleFlight()
+        result, shared = flight.do(key, expensive_call, arg)
+    """
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._calls: Dict[str, _Call] = {}
+
+    def do(self, key: str, fn: Callable[..., Any], *args: Any, **kwargs: Any) -> Tuple[Any, bool]:
+        """
+        Run ``fn(*args, **kwargs)`` unless an identical call is in flight.
+
+        Returns:
+            (result, shared) where shared is True if the result came from
+            another caller's execution
+        """
+        with self._lock:
+            call = self._calls.get(key)
+            if call is not None:
+                call.waiters += 1
+                leader = False
+            else:
+                call = _Call()
+                self._calls[key] = call
+                leader = True
+
+        if not leader:
+            call.done.wait()
+            if call.error is not None:
+                raise call.error
+            return call.result, True
+
+        try:
+            call.result = fn(*args, **kwargs)
+        except BaseException as e:
+            call.error = e
+            raise
+        finally:
+            with self._lock:
+                del self._calls[key]
+            call.done.set()
+
+        return call.result, False
+
+    def in_flight(self) -> int:
+        """Number of keys currently executing."""
+        with self._lock:
+            return len(self._calls)
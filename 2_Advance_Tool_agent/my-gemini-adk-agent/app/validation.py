@@ -0,0 +1,313 @@
+"""Post-validation of generated code: fence stripping, syntax checks and repair helpers."""
+
+import ast
+import re
+from typing import List, Optional, Tuple
+
+_FENCE = re.compile(r"^[ \t]*```[ \t]*([\w+#.-]*)[ \t]*$", re.M)
+
+# Fence tags accepted for each language we can check
+LANGUAGE_TAGS = {
+    "python": {"python", "py", "python3"},
+    "javascript": {"javascript", "js", "jsx", "node", "typescript", "ts", "tsx"},
+}
+
+# Python syntax errors that mean the source simply stops too early; the
+# last one only counts when reported on the final line
+_TRUNCATION_MESSAGES = ("EOF", "never closed", "unterminated triple-quoted")
+_TRUNCATED_AT_END_MESSAGES = ("expected an indented block",)
+
+# Tokens after which a '/' starts a regular expression literal in JavaScript
+_REGEX_PREFIX_CHARS = set("(,=:[!&|?{};+-*%<>~^")
+_REGEX_PREFIX_WORDS = {"return", "typeof", "case", "do", "else", "in", "of", "new", "delete", "void", "throw"}
+_CLOSERS = {")": "(", "]": "[", "}": "{"}
+
+OK = "ok"
+TRUNCATED = "truncated"
+INVALID = "invalid"
+UNCHECKED = "unchecked"
+
+
+class ValidationResult:
+    """Outcome of checking one piece of generated code."""
+
+    __slots__ = ("status", "line", "message")
+
+    def __init__(self, status: str, line: Optional[int] = None, message: Optional[str] = None):
+        self.status = status
+        self.line = line  # 1-based line of the problem, if known
+        self.message = message
+
+    @property
+    def ok(self) -> bool:
+        return self.status in (OK, UNCHECKED)
+
+    def __repr__(self) -> str:
+        return f"ValidationResult({self.status!r}, line={self.line}, message={self.message!r})"
+
+
+def normalize_language(language: str) -> Optional[str]:
+    """Map a language name to the key of a checker in LANGUAGE_TAGS, if any."""
+    language = (language or "").lower()
+    for name, tags in LANGUAGE_TAGS.items():
+        if language == name or language in tags:
+            return name
+    return None
+
+
+def strip_fences(text: str, language: str = "") -> Tuple[str, bool]:
+    """
+    Extract the code from CLI output that may wrap it in markdown fences.
+
+    The first fenced block tagged with the requested language (or untagged)
+    is used, falling back to the first block. Text without fences is
+    returned unchanged.
+
+    Returns:
+        (code, complete) where complete is False when the chosen block was
+        opened but never closed, i.e. the output was cut off
+    """
+    fences = list(_FENCE.finditer(text))
+    if not fences:
+        return text.strip("\n"), True
+    if len(fences) == 1 and not text[fences[0].end():].strip():
+        # Only a closing fence, as at the end of a continuation
+        return text[:fences[0].start()].strip("\n"), True
+
+    tags = LANGUAGE_TAGS.get(normalize_language(language) or "", set())
+    blocks = []
+    for index in range(0, len(fences), 2):
+        opening = fences[index]
+        closing = fences[index + 1] if index + 1 < len(fences) else None
+        body = text[opening.end() + 1:closing.start() if closing else len(text)]
+        blocks.append((opening.group(1).lower(), body.rstrip("\n").rstrip(" \t") if closing else body, closing))
+
+    chosen = next((block for block in blocks if not block[0] or block[0] in tags), blocks[0])
+    return chosen[1].strip("\n"), chosen[2] is not None
+
+
+def check_python(code: str) -> ValidationResult:
+    """Parse Python source with ast and classify any syntax error."""
+    try:
+        ast.parse(code)
+    except SyntaxError as e:
+        message = e.msg or "invalid syntax"
+        last_line = len(code.rstrip().split("\n"))
+        truncated = any(marker in message for marker in _TRUNCATION_MESSAGES) or (
+            any(marker in message for marker in _TRUNCATED_AT_END_MESSAGES) and (e.lineno or 0) >= last_line
+        )
+        return ValidationResult(TRUNCATED if truncated else INVALID, e.lineno, message)
+    except ValueError as e:  # e.g. null bytes
+        return ValidationResult(INVALID, None, str(e))
+    return ValidationResult(OK)
+
+
+def check_javascript(code: str) -> ValidationResult:
+    """
+    Tokenize JavaScript just enough to find unbalanced brackets and
+    unterminated strings, comments, templates and regular expressions.
+    """
+    stack: List[Tuple[str, int]] = []
+    length = len(code)
+    index = 0
+    line = 1
+    previous = ""
+
+    def scan_template(position: int) -> Tuple[int, Optional[ValidationResult]]:
+        # Scan template text until the closing backtick or a '${'
+        nonlocal line
+        while position < length:
+            char = code[position]
+            if char == "\\":
+                line += code.startswith("\n", position + 1)
+                position += 2
+                continue
+            if char == "\n":
+                line += 1
+            elif char == "`":
+                return position + 1, None
+            elif code.startswith("${", position):
+                stack.append(("${", line))
+                return position + 2, None
+            position += 1
+        return position, ValidationResult(TRUNCATED, line, "unterminated template literal")
+
+    while index < length:
+        char = code[index]
+        if char == "\n":
+            line += 1
+            index += 1
+        elif char in " \t\r":
+            index += 1
+        elif code.startswith("//", index):
+            end = code.find("\n", index)
+            index = length if end < 0 else end
+        elif code.startswith("/*", index):
+            end = code.find("*/", index + 2)
+            if end < 0:
+                return ValidationResult(TRUNCATED, line, "unterminated comment")
+            line += code.count("\n", index, end)
+            index = end + 2
+        elif char in "'\"":
+            start_line = line
+            index += 1
+            while True:
+                if index >= length:
+                    return ValidationResult(TRUNCATED, start_line, "unterminated string")
+                if code[index] == "\\":
+                    line += code.startswith("\n", index + 1)
+                    index += 2
+                    continue
+                if code[index] == "\n":
+                    return ValidationResult(INVALID, start_line, "unterminated string")
+                if code[index] == char:
+                    break
+                index += 1
+            index += 1
+            previous = "string"
+        elif char == "`":
+            index, error = scan_template(index + 1)
+            if error:
+                return error
+            previous = "string"
+        elif char == "/" and (not previous or previous in _REGEX_PREFIX_CHARS or previous in _REGEX_PREFIX_WORDS):
+            start_line = line
+            index += 1
+            in_class = False
+            while True:
+                if index >= length or code[index] == "\n":
+                    return ValidationResult(INVALID, start_line, "unterminated regular expression")
+                if code[index] == "\\":
+                    index += 2
+                    continue
+                if code[index] == "[":
+                    in_class = True
+                elif code[index] == "]":
+                    in_class = False
+                elif code[index] == "/" and not in_class:
+                    break
+                index += 1
+            index += 1
+            while index < length and (code[index].isalnum() or code[index] == "_"):
+                index += 1
+            previous = "regex"
+        elif char in "([{":
+            stack.append((char, line))
+            previous = char
+            index += 1
+        elif char in ")]}":
+            if not stack:
+                return ValidationResult(INVALID, line, f"unexpected '{char}'")
+            opener, opened_on = stack.pop()
+            if opener == "${" and char == "}":
+                index, error = scan_template(index + 1)
+                if error:
+                    return error
+                previous = "string"
+                continue
+            if opener != _CLOSERS[char]:
+                return ValidationResult(INVALID, line, f"'{char}' does not match '{opener}' on line {opened_on}")
+            previous = char
+            index += 1
+        elif char.isalnum() or char in "_$":
+            start = index
+            while index < length and (code[index].isalnum() or code[index] in "_$"):
+                index += 1
+            previous = code[start:index]
+        else:
+            previous = char
+            index += 1
+
+    if stack:
+        opener, opened_on = stack[-1]
+        return ValidationResult(TRUNCATED, opened_on, f"'{opener}' opened on line {opened_on} was never closed")
+    return ValidationResult(OK)
+
+
+CHECKERS = {"python": check_python, "javascript": check_javascript}
+
+
+def validate(code: str, language: str, complete: bool = True) -> ValidationResult:
+    """
+    Check generated code for the given language.
+
+    ``complete=False`` (an unclosed fence) marks code that parses as
+    truncated anyway, since the output was evidently cut off. Languages
+    without a checker are reported as 'unchecked'.
+    """
+    if not code.strip():
+        return ValidationResult(TRUNCATED if not complete else INVALID, 1, "no code in output")
+    checker = CHECKERS.get(normalize_language(language) or "")
+    if checker is None:
+        return ValidationResult(UNCHECKED if complete else TRUNCATED)
+    result = checker(code)
+    if result.status == OK and not complete:
+        return ValidationResult(TRUNCATED, len(code.split("\n")), "output ended inside a code block")
+    return result
+
+
+def continuation_point(code: str, tail_lines: int = 40) -> Tuple[str, str]:
+    """
+    Split truncated code for a continuation request.
+
+    The last line may be cut mid-way, so it is dropped and the model is asked
+    to carry on from there.
+
+    Returns:
+        (kept, tail) where kept is the code to keep and tail its last
+        ``tail_lines`` lines, shown to the model as context
+    """
+    lines = code.rstrip("\n").split("\n")
+    kept = lines[:-1] if len(lines) > 1 else lines
+    return "\n".join(kept), "\n".join(kept[-tail_lines:])
+
+
+def stitch(kept: str, continuation: str) -> str:
+    """
+    Append a continuation, dropping any lines it repeats from the end of kept.
+
+    Only overlaps containing a substantial line count, so a repeated lone
+    brace or blank line is kept.
+    """
+    kept_lines = kept.split("\n")
+    new_lines = continuation.strip("\n").split("\n")
+    overlap = 0
+    for size in range(min(len(kept_lines), len(new_lines)), 0, -1):
+        repeated = [line.rstrip() for line in new_lines[:size]]
+        if [line.rstrip() for line in kept_lines[-size:]] == repeated and any(len(line.strip()) > 3 for line in repeated):
+            overlap = size
+            break
+    return "\n".join(kept_lines + new_lines[overlap:])
+
+
+def _starts_block(line: str) -> bool:
+    """Whether a line begins a new top-level statement."""
+    if not line or line[0] in " \t#" or line.startswith(("}", ")", "]")):
+        return False
+    word = re.match(r"[A-Za-z_]*", line).group()
+    return word not in ("else", "elif", "except", "finally", "catch")
+
+
+def enclosing_block(code: str, line: int) -> Tuple[int, int]:
+    """
+    The (start, end) 1-based line range of the top-level block holding ``line``.
+
+    Blocks begin at column-0 lines; decorators stay with what they decorate.
+    """
+    lines = code.split("\n")
+    line = max(1, min(line, len(lines)))
+    starts = []
+    for number, text in enumerate(lines, 1):
+        if _starts_block(text) and not (number > 1 and lines[number - 2].startswith("@")):
+            starts.append(number)
+    start = max((number for number in starts if number <= line), default=1)
+    end = min((number - 1 for number in starts if number > line), default=len(lines))
+    while end > start and not lines[end - 1].strip():
+        end -= 1
+    return start, end
+
+
+def splice(code: str, start: int, end: int, replacement: str) -> str:
+    """Replace lines start..end (1-based, inclusive) of code."""
+    lines = code.split("\n")
+    return "\n".join(lines[:start - 1] + replacement.strip("\n").split("\n") + lines[end:])
@@ -0,0 +1,104 @@
+#!/usr/bin/env python3
+"""
+Benchmark incremental re-analysis against analyzing the whole file again.
+
+Analyzes each of this repository's app/ modules once, then edits one
+function at a time and re-analyzes. The analysis backend is simulated: a
+call costs a fixed latency plus a per-token cost for the code it is sent,
+and calls run concurrently as in the server. For each re-analysis the
+script reports the code tokens sent and the simulated latency of
+incremental vs full re-analysis, plus the local overhead (unit splitting,
+diffing, merging).
+
+Usage:
+    python benchmarks/bench_incremental.py [--call-latency 1.0] [--per-1k-tokens 0.5]
+"""
+
+import argparse
+import ast
+import glob
+import os
+import statistics
+import sys
+import time
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, ROOT)
+
+from app.chunking import estimate_tokens  # noqa: E402
+from app.incremental import IncrementalAnalyzer, split_units  # noqa: E402
+
+DEFINITIONS = (ast.FunctionDef, ast.AsyncFunctionDef, ast.ClassDef)
+
+
+class SimulatedBackend:
+    """Records what would be sent to the LLM; returns an empty analysis at once."""
+
+    def __init__(self):
+        self.sent = []
+
+    def __call__(self, code, analysis_type):
+        self.sent.append(estimate_tokens(code))
+        return {"success": True, "analysis": {"vulnerabilities": []}, "analysis_type": analysis_type}
+
+
+def edit(code, unit):
+    """Insert a statement at the top of one function or class body."""
+    node = next(node for node in ast.parse(unit.code).body if isinstance(node, DEFINITIONS))
+    first = node.body[0]
+    lines = code.split("\n")
+    lines.insert(unit.start_line - 1 + first.lineno - 1, " " * first.col_offset + "_edited = True")
+    return "\n".join(lines)
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument("--call-latency", type=float, default=1.0, help="Fixed seconds per LLM call")
+    parser.add_argument("--per-1k-tokens", type=float, default=0.5, help="Extra seconds per 1k tokens sent")
+    parser.add_argument("--workers", type=int, default=8)
+    args = parser.parse_args()
+
+    def latency(token_counts):
+        # Calls run in parallel batches of --workers; each batch waits for its slowest call
+        ordered = sorted(token_counts, reverse=True)
+        return sum(args.call_latency + ordered[i] / 1000 * args.per_1k_tokens
+                   for i in range(0, len(ordered), args.workers))
+
+    full_tokens, incremental_tokens, full_latency, incremental_latency, overhead = [], [], [], [], []
+    for path in sorted(glob.glob(os.path.join(ROOT, "app", "*.py"))):
+        with open(path, encoding="utf-8") as f:
+            code = f.read()
+        units = split_units(code)
+        if not units:
+            continue
+        backend = SimulatedBackend()
+        analyzer = IncrementalAnalyzer(backend, max_workers=args.workers)
+        analyzer.analyze_file("bench", path, code)
+        for unit in units:
+            if unit.name == "module":
+                continue
+            edited = edit(code, unit)
+            backend.sent.clear()
+            start = time.perf_counter()
+            analyzer.analyze_file("bench", path, edited)
+            overhead.append(time.perf_counter() - start)
+            analyzer.analyze_file("bench", path, code)  # back to the original version
+
+            full = [estimate_tokens(edited)]
+            full_tokens.append(full[0])
+            incremental_tokens.append(sum(backend.sent))
+            full_latency.append(latency(full))
+            incremental_latency.append(latency(backend.sent))
+
+    print(f"{len(full_tokens)} single-function edits across app/*.py")
+    print(f"  {'':<14}{'tokens p50':>12}{'latency p50 s':>15}{'latency max s':>15}")
+    print(f"  {'full':<14}{statistics.median(full_tokens):>12.0f}{statistics.median(full_latency):>15.2f}"
+          f"{max(full_latency):>15.2f}")
+    print(f"  {'incremental':<14}{statistics.median(incremental_tokens):>12.0f}"
+          f"{statistics.median(incremental_latency):>15.2f}{max(incremental_latency):>15.2f}")
+    print(f"  local overhead: median {statistics.median(overhead) * 1000:.2f} ms, "
+          f"max {max(overhead) * 1000:.2f} ms")
+
+
+if __name__ == "__main__":
+    main()
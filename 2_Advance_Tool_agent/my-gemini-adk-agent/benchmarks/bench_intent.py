@@ -0,0 +1,102 @@
+#!/usr/bin/env python3
+"""
+Benchmark intent classification against the previous keyword scans.
+
+Reports per-request latency and accuracy on tests/fixtures/intent_cases.json.
+The legacy substring scans are faster (roughly 3.5us vs 5.5us per request
+here); the classifier trades that for whole-word matching and precedence
+of explicit words, which the legacy scans get wrong on a fifth of the cases.
+
+Usage:
+    python benchmarks/bench_intent.py [--iterations N]
+"""
+
+import argparse
+import json
+import os
+import sys
+import timeit
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, ROOT)
+
+from app.intent import classify  # noqa: E402
+
+FIXTURE = os.path.join(ROOT, "tests", "fixtures", "intent_cases.json")
+
+
+def legacy_classify(user_request):
+    """The substring-scan implementation parse_intent used before app.intent."""
+    request_lower = user_request.lower()
+    generate_keywords = ["generate", "create", "build", "write", "make", "develop"]
+    analyze_keywords = ["analyze", "check", "review", "audit", "inspect", "scan", "find vulnerabilities"]
+    has_generate = any(keyword in request_lower for keyword in generate_keywords)
+    has_analyze = any(keyword in request_lower for keyword in analyze_keywords)
+
+    language = "python"
+    if "javascript" in request_lower or "js" in request_lower or "node" in request_lower:
+        language = "javascript"
+    elif "golang" in request_lower or " go " in request_lower:
+        language = "go"
+
+    complexity = "medium"
+    if "simple" in request_lower or "basic" in request_lower:
+        complexity = "simple"
+    elif "complex" in request_lower or "advanced" in request_lower:
+        complexity = "complex"
+
+    analysis_type = "security"
+    if "performance" in request_lower:
+        analysis_type = "performance"
+    elif "style" in request_lower or "best practice" in request_lower:
+        analysis_type = "style"
+    elif "all" in request_lower or "comprehensive" in request_lower:
+        analysis_type = "all"
+
+    return {
+        "generate": has_generate,
+        "analyze": has_analyze,
+        "language": language,
+        "complexity": complexity,
+        "analysis_type": analysis_type
+    }
+
+
+def action_of(features):
+    if features["generate"] and features["analyze"]:
+        return "both"
+    if features["analyze"]:
+        return "analyze"
+    return "generate"
+
+
+def accuracy(fn, cases):
+    """Fraction of cases where action, language, complexity and analysis type all match."""
+    correct = 0
+    for case in cases:
+        features = fn(case["request"])
+        expected = (case["action"], case["language"], case["complexity"], case["analysis_type"])
+        got = (action_of(features), features["language"], features["complexity"], features["analysis_type"])
+        correct += got == expected
+    return correct / len(cases)
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument("--iterations", type=int, default=2000)
+    args = parser.parse_args()
+
+    with open(FIXTURE, encoding="utf-8") as f:
+        cases = json.load(f)
+    requests = [case["request"] for case in cases]
+
+    print(f"{len(cases)} labeled requests, {args.iterations} iterations\n")
+    print(f"{'classifier':<12} {'us/request':>12} {'accuracy':>10}")
+    for name, fn in (("legacy", legacy_classify), ("compiled", classify)):
+        seconds = timeit.timeit(lambda: [fn(r) for r in requests], number=args.iterations)
+        per_request = seconds / (args.iterations * len(requests)) * 1e6
+        print(f"{name:<12} {per_request:>12.2f} {accuracy(fn, cases):>9.1%}")
+
+
+if __name__ == "__main__":
+    main()
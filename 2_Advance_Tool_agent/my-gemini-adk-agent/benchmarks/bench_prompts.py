@@ -0,0 +1,51 @@
+#!/usr/bin/env python3
+"""
+Report prompt token footprints and rendering speed.
+
+Prints the static (instruction) token cost of every registered prompt in its
+full and compact variants, and compares precompiled rendering with
+str.format on the same template text.
+
+Usage:
+    python benchmarks/bench_prompts.py [--iterations N]
+"""
+
+import argparse
+import json
+import os
+import sys
+import timeit
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, ROOT)
+
+from app import prompts  # noqa: E402
+
+GOLDEN = os.path.join(ROOT, "tests", "fixtures", "prompt_golden.json")
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument("--iterations", type=int, default=100000)
+    args = parser.parse_args()
+
+    with open(GOLDEN, encoding="utf-8") as f:
+        inputs = json.load(f)["inputs"]
+
+    print(f"{'prompt':<24}{'version':>8}{'full':>8}{'compact':>9}{'saved':>8}")
+    for name, variants in prompts.footprint().items():
+        full = variants["full"]["static_tokens"]
+        compact = variants["compact"]["static_tokens"]
+        print(f"{name:<24}{variants['full']['version']:>8}{full:>8}{compact:>9}{1 - compact / full:>8.0%}")
+
+    template = prompts.get_template("analyze.security", "full")
+    values = {field: inputs[field] for field in template.fields}
+    precompiled = timeit.timeit(lambda: template.render(**values), number=args.iterations)
+    formatted = timeit.timeit(lambda: template.text.format(**values), number=args.iterations)
+    print(f"\nrender analyze.security/full over {args.iterations} iterations:")
+    print(f"  precompiled  {precompiled / args.iterations * 1e6:.2f} us/call")
+    print(f"  str.format   {formatted / args.iterations * 1e6:.2f} us/call")
+
+
+if __name__ == "__main__":
+    main()
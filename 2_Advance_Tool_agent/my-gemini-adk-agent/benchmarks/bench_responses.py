@@ -0,0 +1,95 @@
+#!/usr/bin/env python3
+"""
+Benchmark encoding of large agent responses.
+
+Builds an /agent 'both' result around roughly 1 MB of generated code and
+compares the old path (formatted_response built eagerly, then FastAPI's
+jsonable_encoder and JSONResponse) with FastJSONResponse in full and lean
+mode.
+
+Usage:
+    python benchmarks/bench_responses.py [--size-mb N] [--iterations N]
+"""
+
+import argparse
+import os
+import sys
+import time
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, ROOT)
+os.environ.setdefault("GEMINI_API_KEY", "benchmark")
+
+from fastapi.encoders import jsonable_encoder  # noqa: E402
+from fastapi.responses import JSONResponse  # noqa: E402
+
+from app import responses  # noqa: E402
+from app.agent import AdvancedToolAgent  # noqa: E402
+from app.responses import FastJSONResponse, lean_result  # noqa: E402
+
+
+def make_result(size_mb: float):
+    """An unformatted 'both' result with ~size_mb of code and a matching raw analysis."""
+    line = "def handler_{0}(request):\n    return {{'status': 'ok', 'id': {0}, 'note': \"café\"}}\n\n"
+    code = []
+    size = 0
+    index = 0
+    while size < size_mb * 1024 * 1024:
+        code.append(line.format(index))
+        size += len(code[-1])
+        index += 1
+    code = "".join(code)
+    issues = [{"type": "style", "line": str(i), "description": "Missing docstring", "recommendation": "Add one"}
+              for i in range(0, index, 10)]
+    raw = str({"style_score": "6", "issues": issues})
+    return {
+        "success": True,
+        "action": "both",
+        "generation": {"success": True, "code": code, "language": "python", "task": "handlers"},
+        "analysis": {"success": True, "analysis": {"style_score": "6", "issues": issues},
+                     "analysis_type": "style", "raw_output": raw}
+    }
+
+
+def measure(label, fn, iterations):
+    fn()
+    start = time.perf_counter()
+    for _ in range(iterations):
+        body = fn()
+    elapsed = (time.perf_counter() - start) / iterations
+    print(f"  {label:<34}{elapsed * 1000:>9.1f} ms{len(body) / 1024 / 1024:>9.2f} MB")
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument("--size-mb", type=float, default=1.0)
+    parser.add_argument("--iterations", type=int, default=20)
+    args = parser.parse_args()
+
+    agent = AdvancedToolAgent()
+    base = make_result(args.size_mb)
+
+    def legacy():
+        result = dict(base, formatted_response=agent.format_result(base))
+        return JSONResponse(jsonable_encoder(result)).body
+
+    def fast_full():
+        result = dict(base, formatted_response=agent.format_result(base))
+        return FastJSONResponse(result).body
+
+    def fast_lean():
+        return FastJSONResponse(lean_result(base)).body
+
+    print(f"{args.size_mb:g} MB of generated code, {args.iterations} iterations "
+          f"(orjson {'available' if responses.orjson else 'not installed'})")
+    measure("eager format + JSONResponse", legacy, args.iterations)
+    measure("eager format + FastJSONResponse", fast_full, args.iterations)
+    measure("lean + FastJSONResponse", fast_lean, args.iterations)
+    if responses.orjson:
+        orjson, responses.orjson = responses.orjson, None
+        measure("lean + stdlib fallback", fast_lean, args.iterations)
+        responses.orjson = orjson
+
+
+if __name__ == "__main__":
+    main()
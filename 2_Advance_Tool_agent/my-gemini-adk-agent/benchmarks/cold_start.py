@@ -0,0 +1,187 @@
+#!/usr/bin/env python3
+"""
+Measure server cold start: time to the first successful /health and /generate.
+
+Each run starts a fresh server, either the container image
+(``--mode docker``, optionally building it first with ``--build``) or a
+local uvicorn process (``--mode local``), then polls /health until it
+returns 200 and POSTs /generate until one succeeds. Times are measured
+from just before the container or process is launched. The gemini CLI is
+replaced by the stub from load_test.py (mounted into the container) unless
+``--real`` is given, in which case GEMINI_API_KEY is passed through.
+
+Usage:
+    python benchmarks/cold_start.py [--mode docker] [--build] [--image advanced-tool-agent]
+        [--runs 5] [--latency 0] [-e AGENT_WARMUP=false] [--json results.json]
+"""
+
+import argparse
+import http.client
+import json
+import os
+import shutil
+import statistics
+import subprocess
+import sys
+import tempfile
+import time
+from typing import Dict, List, Optional
+
+from load_test import ROOT, STUB_GEMINI, free_port
+
+# PATH inside the image with the stub directory in front (see deployment/Dockerfile)
+CONTAINER_PATH = "/opt/stub:/opt/venv/bin:/opt/gemini-cli/bin:/usr/local/bin:/usr/bin:/bin"
+
+GENERATE_BODY = json.dumps({"task": "a function that reverses a string", "language": "python"})
+
+
+def request(port: int, method: str, path: str, body: Optional[str] = None, timeout: float = 60.0) -> Optional[int]:
+    """Status of one request, or None if the server is not accepting connections yet."""
+    conn = http.client.HTTPConnection("127.0.0.1", port, timeout=timeout)
+    try:
+        headers = {"Content-Type": "application/json"} if body is not None else {}
+        conn.request(method, path, body=body, headers=headers)
+        response = conn.getresponse()
+        response.read()
+        return response.status
+    except (ConnectionError, OSError, http.client.HTTPException):
+        return None
+    finally:
+        conn.close()
+
+
+def wait_for(port: int, method: str, path: str, started: float, deadline: float,
+             body: Optional[str] = None) -> float:
+    """Seconds from ``started`` until the request first returns 200."""
+    while time.perf_counter() < deadline:
+        if request(port, method, path, body) == 200:
+            return time.perf_counter() - started
+        time.sleep(0.01)
+    raise RuntimeError(f"{method} {path} did not succeed before the timeout")
+
+
+def build_image(image: str) -> float:
+    start = time.perf_counter()
+    subprocess.run(["docker", "build", "-f", "deployment/Dockerfile", "-t", image, "."], cwd=ROOT, check=True)
+    return time.perf_counter() - start
+
+
+def image_size(image: str) -> Optional[int]:
+    result = subprocess.run(["docker", "image", "inspect", "--format", "{{.Size}}", image],
+                            capture_output=True, text=True)
+    return int(result.stdout) if result.returncode == 0 else None
+
+
+def write_stub(workdir: str) -> str:
+    bin_dir = os.path.join(workdir, "bin")
+    os.makedirs(bin_dir, exist_ok=True)
+    stub = os.path.join(bin_dir, "gemini")
+    with open(stub, "w") as f:
+        f.write(STUB_GEMINI)
+    os.chmod(stub, 0o755)
+    return bin_dir
+
+
+def server_env(args) -> Dict[str, str]:
+    env = {"AGENT_CACHE_TTL": "0", "FAKE_GEMINI_LATENCY": str(args.latency)}
+    env["GEMINI_API_KEY"] = os.environ.get("GEMINI_API_KEY", "") if args.real else "cold-start"
+    for item in args.env:
+        name, _, value = item.partition("=")
+        env[name] = value
+    return env
+
+
+def run_docker(args, port: int, workdir: str) -> Dict[str, float]:
+    env = server_env(args)
+    cmd = ["docker", "run", "-d", "--rm", "-p", f"127.0.0.1:{port}:8080"]
+    if not args.real:
+        cmd += ["-v", f"{write_stub(workdir)}:/opt/stub:ro", "-e", f"PATH={CONTAINER_PATH}"]
+    for name, value in env.items():
+        cmd += ["-e", f"{name}={value}"]
+    cmd.append(args.image)
+
+    started = time.perf_counter()
+    container = subprocess.run(cmd, capture_output=True, text=True, check=True).stdout.strip()
+    try:
+        return measure(port, started, args.timeout)
+    finally:
+        subprocess.run(["docker", "rm", "-f", container], capture_output=True)
+
+
+def run_local(args, port: int, workdir: str) -> Dict[str, float]:
+    env = dict(os.environ, AGENT_STATE_DIR=os.path.join(workdir, "state"), **server_env(args))
+    if not args.real:
+        env["PATH"] = write_stub(workdir) + os.pathsep + env.get("PATH", "")
+    cmd = [sys.executable, "-m", "uvicorn", "app.server:app", "--host", "127.0.0.1",
+           "--port", str(port), "--log-level", "warning"]
+
+    started = time.perf_counter()
+    process = subprocess.Popen(cmd, cwd=ROOT, env=env, stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL)
+    try:
+        return measure(port, started, args.timeout)
+    finally:
+        process.terminate()
+        try:
+            process.wait(timeout=10)
+        except subprocess.TimeoutExpired:
+            process.kill()
+
+
+def measure(port: int, started: float, timeout: float) -> Dict[str, float]:
+    deadline = started + timeout
+    health = wait_for(port, "GET", "/health", started, deadline)
+    generate = wait_for(port, "POST", "/generate", started, deadline, GENERATE_BODY)
+    return {"health_s": health, "generate_s": generate}
+
+
+def summarize(runs: List[Dict[str, float]], key: str) -> Dict[str, float]:
+    values = [run[key] for run in runs]
+    return {"median": statistics.median(values), "min": min(values), "max": max(values)}
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument("--mode", choices=["docker", "local"], default="docker")
+    parser.add_argument("--image", default="advanced-tool-agent")
+    parser.add_argument("--build", action="store_true", help="Build the image from deployment/Dockerfile first")
+    parser.add_argument("--runs", type=int, default=5)
+    parser.add_argument("--latency", type=float, default=0.0, help="Fake gemini latency in seconds")
+    parser.add_argument("--real", action="store_true", help="Use the real gemini CLI and GEMINI_API_KEY")
+    parser.add_argument("-e", "--env", action="append", default=[], metavar="NAME=VALUE",
+                        help="Extra environment variable for the server (repeatable)")
+    parser.add_argument("--timeout", type=float, default=120.0, help="Seconds allowed per run")
+    parser.add_argument("--json", help="Also write results to this file")
+    args = parser.parse_args()
+
+    results: Dict[str, object] = {"mode": args.mode, "env": args.env}
+    if args.mode == "docker":
+        if shutil.which("docker") is None:
+            parser.error("docker is not installed; use --mode local")
+        if args.build:
+            results["build_s"] = build_image(args.image)
+            print(f"built {args.image} in {results['build_s']:.1f}s")
+        results["image"] = args.image
+        results["image_bytes"] = image_size(args.image)
+        if results["image_bytes"]:
+            print(f"image size: {results['image_bytes'] / 1e6:.0f} MB")
+
+    runner = run_docker if args.mode == "docker" else run_local
+    runs = []
+    print(f"{'run':>4}{'/health s':>12}{'/generate s':>14}")
+    for number in range(1, args.runs + 1):
+        with tempfile.TemporaryDirectory() as workdir:
+            run = runner(args, free_port(), workdir)
+        runs.append(run)
+        print(f"{number:>4}{run['health_s']:>12.3f}{run['generate_s']:>14.3f}", flush=True)
+
+    results["runs"] = runs
+    results["health_s"] = summarize(runs, "health_s")
+    results["generate_s"] = summarize(runs, "generate_s")
+    print(f"{'med':>4}{results['health_s']['median']:>12.3f}{results['generate_s']['median']:>14.3f}")
+    if args.json:
+        with open(args.json, "w") as f:
+            json.dump(results, f, indent=2)
+
+
+if __name__ == "__main__":
+    main()
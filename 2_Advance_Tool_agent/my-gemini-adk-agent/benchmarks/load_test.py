@@ -0,0 +1,288 @@
+#!/usr/bin/env python3
+"""
+Offline load test for the API server.
+
+Starts app.server under uvicorn with a stub ``gemini`` executable on PATH
+(fixed latency, canned output), then drives one endpoint with a keep-alive
+HTTP/1.1 load generator at several concurrency levels. For each level it
+reports throughput, p50/p95/p99 latency, and event-loop lag measured two
+ways: the latency of /health probes sent during the run, and the server's
+own agent_event_loop_lag_seconds histogram.
+
+No network access or API key is needed.
+
+Usage:
+    python benchmarks/load_test.py [--endpoint analyze] [--concurrency 1,8,32,64]
+        [--duration 10] [--latency 0.5] [--workers 1] [--identical] [--json results.json]
+"""
+
+import argparse
+import asyncio
+import json
+import os
+import re
+import socket
+import subprocess
+import sys
+import tempfile
+import time
+from typing import Dict, List, Optional, Tuple
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+# Endpoint -> (path, payload, field made unique per request). Unique payloads
+# keep single-flight coalescing and the response cache out of the numbers
+# unless --identical is given.
+PAYLOADS = {
+    # subprocess.run without shell=True is left to the LLM by the static pre-pass
+    "analyze": ("/analyze", {"code": "import subprocess\nsubprocess.run(user_input)\n", "analysis_type": "security"},
+                "code"),
+    "generate": ("/generate", {"task": "a function that reverses a string", "language": "python"}, "task"),
+    "agent": ("/agent", {"request": "Generate a simple Python function to add two numbers", "session_id": None},
+              "request"),
+    "health": ("/health", None, None),
+}
+
+# Prints a canned analysis (valid JSON) or code after a delay. A shell
+# script keeps the stub's own startup cost from dominating the measurement.
+STUB_GEMINI = """#!/bin/sh
+sleep "${FAKE_GEMINI_LATENCY:-0.5}"
+case "$*" in
+  *JSON*) echo '{"severity": "low", "vulnerabilities": [], "summary": "stub"}' ;;
+  *) for i in 1 2 3 4 5 6 7 8 9 10; do printf 'def step_%s(value):\n    return value + %s\n\n' "$i" "$i"; done ;;
+esac
+"""
+
+
+def percentile(values: List[float], pct: float) -> float:
+    """Nearest-rank percentile of a list (0 for an empty list)."""
+    if not values:
+        return 0.0
+    ordered = sorted(values)
+    rank = max(0, min(len(ordered) - 1, int(round(pct / 100 * len(ordered) + 0.5)) - 1))
+    return ordered[rank]
+
+
+def free_port() -> int:
+    with socket.socket() as sock:
+        sock.bind(("127.0.0.1", 0))
+        return sock.getsockname()[1]
+
+
+class HTTPConnection:
+    """Minimal keep-alive HTTP/1.1 client over asyncio streams."""
+
+    def __init__(self, host: str, port: int):
+        self.host = host
+        self.port = port
+        self.reader: Optional[asyncio.StreamReader] = None
+        self.writer: Optional[asyncio.StreamWriter] = None
+
+    async def request(self, method: str, path: str, body: Optional[bytes]) -> int:
+        if self.writer is None:
+            self.reader, self.writer = await asyncio.open_connection(self.host, self.port)
+        head = f"{method} {path} HTTP/1.1\r\nHost: {self.host}\r\n"
+        if body is not None:
+            head += f"Content-Type: application/json\r\nContent-Length: {len(body)}\r\n"
+        self.writer.write(head.encode() + b"\r\n" + (body or b""))
+        await self.writer.drain()
+
+        status_line = await self.reader.readline()
+        if not status_line:
+            raise ConnectionError("Server closed the connection")
+        status = int(status_line.split()[1])
+        length = 0
+        close = False
+        while True:
+            line = await self.reader.readline()
+            if line in (b"\r\n", b""):
+                break
+            name, _, value = line.decode("latin-1").partition(":")
+            name = name.strip().lower()
+            if name == "content-length":
+                length = int(value)
+            elif name == "connection" and value.strip().lower() == "close":
+                close = True
+        await self.reader.readexactly(length)
+        if close:
+            self.close()
+        return status
+
+    def close(self) -> None:
+        if self.writer is not None:
+            self.writer.close()
+            self.writer = None
+
+
+async def run_level(port: int, endpoint: str, concurrency: int, duration: float,
+                    identical: bool = False) -> Dict[str, float]:
+    """Run ``concurrency`` users against the endpoint for ``duration`` seconds."""
+    path, payload, unique_field = PAYLOADS[endpoint]
+    method = "GET" if payload is None else "POST"
+    sequence = iter(range(1 << 62))
+
+    def make_body() -> Optional[bytes]:
+        if payload is None:
+            return None
+        if identical or unique_field is None:
+            return json.dumps(payload).encode()
+        return json.dumps(dict(payload, **{unique_field: f"{payload[unique_field]} #{next(sequence)}"})).encode()
+
+    latencies: List[float] = []
+    probes: List[float] = []
+    errors = 0
+    deadline = time.perf_counter() + duration
+
+    async def user():
+        nonlocal errors
+        conn = HTTPConnection("127.0.0.1", port)
+        while time.perf_counter() < deadline:
+            start = time.perf_counter()
+            try:
+                status = await conn.request(method, path, make_body())
+            except (ConnectionError, OSError, asyncio.IncompleteReadError):
+                conn.close()
+                errors += 1
+                continue
+            if status == 200:
+                latencies.append(time.perf_counter() - start)
+            else:
+                errors += 1
+        conn.close()
+
+    async def prober():
+        # /health does no work, so its latency under load is dominated by
+        # how long the server's event loop takes to get to it
+        conn = HTTPConnection("127.0.0.1", port)
+        while time.perf_counter() < deadline:
+            start = time.perf_counter()
+            await conn.request("GET", "/health", None)
+            probes.append(time.perf_counter() - start)
+            await asyncio.sleep(0.1)
+        conn.close()
+
+    started = time.perf_counter()
+    await asyncio.gather(prober(), *(user() for _ in range(concurrency)))
+    elapsed = time.perf_counter() - started
+    return {
+        "concurrency": concurrency,
+        "requests": len(latencies),
+        "errors": errors,
+        "throughput": len(latencies) / elapsed,
+        "p50_ms": percentile(latencies, 50) * 1000,
+        "p95_ms": percentile(latencies, 95) * 1000,
+        "p99_ms": percentile(latencies, 99) * 1000,
+        "probe_p50_ms": percentile(probes, 50) * 1000,
+        "probe_p99_ms": percentile(probes, 99) * 1000,
+    }
+
+
+async def server_loop_lag(port: int) -> Tuple[float, float]:
+    """Current (sum, count) of the server's event loop lag histogram."""
+    reader, writer = await asyncio.open_connection("127.0.0.1", port)
+    writer.write(b"GET /metrics HTTP/1.1\r\nHost: localhost\r\nConnection: close\r\n\r\n")
+    text = (await reader.read()).decode()
+    writer.close()
+    total = re.search(r"^agent_event_loop_lag_seconds_sum (\S+)$", text, re.M)
+    count = re.search(r"^agent_event_loop_lag_seconds_count (\S+)$", text, re.M)
+    return (float(total.group(1)) if total else 0.0, float(count.group(1)) if count else 0.0)
+
+
+def start_server(port: int, workdir: str, args) -> subprocess.Popen:
+    bin_dir = os.path.join(workdir, "bin")
+    os.makedirs(bin_dir)
+    stub = os.path.join(bin_dir, "gemini")
+    with open(stub, "w") as f:
+        f.write(STUB_GEMINI)
+    os.chmod(stub, 0o755)
+
+    env = dict(
+        os.environ,
+        PATH=bin_dir + os.pathsep + os.environ.get("PATH", ""),
+        GEMINI_API_KEY="load-test",
+        FAKE_GEMINI_LATENCY=str(args.latency),
+        AGENT_STATE_DIR=os.path.join(workdir, "state"),
+        AGENT_CACHE_TTL="600" if args.cache else "0",
+        AGENT_RATE_LIMIT="0",
+    )
+    cmd = [sys.executable, "-m", "uvicorn", "app.server:app", "--host", "127.0.0.1",
+           "--port", str(port), "--workers", str(args.workers), "--log-level", "warning"]
+    log = open(os.path.join(workdir, "server.log"), "wb")
+    process = subprocess.Popen(cmd, cwd=ROOT, env=env, stdout=log, stderr=subprocess.STDOUT)
+    log.close()
+
+    deadline = time.monotonic() + 30
+    while time.monotonic() < deadline:
+        try:
+            with socket.create_connection(("127.0.0.1", port), timeout=0.5):
+                return process
+        except OSError:
+            if process.poll() is not None:
+                with open(os.path.join(workdir, "server.log")) as f:
+                    sys.stderr.write(f.read()[-2000:])
+                raise RuntimeError("Server exited during startup")
+            time.sleep(0.2)
+    process.kill()
+    raise RuntimeError("Server did not start within 30 seconds")
+
+
+async def run(args) -> List[Dict[str, float]]:
+    port = free_port()
+    results = []
+    with tempfile.TemporaryDirectory() as workdir:
+        server = start_server(port, workdir, args)
+        try:
+            await asyncio.sleep(0.5)
+            for concurrency in args.concurrency:
+                lag_before = await server_loop_lag(port)
+                result = await run_level(port, args.endpoint, concurrency, args.duration, args.identical)
+                lag_after = await server_loop_lag(port)
+                samples = lag_after[1] - lag_before[1]
+                # With several workers this is whichever worker answered /metrics
+                result["server_lag_mean_ms"] = (
+                    (lag_after[0] - lag_before[0]) / samples * 1000 if samples else 0.0
+                )
+                results.append(result)
+                print(
+                    f"{concurrency:>6}{result['requests']:>9}{result['errors']:>7}"
+                    f"{result['throughput']:>9.1f}{result['p50_ms']:>9.0f}{result['p95_ms']:>9.0f}"
+                    f"{result['p99_ms']:>9.0f}{result['probe_p50_ms']:>10.1f}{result['probe_p99_ms']:>10.1f}"
+                    f"{result['server_lag_mean_ms']:>10.1f}",
+                    flush=True
+                )
+        finally:
+            server.terminate()
+            try:
+                server.wait(timeout=10)
+            except subprocess.TimeoutExpired:
+                server.kill()
+    return results
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument("--endpoint", choices=sorted(PAYLOADS), default="analyze")
+    parser.add_argument("--concurrency", default="1,8,32,64",
+                        type=lambda value: [int(level) for level in value.split(",")])
+    parser.add_argument("--duration", type=float, default=10.0, help="Seconds per concurrency level")
+    parser.add_argument("--latency", type=float, default=0.5, help="Fake gemini latency in seconds")
+    parser.add_argument("--workers", type=int, default=1, help="uvicorn worker processes")
+    parser.add_argument("--cache", action="store_true", help="Leave the response cache enabled")
+    parser.add_argument("--identical", action="store_true",
+                        help="Send the same payload every time (measures coalescing and caching)")
+    parser.add_argument("--json", help="Also write results to this file")
+    args = parser.parse_args()
+
+    path, payload, _ = PAYLOADS[args.endpoint]
+    print(f"{'GET' if payload is None else 'POST'} {path} with fake gemini latency {args.latency}s, "
+          f"{args.workers} worker(s), {args.duration:g}s per level")
+    print(f"{'users':>6}{'ok':>9}{'errors':>7}{'req/s':>9}{'p50 ms':>9}{'p95 ms':>9}{'p99 ms':>9}"
+          f"{'lag p50':>10}{'lag p99':>10}{'srv lag':>10}")
+    results = asyncio.run(run(args))
+    if args.json:
+        with open(args.json, "w") as f:
+            json.dump(results, f, indent=2)
+
+
+if __name__ == "__main__":
+    main()
@@ -1,9 +1,16 @@
 """Comprehensive tests for the Advanced Tool Agent."""
 
+import asyncio
+import subprocess
+import sys
+import time
 import unittest
 from unittest.mock import patch, MagicMock
+
+from starlette.requests import ClientDisconnect
+
 from app.agent import AdvancedToolAgent
-from app.tools import generate_code_with_cli, analyze_code_with_cli
+from app.tools import generate_code_with_cli, analyze_code_with_cli, stream_code_with_cli
 
 
 class TestAdvancedToolAgent(unittest.TestCase):
@@ -73,6 +80,23 @@ class TestAdvancedToolAgent(unittest.TestCase):
         self.assertFalse(result["success"])
         self.assertIn("error", result)
     
+    @patch.dict('os.environ', {'GEMINI_API_KEY': 'test_key'})
+    @patch('app.tools.GeminiCLIWrapper.stream_cli_command')
+    def test_stream_code_success(self, mock_stream):
+        """Test streamed code generation emits chunks then metadata."""
+        mock_stream.return_value = iter([
+            {"type": "chunk", "data": "def hello():\n"},
+            {"type": "chunk", "data": "    print('Hello')\n"},
+            {"type": "done", "success": True, "error": None}
+        ])
+        
+        events = list(stream_code_with_cli("Create a hello world function"))
+        
+        self.assertEqual([e["event"] for e in events], ["chunk", "chunk", "metadata"])
+        self.assertEqual(events[0]["data"]["text"], "def hello():\n")
+        self.assertEqual(events[-1]["data"]["lines"], 2)
+        self.assertIn("total_time", events[-1]["data"])
+    
     @patch('app.tools.GeminiCLIWrapper.execute_cli_command')
     def test_analyze_code_security(self, mock_execute):
         """Test security analysis."""
@@ -103,6 +127,97 @@ class TestAdvancedToolAgent(unittest.TestCase):
         self.assertEqual(result["action"], "generate")
         self.assertIn("formatted_response", result)
     
+    def test_process_request_both_pipelined(self):
+        """Test pipelined generate + analyze merges per-block findings."""
+        functions = [
+            f"def f{i}(x):\n" + "".join(f"    y{j} = x + {j}\n" for j in range(20)) + "    return x\n"
+            for i in range(2)
+        ]
+        code = "\n".join(functions)
+        
+        def fake_stream(**kwargs):
+            for line in code.splitlines(keepends=True):
+                yield {"event": "chunk", "data": {"text": line}}
+            yield {"event": "metadata", "data": {"success": True, "total_time": 0.1}}
+        
+        def fake_analyze(code, analysis_type="security"):
+            return {
+                "success": True,
+                "analysis": {"severity": "low", "vulnerabilities": [{"line": "1", "type": code.split("(")[0]}]},
+                "analysis_type": analysis_type
+            }
+        
+        agent = AdvancedToolAgent(pipelined=True)
+        agent.tools["analyze_code"] = fake_analyze
+        with patch('app.agent.stream_code_with_cli', fake_stream):
+            result = agent.process_request("Generate and analyze a Python script")
+        
+        self.assertTrue(result["success"])
+        self.assertEqual(result["generation"]["code"], code.strip())
+        findings = result["analysis"]["analysis"]["vulnerabilities"]
+        self.assertEqual([(f["line"], f["type"]) for f in findings], [("1", "def f0"), ("24", "def f1")])
+        self.assertEqual(result["analysis"]["chunks"], 2)
+    
+    def test_pipelined_output_is_cleaned_like_generate_code(self):
+        """Test pipelined generation strips fences and remaps findings onto the clean code."""
+        functions = [
+            f"def f{i}(x):\n" + "".join(f"    y{j} = x + {j}\n" for j in range(20)) + "    return x\n"
+            for i in range(2)
+        ]
+        code = "\n".join(functions).strip()
+        output = f"```python\n{code}\n```\n"
+        
+        def fake_stream(**kwargs):
+            for line in output.splitlines(keepends=True):
+                yield {"event": "chunk", "data": {"text": line}}
+            yield {"event": "metadata", "data": {"success": True, "total_time": 0.1}}
+        
+        def fake_analyze(code, analysis_type="security"):
+            first = next(line for line in code.split("\n") if line.startswith("def"))
+            number = code.split("\n").index(first) + 1
+            return {
+                "success": True,
+                "analysis": {"vulnerabilities": [{"line": str(number), "type": first.split("(")[0]}]},
+                "analysis_type": analysis_type
+            }
+        
+        agent = AdvancedToolAgent(pipelined=True)
+        agent.tools["analyze_code"] = fake_analyze
+        with patch('app.agent.stream_code_with_cli', fake_stream):
+            result = agent.process_request("Generate and analyze a Python script")
+        
+        self.assertEqual(result["generation"]["code"], code)
+        self.assertEqual(result["generation"]["validation"], {"status": "ok", "repairs": 0})
+        findings = result["analysis"]["analysis"]["vulnerabilities"]
+        self.assertEqual([(f["line"], f["type"]) for f in findings], [("1", "def f0"), ("24", "def f1")])
+    
+    @patch('app.tools.GeminiCLIWrapper.execute_cli_command')
+    def test_pipelined_output_is_repaired_and_reanalyzed(self, mock_execute):
+        """Test a truncated stream is continued and the final code is analyzed."""
+        mock_execute.return_value = {"success": True, "output": "    y = x\n    return x\n```", "error": None}
+        
+        def fake_stream(**kwargs):
+            for line in ["```python\n", "def f(x):\n", "    y = x\n"]:
+                yield {"event": "chunk", "data": {"text": line}}
+            yield {"event": "metadata", "data": {"success": True, "total_time": 0.1}}
+        
+        analyzed = []
+        
+        def fake_analyze(code, analysis_type="security"):
+            analyzed.append(code)
+            return {"success": True, "analysis": {"severity": "none"}, "analysis_type": analysis_type}
+        
+        agent = AdvancedToolAgent(pipelined=True)
+        agent.tools["analyze_code"] = fake_analyze
+        with patch('app.agent.stream_code_with_cli', fake_stream):
+            result = agent.process_request("Generate and analyze a Python script")
+        
+        final = "def f(x):\n    y = x\n    return x"
+        self.assertEqual(result["generation"]["code"], final)
+        self.assertEqual(result["generation"]["validation"]["repairs"], 1)
+        self.assertEqual(analyzed[-1], final)
+        self.assertEqual(result["analysis"]["analysis"], {"severity": "none"})
+    
     def test_format_generate_response(self):
         """Test formatting of generation response."""
         result = {
@@ -132,6 +247,55 @@ class TestAdvancedToolAgent(unittest.TestCase):
         self.assertIn("security", formatted)
 
 
+class TestChunkedAnalysis(unittest.TestCase):
+    """Test cases for AST-aware chunking of large sources."""
+    
+    def setUp(self):
+        functions = [
+            f"def func{i}(a):\n" + "".join(f"    v{j} = a * {j}\n" for j in range(30)) + "    return a\n"
+            for i in range(40)
+        ]
+        self.code = "import os\n\n\n" + "\n\n".join(functions)
+    
+    def test_split_source_at_function_boundaries(self):
+        """Test chunks respect the budget, cover the file and start at a def."""
+        from app.chunking import split_source, estimate_tokens
+        chunks = split_source(self.code, max_tokens=1000)
+        
+        self.assertGreater(len(chunks), 1)
+        self.assertEqual("\n".join(c.code for c in chunks), self.code)
+        lines = self.code.split("\n")
+        for chunk in chunks[1:]:
+            self.assertLessEqual(estimate_tokens(chunk.code), 1000)
+            self.assertTrue(chunk.code.lstrip().startswith("def func"))
+            self.assertEqual(lines[chunk.start_line - 1], chunk.code.split("\n")[0])
+    
+    def test_analyze_code_chunked_remaps_lines(self):
+        """Test per-chunk findings are merged with original line numbers."""
+        from app import tools
+        
+        def fake_analyze(code, analysis_type):
+            return {
+                "success": True,
+                "analysis": {"severity": "high" if "func0(" in code else "low",
+                             "vulnerabilities": [{"line": "1-2"}]},
+                "analysis_type": analysis_type
+            }
+        
+        with patch.object(tools, "_analyze_code_once", side_effect=fake_analyze) as mock_once:
+            result = tools.analyze_code_chunked(self.code, "security", max_tokens_per_chunk=1000)
+        
+        from app.chunking import split_source
+        chunks = split_source(self.code, max_tokens=1000)
+        self.assertEqual(mock_once.call_count, len(chunks))
+        self.assertTrue(result["success"])
+        self.assertEqual(result["analysis"]["severity"], "high")
+        self.assertEqual(
+            [v["line"] for v in result["analysis"]["vulnerabilities"]],
+            [f"{c.start_line}-{c.start_line + 1}" for c in chunks]
+        )
+
+
 class TestGeminiCLIWrapper(unittest.TestCase):
     """Test cases for Gemini CLI wrapper."""
     
@@ -150,5 +314,55 @@ class TestGeminiCLIWrapper(unittest.TestCase):
                 GeminiCLIWrapper()
 
 
+class TestGenerateStream(unittest.TestCase):
+    """Test cases for the /generate/stream endpoint."""
+    
+    @patch.dict('os.environ', {'GEMINI_API_KEY': 'test_key'})
+    def test_disconnect_kills_cli_process(self):
+        """Test a client leaving mid-stream kills the CLI instead of leaving it to its timeout."""
+        from app import server
+        
+        # Stands in for a CLI that keeps producing output for a long time
+        cli = [sys.executable, "-c", "import time\nwhile True:\n    print('x = 1', flush=True)\n    time.sleep(0.05)"]
+        processes = []
+        popen = subprocess.Popen
+        
+        def spawn(*args, **kwargs):
+            processes.append(popen(*args, **kwargs))
+            return processes[-1]
+        
+        bodies = []
+        
+        async def receive():
+            await asyncio.Event().wait()
+        
+        async def send(message):
+            if message.get("body"):
+                bodies.append(message["body"])
+                if len(bodies) == 3:
+                    raise OSError("client went away")
+        
+        async def run():
+            response = await server.generate_code_stream(server.GenerateRequest(task="loop forever"))
+            try:
+                await response({"type": "http", "asgi": {"spec_version": "2.4"}}, receive, send)
+            except (ClientDisconnect, OSError):
+                pass
+            return processes[0].poll()
+        
+        start = time.monotonic()
+        with patch('app.tools.GeminiCLIWrapper._build_command', return_value=cli), \
+                patch('app.tools.subprocess.Popen', spawn):
+            returncode = asyncio.run(run())
+        for process in processes:
+            if process.poll() is None:
+                process.kill()
+                process.wait()
+        
+        self.assertEqual(len(bodies), 3)
+        self.assertIsNotNone(returncode)
+        self.assertLess(time.monotonic() - start, 5)
+
+
 if __name__ == '__main__':
     unittest.main()
@@ -0,0 +1,190 @@
+"""Tests for batch analysis of many files."""
+
+import asyncio
+import inspect
+import io
+import tarfile
+import threading
+import time
+import unittest
+from unittest.mock import patch
+
+from starlette.requests import ClientDisconnect
+
+from app.batch import BatchError, analyze_batch, extract_tarball, ndjson_lines
+from app.responses import ClosingStreamingResponse
+
+
+def make_tarball(files, mode="w:gz"):
+    buffer = io.BytesIO()
+    with tarfile.open(fileobj=buffer, mode=mode) as archive:
+        for name, content in files.items():
+            data = content if isinstance(content, bytes) else content.encode("utf-8")
+            info = tarfile.TarInfo(name)
+            info.size = len(data)
+            archive.addfile(info, io.BytesIO(data))
+        directory = tarfile.TarInfo("src")
+        directory.type = tarfile.DIRTYPE
+        archive.addfile(directory)
+    return buffer.getvalue()
+
+
+class FakeAnalyzer:
+    """Stand-in for analyze_code_with_cli with a per-code latency."""
+
+    def __init__(self, latencies=None):
+        self.latencies = latencies or {}
+        self.calls = []
+        self._lock = threading.Lock()
+
+    def __call__(self, code, analysis_type="security"):
+        with self._lock:
+            self.calls.append(code)
+        time.sleep(self.latencies.get(code, 0.05))
+        if code == "boom":
+            raise RuntimeError("backend crashed")
+        return {"success": True, "analysis": {"code": code}, "analysis_type": analysis_type}
+
+
+class TestAnalyzeBatch(unittest.TestCase):
+    """Test cases for analyze_batch."""
+
+    def test_duplicate_contents_analyzed_once(self):
+        """Test files with identical content share one analysis."""
+        analyzer = FakeAnalyzer()
+        files = [("a.py", "x = 1"), ("b.py", "y = 2"), ("copy/a.py", "x = 1")]
+        with patch('app.batch.analyze_code_with_cli', side_effect=analyzer):
+            records = list(analyze_batch(files))
+
+        self.assertEqual(sorted(analyzer.calls), ["x = 1", "y = 2"])
+        results = {r["path"]: r for r in records if r["type"] == "result"}
+        self.assertEqual(set(results), {"a.py", "b.py", "copy/a.py"})
+        self.assertEqual(results["a.py"]["sha256"], results["copy/a.py"]["sha256"])
+        self.assertEqual(results["copy/a.py"]["result"]["analysis"], {"code": "x = 1"})
+        self.assertEqual(records[-1], {**records[-1], "type": "summary", "files": 3, "unique": 2,
+                                       "succeeded": 3, "failed": 0})
+
+    def test_results_stream_in_completion_order(self):
+        """Test a fast file is reported before a slow one submitted earlier."""
+        analyzer = FakeAnalyzer({"slow": 0.5, "fast": 0.01})
+        with patch('app.batch.analyze_code_with_cli', side_effect=analyzer):
+            records = list(analyze_batch([("slow.py", "slow"), ("fast.py", "fast")]))
+
+        self.assertEqual([r.get("path") for r in records], ["fast.py", "slow.py", None])
+
+    def test_analyses_run_concurrently(self):
+        """Test wall time is close to one analysis, not the sum of all."""
+        analyzer = FakeAnalyzer({str(i): 0.2 for i in range(8)})
+        files = [(f"{i}.py", str(i)) for i in range(8)]
+        start = time.perf_counter()
+        with patch('app.batch.analyze_code_with_cli', side_effect=analyzer):
+            list(analyze_batch(files, max_workers=8))
+
+        self.assertLess(time.perf_counter() - start, 0.8)
+
+    def test_exception_becomes_failed_record(self):
+        """Test one crashing analysis does not abort the batch."""
+        with patch('app.batch.analyze_code_with_cli', side_effect=FakeAnalyzer()):
+            records = list(analyze_batch([("bad.py", "boom"), ("ok.py", "ok")]))
+
+        results = {r["path"]: r["result"] for r in records if r["type"] == "result"}
+        self.assertFalse(results["bad.py"]["success"])
+        self.assertIn("backend crashed", results["bad.py"]["error"])
+        self.assertTrue(results["ok.py"]["success"])
+        self.assertEqual(records[-1]["failed"], 1)
+
+
+class TestBatchStreaming(unittest.TestCase):
+    """Test cases for streaming batch records to a client that disconnects."""
+
+    def stream(self, spec_version, receive, send):
+        """Serve a 10-file batch; return (records generator state, analyses started)."""
+        analyzer = FakeAnalyzer()
+        records = analyze_batch([(f"{i}.py", f"x = {i}") for i in range(10)], max_workers=1, analyze=analyzer)
+        response = ClosingStreamingResponse(ndjson_lines(records), media_type="application/x-ndjson")
+        scope = {"type": "http", "asgi": {"spec_version": spec_version}}
+
+        async def run():
+            try:
+                await response(scope, receive, send)
+            except ClientDisconnect:
+                pass
+            # Checked before the event loop shuts down, which would also close the generator
+            return inspect.getgeneratorstate(records)
+
+        state = asyncio.run(run())
+        time.sleep(0.2)
+        return state, len(analyzer.calls)
+
+    def test_failed_send_cancels_pending_analyses(self):
+        """Test a send failing after a disconnect (ASGI 2.4) closes the batch at once."""
+        async def receive():
+            await asyncio.Event().wait()
+
+        async def send(message):
+            if message.get("body"):
+                raise OSError("client went away")
+
+        state, started = self.stream("2.4", receive, send)
+
+        self.assertEqual(state, inspect.GEN_CLOSED)
+        self.assertLess(started, 10)
+
+    def test_disconnect_message_cancels_pending_analyses(self):
+        """Test an http.disconnect message closes the batch at once."""
+        first_body = asyncio.Event()
+
+        async def receive():
+            await first_body.wait()
+            return {"type": "http.disconnect"}
+
+        async def send(message):
+            if message.get("body"):
+                first_body.set()
+
+        state, started = self.stream("2.3", receive, send)
+
+        self.assertEqual(state, inspect.GEN_CLOSED)
+        self.assertLess(started, 10)
+
+
+class TestExtractTarball(unittest.TestCase):
+    """Test cases for extract_tarball."""
+
+    def test_reads_text_files_only(self):
+        """Test directories, binary and oversized files are skipped."""
+        data = make_tarball({
+            "src/app.py": "print('hi')",
+            "src/logo.png": b"\x89PNG\xff\xfe",
+            "src/big.py": "x" * 100
+        })
+        files = extract_tarball(data, max_file_bytes=50)
+
+        self.assertEqual(files, [("src/app.py", "print('hi')")])
+
+    def test_uncompressed_archive(self):
+        """Test plain tar archives are accepted too."""
+        files = extract_tarball(make_tarball({"a.js": "let a = 1;"}, mode="w"))
+
+        self.assertEqual(files, [("a.js", "let a = 1;")])
+
+    def test_invalid_archive_raises(self):
+        """Test garbage input is reported as a BatchError."""
+        with self.assertRaises(BatchError):
+            extract_tarball(b"not a tarball")
+
+    def test_too_many_files_raises(self):
+        """Test archives over the file limit are rejected."""
+        data = make_tarball({f"{i}.py": str(i) for i in range(3)})
+        with self.assertRaises(BatchError):
+            extract_tarball(data, max_files=2)
+
+    def test_skipped_members_count_toward_member_limit(self):
+        """Test directories and oversized files count toward the member limit."""
+        data = make_tarball({f"{i}.py": "x" * 100 for i in range(5)})
+        with self.assertRaisesRegex(BatchError, "more than 4 entries"):
+            extract_tarball(data, max_file_bytes=50, max_members=4)
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,190 @@
+"""Tests for the tool registry and its middleware pipeline."""
+
+import importlib.util
+import inspect
+import os
+import sys
+import unittest
+from unittest.mock import patch
+
+from app import execution, tools
+from app.execution import (
+    Coalesce, ErrorKind, RateLimit, ResponseCache, Retry, RetryPolicy, Timing, ToolRegistry, ToolResult,
+    classify_error
+)
+
+
+class DictCache:
+    """In-memory stand-in for SharedCache."""
+
+    def __init__(self):
+        self.entries = {}
+
+    def get(self, key):
+        return self.entries.get(key)
+
+    def set(self, key, value):
+        self.entries[key] = value
+
+
+class Limiter:
+    """Rate limiter allowing a fixed number of calls."""
+
+    def __init__(self, allowed):
+        self.allowed = allowed
+
+    def acquire(self, key):
+        self.allowed -= 1
+        return self.allowed >= 0
+
+    def retry_after(self):
+        return 7
+
+
+class TestToolResult(unittest.TestCase):
+    """Test cases for ToolResult."""
+
+    def test_from_dict_classifies_errors(self):
+        """Test failed results get an error type from their message."""
+        result = ToolResult.from_dict("analyze_code", {"success": False, "error": "429 Too Many Requests"})
+        self.assertEqual((result.success, result.error_type), (False, "quota"))
+        self.assertIsNone(ToolResult.from_dict("analyze_code", {"success": True}).error_type)
+
+    def test_slots_and_copy(self):
+        """Test results have no __dict__ and copies get their own data dict."""
+        result = ToolResult.from_dict("generate_code", {"success": True, "code": "x = 1"})
+        self.assertFalse(hasattr(result, "__dict__"))
+        copy = result.copy(source="singleflight")
+        self.assertIsNot(copy.data, result.data)
+        self.assertEqual((copy.data, copy.source), (result.data, "singleflight"))
+        self.assertEqual(set(result.to_dict()), set(ToolResult.__slots__))
+
+    def test_classify_error(self):
+        """Test local failures are told apart from transient backend errors."""
+        self.assertEqual(classify_error("Gemini CLI not found. Install with: npm"), ErrorKind.NOT_INSTALLED)
+        self.assertEqual(classify_error("Command timed out after 60 seconds"), ErrorKind.TIMEOUT)
+        self.assertEqual(classify_error("503 Service Unavailable"), ErrorKind.TRANSIENT)
+
+
+class TestToolRegistry(unittest.TestCase):
+    """Test cases for ToolRegistry and the middleware layers."""
+
+    def setUp(self):
+        self.calls = []
+        self.responses = []
+
+    def backend(self, **params):
+        self.calls.append(params)
+        return self.responses.pop(0) if self.responses else {"success": True, "value": params["x"]}
+
+    def registry(self, *middleware):
+        registry = ToolRegistry(middleware)
+        registry.register("echo", self.backend)
+        return registry
+
+    def test_layers_run_in_order(self):
+        """Test middleware wraps the backend outermost-first."""
+        order = []
+
+        def layer(name):
+            def run(call, proceed):
+                order.append(f"{name} in")
+                result = proceed(call)
+                order.append(f"{name} out")
+                return result
+            return run
+
+        result = self.registry(layer("a"), layer("b")).execute("echo", x=1)
+        self.assertEqual(order, ["a in", "b in", "b out", "a out"])
+        self.assertEqual(result.data, {"success": True, "value": 1})
+
+    def test_unknown_tool(self):
+        """Test an unregistered name fails without raising."""
+        result = self.registry().execute("missing")
+        self.assertEqual((result.success, result.error_type), (False, "not_found"))
+
+    def test_cache_stores_backend_results_only(self):
+        """Test a repeated call is a cache hit and failures are not stored."""
+        registry = self.registry(ResponseCache(DictCache()), Timing())
+        self.responses = [{"success": False, "error": "boom"}]
+        self.assertFalse(registry.execute("echo", x=1).success)
+        first = registry.execute("echo", x=1)
+        second = registry.execute("echo", x=1)
+
+        self.assertEqual(len(self.calls), 2)
+        self.assertEqual((first.source, second.source), ("backend", "cache"))
+        self.assertGreater(first.execution_time, 0)
+
+    def test_rate_limit_refuses_without_reaching_backend(self):
+        """Test calls over the limit fail with rate_limited and a retry delay."""
+        registry = self.registry(Coalesce(), RateLimit(Limiter(1)))
+        self.assertTrue(registry.execute("echo", x=1).success)
+        refused = registry.execute("echo", x=2)
+
+        self.assertEqual(len(self.calls), 1)
+        self.assertEqual((refused.error_type, refused.data["retry_after"]), ("rate_limited", 7))
+
+    def test_retry_only_transient_errors(self):
+        """Test transient errors are retried and timeouts are not."""
+        delays = []
+        policy = RetryPolicy(max_retries=2, retryable=frozenset({ErrorKind.TRANSIENT, ErrorKind.QUOTA}))
+        registry = self.registry(Retry(policy, sleep=delays.append))
+        self.responses = [{"success": False, "error": "503 unavailable"}, {"success": True, "value": 1}]
+        result = registry.execute("echo", x=1)
+        self.assertTrue(result.success)
+        self.assertEqual((result.metadata["attempts"], len(delays)), (2, 1))
+
+        self.responses = [{"success": False, "error": "Command timed out after 60 seconds"}]
+        self.assertEqual(registry.execute("echo", x=2).metadata["attempts"], 1)
+
+
+SIBLING_TOOLS = os.path.join(
+    os.path.dirname(os.path.dirname(os.path.dirname(os.path.abspath(__file__)))), "my-gemini-agent", "app", "tools.py"
+)
+
+
+@unittest.skipUnless(os.path.exists(SIBLING_TOOLS), "my-gemini-agent is not checked out")
+class TestSharedTaxonomy(unittest.TestCase):
+    """The error taxonomy and RetryPolicy copied in my-gemini-agent/app/tools.py."""
+
+    def test_copies_are_identical(self):
+        """Test ErrorKind, the error patterns, classify_error and RetryPolicy match the sibling copy."""
+        spec = importlib.util.spec_from_file_location("my_gemini_agent_tools", SIBLING_TOOLS)
+        sibling = importlib.util.module_from_spec(spec)
+        with patch.dict(sys.modules, {spec.name: sibling}):
+            spec.loader.exec_module(sibling)
+            for name in ("ErrorKind", "classify_error", "RetryPolicy"):
+                with self.subTest(name=name):
+                    self.assertEqual(inspect.getsource(getattr(execution, name)),
+                                     inspect.getsource(getattr(sibling, name)))
+        self.assertEqual(
+            [(kind.value, pattern.pattern, pattern.flags) for kind, pattern in execution._ERROR_PATTERNS],
+            [(kind.value, pattern.pattern, pattern.flags) for kind, pattern in sibling._ERROR_PATTERNS]
+        )
+
+
+@patch.dict('os.environ', {'GEMINI_API_KEY': 'test_key'})
+class TestToolsPipeline(unittest.TestCase):
+    """The public tool functions run through app.tools.registry."""
+
+    def test_available_tools_are_registered(self):
+        """Test every public tool has a pipeline implementation."""
+        self.assertEqual(sorted(tools.list_available_tools()), sorted(tools.registry.names()))
+        self.assertIs(tools.get_tool("analyze_code"), tools.analyze_code_with_cli)
+
+    def test_rate_limited_tool_returns_error_dict(self):
+        """Test a configured rate limit surfaces in the tool's result dict."""
+        tools.configure_rate_limit(Limiter(0))
+        try:
+            with patch('app.tools.GeminiCLIWrapper.execute_cli_command') as backend:
+                result = tools.generate_code_with_cli("rate limited", "python")
+        finally:
+            tools.configure_rate_limit(None)
+
+        backend.assert_not_called()
+        self.assertFalse(result["success"])
+        self.assertEqual(result["error_type"], "rate_limited")
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,146 @@
+"""Tests for hedged dual-model execution."""
+
+import threading
+import time
+import unittest
+from unittest.mock import patch
+
+from app.hedging import HedgedExecutor, LatencyTracker
+from app.tools import configure_hedging, generate_code_with_cli
+
+
+class FakeProcess:
+    """Stands in for the CLI process handed to on_spawn."""
+
+    def __init__(self):
+        self.killed = threading.Event()
+
+    def poll(self):
+        return -9 if self.killed.is_set() else None
+
+    def kill(self):
+        self.killed.set()
+
+
+class FakeModels:
+    """execute_cli_command replacement with per-model latency and outcome."""
+
+    def __init__(self, latencies, failing=()):
+        self.latencies = latencies
+        self.failing = set(failing)
+        self.calls = []
+        self.processes = {}
+
+    def __call__(self, wrapper, prompt, timeout=60, tool="cli", on_spawn=None):
+        model = wrapper.model
+        process = FakeProcess()
+        self.calls.append(model)
+        self.processes[model] = process
+        if on_spawn is not None:
+            on_spawn(process)
+        if process.killed.wait(self.latencies[model]):
+            return {"success": False, "output": None, "error": "killed"}
+        if model in self.failing:
+            return {"success": False, "output": None, "error": f"{model} overloaded"}
+        return {"success": True, "output": f"code from {model}", "error": None}
+
+
+def patched(models):
+    return patch('app.tools.GeminiCLIWrapper.execute_cli_command', autospec=True, side_effect=models)
+
+
+@patch.dict('os.environ', {'GEMINI_API_KEY': 'test_key'})
+class TestHedgedExecutor(unittest.TestCase):
+    """Test cases for HedgedExecutor."""
+
+    def make_executor(self, **kwargs):
+        options = {"default_delay": 0.1, "min_delay": 0.0}
+        options.update(kwargs)
+        return HedgedExecutor("primary", "fallback", **options)
+
+    def test_fast_primary_is_not_hedged(self):
+        """Test no fallback call is made when the primary answers in time."""
+        models = FakeModels({"primary": 0.01, "fallback": 0.01})
+        with patched(models):
+            result = self.make_executor().execute("prompt")
+
+        self.assertEqual(result["output"], "code from primary")
+        self.assertFalse(result["hedged"])
+        self.assertEqual(models.calls, ["primary"])
+
+    def test_slow_primary_loses_to_fallback_and_is_killed(self):
+        """Test the fallback wins and the primary process is killed."""
+        models = FakeModels({"primary": 5.0, "fallback": 0.05})
+        start = time.perf_counter()
+        with patched(models):
+            result = self.make_executor().execute("prompt")
+
+        self.assertLess(time.perf_counter() - start, 1.0)
+        self.assertEqual(result["model"], "fallback")
+        self.assertTrue(result["hedged"])
+        self.assertTrue(models.processes["primary"].killed.wait(1))
+
+    def test_primary_can_still_win_after_hedging(self):
+        """Test a primary finishing before the fallback is used and the fallback killed."""
+        models = FakeModels({"primary": 0.2, "fallback": 5.0})
+        with patched(models):
+            result = self.make_executor().execute("prompt")
+
+        self.assertEqual(result["model"], "primary")
+        self.assertTrue(result["hedged"])
+        self.assertTrue(models.processes["fallback"].killed.wait(1))
+
+    def test_failed_primary_falls_back_immediately(self):
+        """Test a fast primary failure starts the fallback without waiting."""
+        models = FakeModels({"primary": 0.0, "fallback": 0.01}, failing={"primary"})
+        with patched(models):
+            result = self.make_executor(default_delay=5.0).execute("prompt")
+
+        self.assertTrue(result["success"])
+        self.assertEqual(result["model"], "fallback")
+
+    def test_both_failing_returns_error(self):
+        """Test an error result when neither model succeeds."""
+        models = FakeModels({"primary": 0.2, "fallback": 0.01}, failing={"primary", "fallback"})
+        with patched(models):
+            result = self.make_executor().execute("prompt")
+
+        self.assertFalse(result["success"])
+        # The primary fails last, so its error and model are reported
+        self.assertEqual(result["error"], "primary overloaded")
+        self.assertEqual(result["model"], "primary")
+
+    def test_hedge_delay_follows_observed_latency(self):
+        """Test the delay uses the primary's latency percentile once known."""
+        tracker = LatencyTracker(min_samples=10)
+        executor = self.make_executor(default_delay=3.0, percentile=90, tracker=tracker)
+        self.assertEqual(executor.hedge_delay(), 3.0)
+
+        for index in range(10):
+            tracker.record("primary", 0.1 * (index + 1))
+        self.assertAlmostEqual(executor.hedge_delay(), 1.0)
+
+    def test_generate_uses_configured_hedger(self):
+        """Test generate_code_with_cli goes through the hedger when enabled."""
+        models = FakeModels({"primary": 5.0, "fallback": 0.01})
+        configure_hedging(self.make_executor())
+        try:
+            with patched(models):
+                result = generate_code_with_cli("hedged task", "python", "simple")
+        finally:
+            configure_hedging(None)
+
+        self.assertEqual(result["code"], "code from fallback")
+
+    def test_configured_model_without_hedging(self):
+        """Test calls use AGENT_MODEL when no hedger is configured."""
+        models = FakeModels({"configured": 0.0})
+        with patched(models), patch('app.tools.MODEL', "configured"):
+            result = generate_code_with_cli("unhedged task", "python", "simple")
+
+        self.assertTrue(result["success"])
+        self.assertEqual(set(models.calls), {"configured"})
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,143 @@
+"""Tests for diff-aware incremental re-analysis."""
+
+import unittest
+
+from app.incremental import IncrementalAnalyzer, split_units
+
+SOURCE = '''import os
+
+
+def read(path):
+    return open(path).read()
+
+
+@cache
+def run(cmd):
+    return os.system(cmd)
+
+
+class Store:
+    def load(self, key):
+        return eval(key)
+'''
+
+
+class FakeAnalyzer:
+    """Reports one finding per line containing a risky call, with unit-relative lines."""
+
+    RISKY = ("eval(", "os.system(", "open(")
+
+    def __init__(self):
+        self.analyzed = []
+
+    def __call__(self, code, analysis_type):
+        self.analyzed.append(code)
+        findings = [
+            {"line": number, "type": next(risky for risky in self.RISKY if risky in line)}
+            for number, line in enumerate(code.split("\n"), 1)
+            if any(risky in line for risky in self.RISKY)
+        ]
+        return {"success": True, "analysis": {"vulnerabilities": findings, "severity": "low"},
+                "analysis_type": analysis_type}
+
+
+def finding_lines(result):
+    return sorted((item["line"], item["type"]) for item in result["analysis"]["vulnerabilities"])
+
+
+class TestSplitUnits(unittest.TestCase):
+    """Test cases for split_units."""
+
+    def test_definitions_and_module_code(self):
+        """Test each def/class is a unit and decorators stay with their function."""
+        units = split_units(SOURCE)
+        self.assertEqual([unit.name for unit in units], ["module", "def read", "def run", "class Store"])
+        self.assertEqual([unit.start_line for unit in units], [1, 4, 8, 13])
+        self.assertTrue(units[2].code.startswith("@cache"))
+
+    def test_moved_unit_keeps_its_digest(self):
+        """Test blank lines above a function do not change its digest."""
+        before = {unit.name: unit.digest for unit in split_units(SOURCE)}
+        after = {unit.name: unit.digest for unit in split_units(SOURCE.replace("\n\n@cache", "\n\n\n\n@cache"))}
+        self.assertEqual(before, after)
+
+    def test_invalid_python(self):
+        """Test unparsable code has no units."""
+        self.assertIsNone(split_units("def broken(:\n"))
+
+
+class TestIncrementalAnalyzer(unittest.TestCase):
+    """Test cases for IncrementalAnalyzer."""
+
+    def setUp(self):
+        self.backend = FakeAnalyzer()
+        self.analyzer = IncrementalAnalyzer(self.backend)
+
+    def test_first_analysis_covers_every_unit(self):
+        """Test findings from per-unit analyses are mapped to file lines."""
+        result = self.analyzer.analyze_file("c1", "app.py", SOURCE)
+        self.assertEqual(finding_lines(result), [(5, "open("), (10, "os.system("), (15, "eval(")])
+        self.assertEqual(result["incremental"], {"units": 4, "reanalyzed": 4, "reused": 0, "full": False})
+
+    def test_only_edited_unit_is_reanalyzed(self):
+        """Test an edit re-analyzes one function and shifts the others' findings."""
+        self.analyzer.analyze_file("c1", "app.py", SOURCE)
+        self.backend.analyzed.clear()
+        edited = SOURCE.replace("    return open(path).read()", "    data = open(path).read()\n    return data")
+
+        result = self.analyzer.analyze_file("c1", "app.py", edited)
+
+        self.assertEqual(self.backend.analyzed, ["def read(path):\n    data = open(path).read()\n    return data"])
+        self.assertEqual(finding_lines(result), [(5, "open("), (11, "os.system("), (16, "eval(")])
+        self.assertEqual((result["incremental"]["reanalyzed"], result["incremental"]["reused"]), (1, 3))
+
+    def test_unchanged_file_makes_no_calls(self):
+        """Test re-submitting the same file reuses everything."""
+        self.analyzer.analyze_file("c1", "app.py", SOURCE)
+        self.backend.analyzed.clear()
+        result = self.analyzer.analyze_file("c1", "app.py", SOURCE)
+        self.assertEqual(self.backend.analyzed, [])
+        self.assertEqual(len(result["analysis"]["vulnerabilities"]), 3)
+
+    def test_versions_are_per_client_and_path(self):
+        """Test another client or path starts from scratch."""
+        self.analyzer.analyze_file("c1", "app.py", SOURCE)
+        self.backend.analyzed.clear()
+        self.analyzer.analyze_file("c2", "app.py", SOURCE)
+        self.assertEqual(len(self.backend.analyzed), 4)
+
+    def test_failed_units_are_retried(self):
+        """Test a unit whose analysis failed is analyzed again next time."""
+        calls = []
+
+        def flaky(code, analysis_type):
+            calls.append(code)
+            if "eval" in code and len(calls) <= 4:
+                return {"success": False, "error": "boom", "analysis_type": analysis_type}
+            return self.backend(code, analysis_type)
+
+        analyzer = IncrementalAnalyzer(flaky)
+        first = analyzer.analyze_file("c1", "app.py", SOURCE)
+        second = analyzer.analyze_file("c1", "app.py", SOURCE)
+
+        self.assertIn("partial_errors", first)
+        self.assertEqual(second["incremental"]["reanalyzed"], 1)
+        self.assertNotIn("partial_errors", second)
+
+    def test_unparsable_code_is_analyzed_in_full(self):
+        """Test non-Python input falls back to one full analysis."""
+        result = self.analyzer.analyze_file("c1", "app.js", "function f() { eval(x); }")
+        self.assertTrue(result["incremental"]["full"])
+        self.assertEqual(len(self.backend.analyzed), 1)
+        self.assertEqual(len(self.analyzer), 0)
+
+    def test_least_recently_used_file_is_evicted(self):
+        """Test at most max_files versions are kept."""
+        analyzer = IncrementalAnalyzer(self.backend, max_files=1)
+        analyzer.analyze_file("c1", "a.py", SOURCE)
+        analyzer.analyze_file("c1", "b.py", SOURCE)
+        self.assertEqual(len(analyzer), 1)
+
+
+if __name__ == '__main__':
+    unittest.main()
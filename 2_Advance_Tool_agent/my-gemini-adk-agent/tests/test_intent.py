@@ -0,0 +1,65 @@
+"""Tests for the compiled intent classifier."""
+
+import json
+import os
+import unittest
+
+from app.agent import AdvancedToolAgent
+from app.intent import classify
+
+FIXTURE = os.path.join(os.path.dirname(__file__), "fixtures", "intent_cases.json")
+
+
+class TestIntentClassifier(unittest.TestCase):
+    """Test cases for classify() and parse_intent routing."""
+
+    @classmethod
+    def setUpClass(cls):
+        with open(FIXTURE, encoding="utf-8") as f:
+            cls.cases = json.load(f)
+
+    def test_labeled_fixture_accuracy(self):
+        """Test every labeled request is classified correctly."""
+        for case in self.cases:
+            with self.subTest(request=case["request"]):
+                features = classify(case["request"])
+                self.assertEqual(features["language"], case["language"])
+                self.assertEqual(features["complexity"], case["complexity"])
+                self.assertEqual(features["analysis_type"], case["analysis_type"])
+
+    def test_labeled_fixture_routing(self):
+        """Test parse_intent sends every labeled request to the right tool(s)."""
+        agent = AdvancedToolAgent()
+        for case in self.cases:
+            with self.subTest(request=case["request"]):
+                self.assertEqual(agent.parse_intent(case["request"])["action"], case["action"])
+
+    def test_substrings_do_not_match(self):
+        """Test keywords only match whole words."""
+        features = classify("Write a script to adjust settings and install packages")
+        self.assertEqual(features["language"], "python")
+        self.assertEqual(features["analysis_type"], "security")
+
+    def test_explicit_language_beats_incidental_keyword(self):
+        """Test a named language wins over "node" used as an ordinary word."""
+        features = classify("write a node class in python")
+        self.assertTrue(features["generate"])
+        self.assertEqual(features["language"], "python")
+
+    def test_explicit_analysis_beats_incidental_keyword(self):
+        """Test a named analysis type wins over "all" used as an ordinary word."""
+        features = classify("check security of this, run all tests")
+        self.assertTrue(features["analyze"])
+        self.assertEqual(features["analysis_type"], "security")
+
+    def test_case_insensitive(self):
+        """Test matching ignores case."""
+        features = classify("GENERATE a NodeJS service and REVIEW it for PERFORMANCE")
+        self.assertTrue(features["generate"])
+        self.assertTrue(features["analyze"])
+        self.assertEqual(features["language"], "javascript")
+        self.assertEqual(features["analysis_type"], "performance")
+
+
+if __name__ == '__main__':
+    unittest.main()
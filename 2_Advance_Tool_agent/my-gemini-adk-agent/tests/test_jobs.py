@@ -0,0 +1,121 @@
+"""Tests for the persistent job queue."""
+
+import os
+import tempfile
+import threading
+import time
+import unittest
+
+from app.jobs import JobQueue, JobWorkerPool, QueueFullError
+
+
+class TestJobQueue(unittest.TestCase):
+    """Test cases for JobQueue."""
+
+    def setUp(self):
+        self.tmpdir = tempfile.TemporaryDirectory()
+        self.path = os.path.join(self.tmpdir.name, "jobs.db")
+        self.queue = JobQueue(self.path, max_pending=10)
+
+    def tearDown(self):
+        self.tmpdir.cleanup()
+
+    def test_claim_respects_priority_then_age(self):
+        """Test interactive jobs are claimed before older batch jobs."""
+        batch = self.queue.enqueue({"request": "batch"}, "batch")
+        normal = self.queue.enqueue({"request": "normal"}, "normal")
+        interactive = self.queue.enqueue({"request": "interactive"}, "interactive")
+
+        claimed = [self.queue.claim()["id"] for _ in range(3)]
+
+        self.assertEqual(claimed, [interactive["id"], normal["id"], batch["id"]])
+        self.assertIsNone(self.queue.claim())
+
+    def test_backpressure_limits_low_priority_first(self):
+        """Test batch jobs are refused before the queue is full for interactive ones."""
+        for _ in range(5):
+            self.queue.enqueue({"request": "batch"}, "batch")
+
+        with self.assertRaises(QueueFullError):
+            self.queue.enqueue({"request": "batch"}, "batch")
+        self.queue.enqueue({"request": "interactive"}, "interactive")
+
+    def test_unknown_priority_rejected(self):
+        """Test an unknown priority class is a ValueError."""
+        with self.assertRaises(ValueError):
+            self.queue.enqueue({"request": "x"}, "urgent")
+
+    def test_jobs_survive_reopen_and_expired_leases_requeue(self):
+        """Test queued and abandoned running jobs are picked up by a new process."""
+        job = self.queue.enqueue({"request": "long generation"})
+        self.queue.claim()
+
+        reopened = JobQueue(self.path, lease_seconds=0)
+        claimed = reopened.claim()
+
+        self.assertEqual(claimed["id"], job["id"])
+        self.assertEqual(claimed["request"], {"request": "long generation"})
+        self.assertEqual(claimed["attempts"], 2)
+
+    def test_expired_job_fails_after_max_attempts(self):
+        """Test a job whose lease keeps expiring is failed instead of requeued forever."""
+        job = self.queue.enqueue({"request": "crashes the worker"})
+        self.queue.claim()
+
+        reopened = JobQueue(self.path, lease_seconds=0, max_attempts=2)
+        self.assertEqual(reopened.claim()["attempts"], 2)
+        self.assertIsNone(reopened.claim())
+
+        stored = self.queue.get(job["id"])
+        self.assertEqual(stored["status"], "failed")
+        self.assertEqual(stored["error"], "Job abandoned after 2 attempts")
+
+    def test_worker_pool_renews_lease_of_long_jobs(self):
+        """Test a job running longer than the lease is not handed to another worker."""
+        queue = JobQueue(self.path, lease_seconds=0.3)
+        release = threading.Event()
+
+        def handler(request):
+            release.wait(5)
+            return {"success": True}
+
+        pool = JobWorkerPool(queue, handler, workers=1, poll_interval=0.05)
+        job = queue.enqueue({"request": "slow"})
+        pool.start()
+        try:
+            time.sleep(0.9)
+            other_process = JobQueue(self.path, lease_seconds=0.3)
+            self.assertIsNone(other_process.claim())
+        finally:
+            release.set()
+            pool.stop()
+
+        stored = queue.get(job["id"])
+        self.assertEqual((stored["status"], stored["attempts"]), ("succeeded", 1))
+
+    def test_worker_pool_completes_jobs(self):
+        """Test workers run the handler and store results."""
+        done = threading.Event()
+
+        def handler(request):
+            done.set()
+            return {"success": True, "echo": request["request"]}
+
+        pool = JobWorkerPool(self.queue, handler, workers=1, poll_interval=0.05)
+        job = self.queue.enqueue({"request": "hello"})
+        pool.start()
+        try:
+            self.assertTrue(done.wait(2))
+            deadline = time.time() + 2
+            while self.queue.get(job["id"])["status"] == "running" and time.time() < deadline:
+                time.sleep(0.01)
+        finally:
+            pool.stop()
+
+        stored = self.queue.get(job["id"])
+        self.assertEqual(stored["status"], "succeeded")
+        self.assertEqual(stored["result"], {"success": True, "echo": "hello"})
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,85 @@
+"""Tests for the Prometheus metrics registry."""
+
+import asyncio
+import re
+import unittest
+from unittest.mock import patch
+
+from app.tools import analyze_code_with_cli
+from app.utils.metrics import MetricsRegistry, RETRIES, TOOL_LATENCY, PROMPT_SIZE
+
+
+class TestMetricsRegistry(unittest.TestCase):
+    """Test cases for metric rendering."""
+
+    def test_histogram_renders_cumulative_buckets(self):
+        """Test histogram output follows the Prometheus text format."""
+        registry = MetricsRegistry()
+        latency = registry.histogram("test_latency_seconds", "Test latency.", ("tool",), (0.1, 1.0))
+        latency.observe(0.05, tool="analyze_code")
+        latency.observe(0.5, tool="analyze_code")
+        latency.observe(5, tool="analyze_code")
+
+        text = registry.render()
+
+        self.assertIn("# TYPE test_latency_seconds histogram", text)
+        self.assertIn('test_latency_seconds_bucket{tool="analyze_code",le="0.1"} 1', text)
+        self.assertIn('test_latency_seconds_bucket{tool="analyze_code",le="1"} 2', text)
+        self.assertIn('test_latency_seconds_bucket{tool="analyze_code",le="+Inf"} 3', text)
+        self.assertIn('test_latency_seconds_count{tool="analyze_code"} 3', text)
+
+    def test_counter_requires_declared_labels(self):
+        """Test counters reject unknown label sets."""
+        registry = MetricsRegistry()
+        hits = registry.counter("test_hits", "Test hits.", ("tool",))
+        hits.inc(tool="generate_code")
+
+        self.assertIn("# TYPE test_hits_total counter", registry.render())
+        self.assertIn('test_hits_total{tool="generate_code"} 1', registry.render())
+        with self.assertRaises(ValueError):
+            hits.inc(model="flash")
+
+    @patch.dict('os.environ', {'GEMINI_API_KEY': 'test_key'})
+    @patch('app.tools.GeminiCLIWrapper.execute_cli_command')
+    def test_tool_calls_are_recorded(self, mock_execute):
+        """Test analyze_code_with_cli records latency and prompt size by analysis type."""
+        mock_execute.return_value = {"success": True, "output": '{"issues": []}', "error": None}
+        labels = {"tool": "analyze_code", "analysis_type": "performance"}
+        before = TOOL_LATENCY.count(**labels), PROMPT_SIZE.count(**labels)
+
+        analyze_code_with_cli("for i in range(10): pass", "performance")
+
+        self.assertEqual(TOOL_LATENCY.count(**labels), before[0] + 1)
+        self.assertEqual(PROMPT_SIZE.count(**labels), before[1] + 1)
+
+    @patch.dict('os.environ', {'GEMINI_API_KEY': 'test_key'})
+    def test_metrics_endpoint_samples_match_families(self):
+        """Test every /metrics sample belongs to a family declared by its TYPE line."""
+        from app import server
+
+        RETRIES.inc(0, tool="analyze_code", analysis_type="security")
+        TOOL_LATENCY.observe(0.0, tool="analyze_code", analysis_type="security")
+        text = asyncio.run(server.metrics()).body.decode()
+        suffixes = {"counter": ("",), "histogram": ("_bucket", "_sum", "_count")}
+
+        families = {}
+        samples = []
+        for line in text.splitlines():
+            declared = re.match(r"# TYPE (\S+) (\S+)$", line)
+            if declared:
+                families[declared.group(1)] = declared.group(2)
+            elif line and not line.startswith("#"):
+                samples.append(re.match(r"[a-zA-Z_:][a-zA-Z0-9_:]*", line).group(0))
+
+        self.assertIn("agent_tool_retries_total", families)
+        self.assertTrue(samples)
+        for sample in samples:
+            with self.subTest(sample=sample):
+                self.assertTrue(any(
+                    sample == family + suffix
+                    for family, kind in families.items() for suffix in suffixes[kind]
+                ))
+
+
+if __name__ == '__main__':
+    unittest.main()
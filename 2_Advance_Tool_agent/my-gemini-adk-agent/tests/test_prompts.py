@@ -0,0 +1,90 @@
+"""Tests for the prompt template registry against the golden set."""
+
+import json
+import os
+import unittest
+
+from app import prompts
+from app.prompts import PromptTemplate
+
+GOLDEN = os.path.join(os.path.dirname(__file__), "fixtures", "prompt_golden.json")
+
+
+class TestPromptGolden(unittest.TestCase):
+    """Every prompt variant keeps the instructions and schema the tools rely on."""
+
+    @classmethod
+    def setUpClass(cls):
+        with open(GOLDEN, encoding="utf-8") as f:
+            cls.golden = json.load(f)
+
+    def test_every_template_is_covered(self):
+        """Test the golden set lists exactly the registered prompts."""
+        registered = {template.name for template in prompts.templates()}
+        self.assertEqual(registered, set(self.golden["templates"]))
+
+    def test_variants_contain_required_content(self):
+        """Test full and compact prompts both include every required phrase."""
+        inputs = self.golden["inputs"]
+        for name, spec in self.golden["templates"].items():
+            for variant in prompts.VARIANTS:
+                template = prompts.get_template(name, variant)
+                rendered = template.render(**{field: inputs[field] for field in template.fields}).lower()
+                for phrase in spec["required"]:
+                    with self.subTest(name=name, variant=variant, phrase=phrase):
+                        self.assertIn(phrase.format(**inputs).lower(), rendered)
+
+    def test_text_changes_bump_version(self):
+        """Test a template's text only changes together with its version."""
+        for name, spec in self.golden["templates"].items():
+            for variant, pinned in spec["variants"].items():
+                template = prompts.get_template(name, variant)
+                with self.subTest(name=name, variant=variant):
+                    if template.fingerprint != pinned["sha256"]:
+                        self.assertGreater(
+                            template.version, pinned["version"],
+                            "Template text changed: bump its version and update prompt_golden.json"
+                        )
+
+    def test_compact_is_smaller(self):
+        """Test the compact variant costs fewer instruction tokens than full."""
+        for name, variants in prompts.footprint().items():
+            with self.subTest(name=name):
+                self.assertLess(variants["compact"]["static_tokens"], variants["full"]["static_tokens"])
+
+
+class TestPromptTemplate(unittest.TestCase):
+    """Test cases for PromptTemplate rendering."""
+
+    def test_render_matches_str_format(self):
+        """Test precompiled rendering gives the same text as str.format."""
+        text = 'Task: {task}\n{{"lang": "{language}"}} for {language}'
+        template = PromptTemplate("t", "full", 1, text)
+
+        self.assertEqual(template.fields, {"task", "language"})
+        self.assertEqual(
+            template.render(task="x {y}", language="go"),
+            text.format(task="x {y}", language="go")
+        )
+
+    def test_missing_field_raises(self):
+        """Test rendering without a required field fails clearly."""
+        template = PromptTemplate("t", "full", 1, "{task} in {language}")
+        with self.assertRaises(KeyError):
+            template.render(task="x")
+
+    def test_unsupported_field_rejected(self):
+        """Test format specs and attribute access are refused at registration."""
+        with self.assertRaises(ValueError):
+            PromptTemplate("t", "full", 1, "{task:>10}")
+        with self.assertRaises(ValueError):
+            PromptTemplate("t", "full", 1, "{task.upper}")
+
+    def test_unknown_variant_rejected(self):
+        """Test asking for an unknown variant raises ValueError."""
+        with self.assertRaises(ValueError):
+            prompts.get_template("analyze.security", "tiny")
+
+
+if __name__ == '__main__':
+    unittest.main()
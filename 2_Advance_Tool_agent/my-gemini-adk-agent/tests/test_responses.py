@@ -0,0 +1,86 @@
+"""Tests for fast JSON responses and lean result shaping."""
+
+import json
+import unittest
+from unittest.mock import patch
+
+from app import responses
+from app.agent import AdvancedToolAgent
+from app.responses import FastJSONResponse, lean_result
+
+
+class TestLeanResult(unittest.TestCase):
+    """Test cases for lean_result."""
+
+    def test_drops_redundant_keys_at_any_depth(self):
+        """Test raw_output and formatted_response are removed everywhere."""
+        result = {
+            "success": True,
+            "formatted_response": "text",
+            "result": {"analysis": {"raw": "x"}, "raw_output": "x"},
+            "items": [1, 2]
+        }
+        self.assertEqual(lean_result(result), {
+            "success": True,
+            "result": {"analysis": {"raw": "x"}},
+            "items": [1, 2]
+        })
+
+    def test_original_is_not_modified(self):
+        """Test the input (possibly a cached result) keeps its keys and shares values."""
+        code = "x" * 1000
+        result = {"result": {"code": code, "raw_output": code}}
+        lean = lean_result(result)
+
+        self.assertIn("raw_output", result["result"])
+        self.assertIs(lean["result"]["code"], code)
+
+
+class TestFastJSONResponse(unittest.TestCase):
+    """Test cases for FastJSONResponse."""
+
+    content = {"code": "print('é')\n", "score": 1.5, "issues": [{"line": 3}], "none": None}
+
+    def test_renders_equivalent_json(self):
+        """Test the body decodes to the same structure."""
+        body = FastJSONResponse(self.content).body
+        self.assertEqual(json.loads(body), self.content)
+
+    def test_stdlib_fallback(self):
+        """Test encoding still works when orjson is not installed."""
+        with patch.object(responses, "orjson", None):
+            body = FastJSONResponse(self.content).body
+            line = responses.dumps_bytes(self.content)
+
+        self.assertEqual(json.loads(body), self.content)
+        self.assertEqual(json.loads(line), self.content)
+        self.assertNotIn(b"\n", line)
+
+
+@patch.dict('os.environ', {'GEMINI_API_KEY': 'test_key'})
+class TestLazyFormatting(unittest.TestCase):
+    """formatted_response is only built when requested."""
+
+    def setUp(self):
+        self.agent = AdvancedToolAgent()
+        self.tool_result = {"success": True, "code": "print(1)", "language": "python", "complexity": "simple"}
+
+    def test_formatted_by_default(self):
+        """Test process_request still formats unless told not to."""
+        with patch.object(self.agent, "execute_tool", return_value=self.tool_result):
+            result = self.agent.process_request("Generate a hello world")
+
+        self.assertIn("print(1)", result["formatted_response"])
+
+    def test_format_skipped_on_request(self):
+        """Test format_response=False never calls the formatter."""
+        with patch.object(self.agent, "execute_tool", return_value=self.tool_result), \
+                patch.object(self.agent, "_format_generate_response") as formatter:
+            result = self.agent.process_request("Generate a hello world", format_response=False)
+
+        self.assertNotIn("formatted_response", result)
+        formatter.assert_not_called()
+
+
+if __name__ == '__main__':
+    unittest.main()
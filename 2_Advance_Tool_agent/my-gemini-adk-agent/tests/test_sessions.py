@@ -0,0 +1,82 @@
+"""Tests for bounded per-session conversation history."""
+
+import unittest
+from unittest.mock import patch
+
+from app.agent import AdvancedToolAgent
+from app.sessions import SessionStore
+
+
+class TestSessionStore(unittest.TestCase):
+    """Test cases for SessionStore."""
+
+    def test_old_turns_are_compacted_into_digest(self):
+        """Test the window stays within the token budget and old turns move to the digest."""
+        store = SessionStore(token_budget=50, digest_chars=5000)
+        for i in range(20):
+            store.append("s1", "user", f"request number {i} " + "x" * 40)
+
+        history = store.history("s1")
+
+        self.assertLess(len(history["turns"]), 20)
+        self.assertIn("request number 19", history["turns"][-1]["content"])
+        self.assertIn("user: request number 0", history["digest"])
+
+    def test_digest_is_bounded(self):
+        """Test the digest keeps only the most recent entries."""
+        store = SessionStore(token_budget=10, digest_chars=200)
+        for i in range(200):
+            store.append("s1", "user", f"turn {i} " + "y" * 30)
+
+        digest = store.history("s1")["digest"]
+
+        self.assertLessEqual(len(digest), 200)
+        self.assertNotIn("turn 0 ", digest)
+        self.assertTrue(digest.startswith("user: "))
+
+    def test_least_recently_used_session_is_evicted(self):
+        """Test the store never holds more than max_sessions sessions."""
+        store = SessionStore(max_sessions=2)
+        store.append("a", "user", "first")
+        store.append("b", "user", "second")
+        store.append("a", "user", "touch a again")
+        store.append("c", "user", "third")
+
+        self.assertEqual(len(store), 2)
+        self.assertEqual(store.history("b")["turns"], [])
+        self.assertEqual(len(store.history("a")["turns"]), 2)
+
+    def test_idle_sessions_expire(self):
+        """Test sessions idle past the TTL are dropped."""
+        store = SessionStore(idle_ttl=60)
+        with patch("app.sessions.time.monotonic", return_value=1000.0):
+            store.append("old", "user", "hello")
+        with patch("app.sessions.time.monotonic", return_value=1100.0):
+            store.append("new", "user", "hello")
+            self.assertEqual(store.history("old")["turns"], [])
+        self.assertEqual(len(store), 1)
+
+
+class TestAgentSessions(unittest.TestCase):
+    """Test cases for session history in AdvancedToolAgent."""
+
+    @patch('app.agent.AdvancedToolAgent._process')
+    def test_history_is_kept_per_session(self, mock_process):
+        """Test each session only sees its own turns and None records nothing."""
+        mock_process.return_value = {"success": True, "action": "generate",
+                                     "result": {"success": True, "code": "x = 1", "language": "python"}}
+        agent = AdvancedToolAgent()
+
+        agent.process_request("Generate a parser", session_id="alice")
+        agent.process_request("Generate a lexer", session_id="bob")
+        agent.process_request("Generate a secret", session_id=None)
+
+        alice = agent.sessions.history("alice")["turns"]
+        self.assertEqual([t["role"] for t in alice], ["user", "assistant"])
+        self.assertEqual(alice[0]["content"], "Generate a parser")
+        self.assertIn("generated python code (1 lines)", alice[1]["content"])
+        self.assertEqual(len(agent.sessions), 2)
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,139 @@
+"""Tests for the SQLite state shared between server worker processes."""
+
+import multiprocessing
+import os
+import tempfile
+import time
+import unittest
+from unittest.mock import patch
+
+from app.tools import analyze_code_with_cli, configure_response_cache
+from app.utils.metrics import CACHE_HITS
+from app.utils.shared_store import SharedCache, SharedRateLimiter
+
+
+def _write_from_other_process(path, key, value):
+    SharedCache(path).set(key, value)
+
+
+def _acquire_from_other_process(path, results):
+    limiter = SharedRateLimiter(path, rate_per_minute=1, burst=3)
+    results.put([limiter.acquire("client") for _ in range(2)])
+
+
+class TestSharedCache(unittest.TestCase):
+    """Test cases for SharedCache."""
+
+    def setUp(self):
+        self.tmpdir = tempfile.TemporaryDirectory()
+        self.path = os.path.join(self.tmpdir.name, "cache.db")
+
+    def tearDown(self):
+        self.tmpdir.cleanup()
+
+    def test_round_trip_and_expiry(self):
+        """Test stored values are returned until their TTL runs out."""
+        cache = SharedCache(self.path, ttl=0.2)
+        cache.set("key", {"success": True, "output": "x"})
+
+        self.assertEqual(cache.get("key"), {"success": True, "output": "x"})
+        self.assertIsNone(cache.get("missing"))
+        time.sleep(0.3)
+        self.assertIsNone(cache.get("key"))
+
+    def test_oldest_entries_evicted_over_capacity(self):
+        """Test the cache never holds more than max_entries values."""
+        cache = SharedCache(self.path, max_entries=3)
+        for index in range(5):
+            cache.set(f"key-{index}", index)
+
+        self.assertEqual(len(cache), 3)
+        self.assertIsNone(cache.get("key-0"))
+        self.assertEqual(cache.get("key-4"), 4)
+
+    def test_entries_visible_across_processes(self):
+        """Test a value written by another process is a cache hit here."""
+        cache = SharedCache(self.path)
+        process = multiprocessing.get_context("spawn").Process(
+            target=_write_from_other_process, args=(self.path, "key", {"output": "shared"})
+        )
+        process.start()
+        process.join(timeout=30)
+
+        self.assertEqual(cache.get("key"), {"output": "shared"})
+
+
+class TestSharedRateLimiter(unittest.TestCase):
+    """Test cases for SharedRateLimiter."""
+
+    def setUp(self):
+        self.tmpdir = tempfile.TemporaryDirectory()
+        self.path = os.path.join(self.tmpdir.name, "ratelimit.db")
+
+    def tearDown(self):
+        self.tmpdir.cleanup()
+
+    def test_burst_then_refill(self):
+        """Test a bucket allows its burst, refuses, then refills over time."""
+        limiter = SharedRateLimiter(self.path, rate_per_minute=600, burst=2)
+
+        self.assertTrue(limiter.acquire("a"))
+        self.assertTrue(limiter.acquire("a"))
+        self.assertFalse(limiter.acquire("a"))
+        # Other clients have their own bucket
+        self.assertTrue(limiter.acquire("b"))
+        time.sleep(0.15)
+        self.assertTrue(limiter.acquire("a"))
+
+    def test_bucket_shared_across_processes(self):
+        """Test tokens taken by another process count against this one."""
+        limiter = SharedRateLimiter(self.path, rate_per_minute=1, burst=3)
+        context = multiprocessing.get_context("spawn")
+        results = context.Queue()
+        process = context.Process(target=_acquire_from_other_process, args=(self.path, results))
+        process.start()
+        process.join(timeout=30)
+
+        self.assertEqual(results.get(timeout=5), [True, True])
+        self.assertTrue(limiter.acquire("client"))
+        self.assertFalse(limiter.acquire("client"))
+
+
+@patch.dict('os.environ', {'GEMINI_API_KEY': 'test_key'})
+class TestResponseCache(unittest.TestCase):
+    """Tool calls reuse results from the shared response cache."""
+
+    def setUp(self):
+        self.tmpdir = tempfile.TemporaryDirectory()
+        configure_response_cache(SharedCache(os.path.join(self.tmpdir.name, "cache.db")))
+
+    def tearDown(self):
+        configure_response_cache(None)
+        self.tmpdir.cleanup()
+
+    def test_repeated_call_served_from_cache(self):
+        """Test a second identical call does not reach the backend."""
+        output = {"success": True, "output": '{"severity": "low", "vulnerabilities": []}', "error": None}
+        hits = CACHE_HITS.value(tool="analyze_code", analysis_type="security", source="cache")
+        with patch('app.tools.GeminiCLIWrapper.execute_cli_command', return_value=output) as backend:
+            first = analyze_code_with_cli("open(path)", "security")
+            second = analyze_code_with_cli("open(path)", "security")
+
+        self.assertEqual(backend.call_count, 1)
+        self.assertEqual(first, second)
+        self.assertEqual(
+            CACHE_HITS.value(tool="analyze_code", analysis_type="security", source="cache"), hits + 1
+        )
+
+    def test_failures_are_not_cached(self):
+        """Test a failed call is retried rather than served from cache."""
+        output = {"success": False, "output": None, "error": "boom"}
+        with patch('app.tools.GeminiCLIWrapper.execute_cli_command', return_value=output) as backend:
+            analyze_code_with_cli("open(path)", "security")
+            analyze_code_with_cli("open(path)", "security")
+
+        self.assertEqual(backend.call_count, 2)
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,122 @@
+"""Tests for single-flight coalescing of identical tool calls."""
+
+import threading
+import time
+import unittest
+from concurrent.futures import ThreadPoolExecutor
+from unittest.mock import patch
+
+from app.tools import analyze_code_with_cli, generate_code_with_cli
+from app.utils.singleflight import SingleFlight, make_cache_key
+
+
+class FakeBackend:
+    """Stand-in for GeminiCLIWrapper.execute_cli_command that counts invocations."""
+
+    def __init__(self, latency: float = 0.2):
+        self.latency = latency
+        self.calls = 0
+        self._lock = threading.Lock()
+
+    def __call__(self, prompt, timeout=60, **kwargs):
+        with self._lock:
+            self.calls += 1
+        time.sleep(self.latency)
+        return {"success": True, "output": '{"severity": "low", "vulnerabilities": []}', "error": None}
+
+
+def run_concurrently(fn, args_list):
+    """Call fn once per argument tuple, all at the same moment."""
+    barrier = threading.Barrier(len(args_list))
+
+    def call(args):
+        barrier.wait()
+        return fn(*args)
+
+    with ThreadPoolExecutor(max_workers=len(args_list)) as pool:
+        return list(pool.map(call, args_list))
+
+
+@patch.dict('os.environ', {'GEMINI_API_KEY': 'test_key'})
+class TestToolCoalescing(unittest.TestCase):
+    """Concurrent identical tool calls share one backend execution."""
+
+    def test_identical_analyze_calls_share_one_execution(self):
+        """Test eight identical concurrent analyses hit the backend once."""
+        backend = FakeBackend()
+        with patch('app.tools.GeminiCLIWrapper.execute_cli_command', side_effect=backend):
+            results = run_concurrently(analyze_code_with_cli, [("open(path)", "security")] * 8)
+
+        self.assertEqual(backend.calls, 1)
+        self.assertTrue(all(r["success"] for r in results))
+        self.assertTrue(all(r["analysis"] == results[0]["analysis"] for r in results))
+        # Each caller gets its own top-level dict
+        self.assertEqual(len({id(r) for r in results}), 8)
+
+    def test_different_calls_are_not_coalesced(self):
+        """Test calls with different parameters each reach the backend."""
+        backend = FakeBackend()
+        args = [("open(path)", "security"), ("open(path)", "performance"), ("subprocess.run(cmd)", "security")]
+        with patch('app.tools.GeminiCLIWrapper.execute_cli_command', side_effect=backend):
+            run_concurrently(analyze_code_with_cli, args)
+
+        self.assertEqual(backend.calls, 3)
+
+    def test_identical_generate_calls_share_one_execution(self):
+        """Test identical concurrent generations hit the backend once."""
+        backend = FakeBackend()
+        with patch('app.tools.GeminiCLIWrapper.execute_cli_command', side_effect=backend):
+            results = run_concurrently(generate_code_with_cli, [("hello world", "python", "simple")] * 5)
+
+        self.assertEqual(backend.calls, 1)
+        self.assertTrue(all(r["success"] for r in results))
+
+    def test_sequential_calls_are_not_cached(self):
+        """Test a completed call is not reused by later callers."""
+        backend = FakeBackend(latency=0)
+        with patch('app.tools.GeminiCLIWrapper.execute_cli_command', side_effect=backend):
+            analyze_code_with_cli("open(path)", "security")
+            analyze_code_with_cli("open(path)", "security")
+
+        self.assertEqual(backend.calls, 2)
+
+
+class TestSingleFlight(unittest.TestCase):
+    """Test cases for the SingleFlight primitive."""
+
+    def test_errors_propagate_to_all_waiters(self):
+        """Test every coalesced caller sees the leader's exception."""
+        flight = SingleFlight()
+        calls = []
+
+        def failing():
+            calls.append(1)
+            time.sleep(0.1)
+            raise RuntimeError("backend down")
+
+        def call():
+            try:
+                flight.do("key", failing)
+            except RuntimeError as e:
+                return str(e)
+
+        results = run_concurrently(lambda: call(), [()] * 4)
+
+        self.assertEqual(len(calls), 1)
+        self.assertEqual(results, ["backend down"] * 4)
+        self.assertEqual(flight.in_flight(), 0)
+
+    def test_cache_key_is_order_independent(self):
+        """Test parameter order does not change the key."""
+        self.assertEqual(
+            make_cache_key("analyze_code", code="x", analysis_type="security"),
+            make_cache_key("analyze_code", analysis_type="security", code="x")
+        )
+        self.assertNotEqual(
+            make_cache_key("analyze_code", code="x"),
+            make_cache_key("generate_code", code="x")
+        )
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,243 @@
+"""Tests for tenants, token quotas and the weighted fair scheduler."""
+
+import asyncio
+import os
+import tempfile
+import threading
+import unittest
+from unittest.mock import patch
+
+from app.tenancy import (
+    FairScheduler, Tenant, TenantBusyError, TenantGate, TenantRegistry, TokenQuota, hash_api_key, scoped_session
+)
+
+
+class TestTenantRegistry(unittest.TestCase):
+    """Test cases for TenantRegistry."""
+
+    def setUp(self):
+        self.registry = TenantRegistry.from_config({
+            "tenants": [
+                {"name": "web", "api_key": "web-key", "weight": 4, "max_concurrency": 8},
+                {"name": "ci", "api_key_sha256": hash_api_key("ci-key"), "token_quota": 1000},
+            ]
+        })
+
+    def test_authenticate_by_key_or_digest(self):
+        """Test plain and pre-hashed keys both resolve to their tenant."""
+        self.assertEqual(self.registry.authenticate("web-key").weight, 4)
+        self.assertEqual(self.registry.authenticate("ci-key").token_quota, 1000)
+        self.assertIsNone(self.registry.authenticate("wrong"))
+
+    def test_anonymous_tenant_is_optional(self):
+        """Test requests without a key are rejected unless an anonymous tenant is configured."""
+        self.assertIsNone(self.registry.authenticate(None))
+        registry = TenantRegistry.from_config({"tenants": [], "anonymous": {"max_concurrency": 1}})
+        self.assertEqual(registry.authenticate(None).name, "anonymous")
+
+    def test_invalid_config(self):
+        """Test missing keys and bad limits are rejected."""
+        with self.assertRaises(ValueError):
+            TenantRegistry.from_config({"tenants": [{"name": "nokey"}]})
+        with self.assertRaises(ValueError):
+            TenantRegistry.from_config({"tenants": [{"name": "t", "api_key": "k", "weight": 0}]})
+
+    def test_from_env(self):
+        """Test AGENT_TENANTS accepts inline JSON and is optional."""
+        with patch.dict('os.environ', {'AGENT_TENANTS': '{"tenants": [{"name": "a", "api_key": "k"}]}'}):
+            self.assertEqual(TenantRegistry.from_env().authenticate("k").name, "a")
+        with patch.dict('os.environ', {'AGENT_TENANTS': ''}):
+            self.assertIsNone(TenantRegistry.from_env())
+
+    def test_sessions_are_scoped_per_tenant(self):
+        """Test session ids are namespaced by tenant."""
+        self.assertEqual(scoped_session(Tenant("web"), "s1"), "web:s1")
+        self.assertEqual(scoped_session(None, "s1"), "s1")
+        self.assertIsNone(scoped_session(Tenant("web"), None))
+
+
+class TestTokenQuota(unittest.TestCase):
+    """Test cases for TokenQuota."""
+
+    def setUp(self):
+        self.tmpdir = tempfile.TemporaryDirectory()
+        self.quota = TokenQuota(os.path.join(self.tmpdir.name, "quota.db"))
+        self.tenant = Tenant("ci", token_quota=100, quota_window=60)
+
+    def tearDown(self):
+        self.tmpdir.cleanup()
+
+    def test_charges_accumulate_within_window(self):
+        """Test usage adds up and remaining never goes negative."""
+        with patch('app.tenancy.time.time', return_value=1000.0):
+            self.quota.charge(self.tenant, 70)
+            self.assertEqual(self.quota.remaining(self.tenant), 30)
+            self.quota.charge(self.tenant, 50)
+            self.assertEqual(self.quota.remaining(self.tenant), 0)
+            self.assertEqual(self.quota.retry_after(self.tenant), 20)
+
+    def test_usage_resets_in_next_window(self):
+        """Test a new window starts from zero."""
+        with patch('app.tenancy.time.time', return_value=1000.0):
+            self.quota.charge(self.tenant, 100)
+        with patch('app.tenancy.time.time', return_value=1021.0):
+            self.assertEqual(self.quota.remaining(self.tenant), 100)
+
+    def test_unlimited_tenant(self):
+        """Test tenants without a quota have no remaining limit."""
+        self.assertIsNone(self.quota.remaining(Tenant("web")))
+
+
+class TestFairScheduler(unittest.TestCase):
+    """Test cases for FairScheduler."""
+
+    def grant_order(self, scheduler, futures):
+        """Release slots one at a time and record which waiter is granted next."""
+        order = []
+        pending = list(futures)
+        while pending:
+            granted = next(item for item in pending if item[1].done())
+            pending.remove(granted)
+            order.append(granted[0])
+            scheduler.release(granted[2])
+        return order
+
+    def test_light_tenant_overtakes_flooding_tenant(self):
+        """Test a new tenant's call goes ahead of another tenant's backlog."""
+        scheduler = FairScheduler(capacity=1)
+        batch, interactive = Tenant("ci", max_concurrency=1), Tenant("web")
+        running = scheduler.submit(batch)
+        self.assertTrue(running.done())
+        queued = [("ci", scheduler.submit(batch), batch) for _ in range(5)]
+        queued.append(("web", scheduler.submit(interactive), interactive))
+
+        scheduler.release(batch)
+        self.assertEqual(self.grant_order(scheduler, queued), ["web"] + ["ci"] * 5)
+
+    def test_weights_set_the_share(self):
+        """Test two backlogged tenants get slots in proportion to their weights."""
+        scheduler = FairScheduler(capacity=1)
+        heavy, light = Tenant("heavy", weight=3), Tenant("light", weight=1)
+        blocker = Tenant("blocker")
+        scheduler.submit(blocker)
+        queued = []
+        for _ in range(8):
+            queued.append(("heavy", scheduler.submit(heavy), heavy))
+            queued.append(("light", scheduler.submit(light), light))
+
+        scheduler.release(blocker)
+        first_eight = self.grant_order(scheduler, queued)[:8]
+        self.assertEqual(first_eight.count("heavy"), 6)
+
+    def test_per_tenant_concurrency_cap(self):
+        """Test a tenant at its cap waits while others use free capacity."""
+        scheduler = FairScheduler(capacity=4)
+        capped, other = Tenant("capped", max_concurrency=1), Tenant("other")
+        first = scheduler.submit(capped)
+        second = scheduler.submit(capped)
+        third = scheduler.submit(other)
+
+        self.assertTrue(first.done())
+        self.assertFalse(second.done())
+        self.assertTrue(third.done())
+        scheduler.release(capped)
+        self.assertTrue(second.done())
+
+    def test_queue_limit(self):
+        """Test a tenant with max_queued waiting calls is refused."""
+        scheduler = FairScheduler(capacity=1)
+        tenant = Tenant("ci", max_concurrency=1, max_queued=2)
+        scheduler.submit(tenant)
+        scheduler.submit(tenant)
+        scheduler.submit(tenant)
+        with self.assertRaises(TenantBusyError):
+            scheduler.submit(tenant)
+
+    def test_cancelled_async_waiter_frees_its_place(self):
+        """Test cancelling a waiting aslot leaves the queue usable."""
+        scheduler = FairScheduler(capacity=1)
+        tenant = Tenant("web")
+
+        async def scenario():
+            holder = scheduler.submit(tenant)
+
+            async def wait_for_slot():
+                async with scheduler.aslot(tenant):
+                    pass
+
+            waiter = asyncio.ensure_future(wait_for_slot())
+            await asyncio.sleep(0.01)
+            waiter.cancel()
+            with self.assertRaises(asyncio.CancelledError):
+                await waiter
+            self.assertTrue(holder.done())
+            scheduler.release(tenant)
+            async with scheduler.aslot(tenant):
+                return scheduler.stats()
+
+        self.assertEqual(asyncio.run(scenario()), {"web": {"running": 1, "queued": 0}})
+        self.assertEqual(scheduler.stats(), {"web": {"running": 0, "queued": 0}})
+
+
+class TestTenantGate(unittest.TestCase):
+    """Test cases for TenantGate."""
+
+    def setUp(self):
+        self.tmpdir = tempfile.TemporaryDirectory()
+        self.tenant = Tenant("ci", max_concurrency=2, token_quota=10000)
+        self.gate = TenantGate(
+            TenantRegistry([("digest", self.tenant)]),
+            FairScheduler(capacity=8),
+            TokenQuota(os.path.join(self.tmpdir.name, "quota.db"))
+        )
+
+    def tearDown(self):
+        self.tmpdir.cleanup()
+
+    def test_call_respects_cap_and_charges_quota(self):
+        """Test concurrent calls stay under the tenant cap and are charged."""
+        active = []
+        peak = []
+        lock = threading.Lock()
+
+        def tool(code):
+            with lock:
+                active.append(code)
+                peak.append(len(active))
+            threading.Event().wait(0.02)
+            with lock:
+                active.remove(code)
+            return {"success": True, "analysis": {"summary": "ok"}}
+
+        threads = [threading.Thread(target=self.gate.call, args=(self.tenant, tool, "x" * 400)) for _ in range(6)]
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+
+        self.assertLessEqual(max(peak), 2)
+        self.assertGreater(self.gate.quota.used(self.tenant), 6 * 100)
+
+    def test_iterate_charges_a_stream_stopped_early(self):
+        """Test a stream the consumer abandons still releases its slot and is charged."""
+        def tool(task):
+            while True:
+                yield {"event": "chunk", "data": {"text": "x" * 400}}
+
+        events = self.gate.iterate(self.tenant, tool, "task")
+        next(events)
+        next(events)
+        events.close()
+
+        self.assertGreaterEqual(self.gate.quota.used(self.tenant), 200)
+        self.assertEqual(self.gate.scheduler.stats(), {"ci": {"running": 0, "queued": 0}})
+
+    def test_admit_refuses_exhausted_quota(self):
+        """Test admission fails with a retry delay once the quota is used up."""
+        self.assertIsNone(self.gate.admit(self.tenant))
+        self.gate.quota.charge(self.tenant, 10000)
+        self.assertGreaterEqual(self.gate.admit(self.tenant), 1)
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,160 @@
+"""Tests for generated code validation and targeted repair."""
+
+import unittest
+from unittest.mock import patch
+
+from app import validation
+from app.tools import generate_code_with_cli
+
+
+def ok(output):
+    return {"success": True, "output": output, "error": None}
+
+
+class TestStripFences(unittest.TestCase):
+    """Test cases for validation.strip_fences."""
+
+    def test_prose_around_fenced_block_is_removed(self):
+        """Test only the fenced code is kept."""
+        text = "Here you go:\n```python\ndef f():\n    return 1\n```\nEnjoy!"
+        self.assertEqual(validation.strip_fences(text, "python"), ("def f():\n    return 1", True))
+
+    def test_block_for_requested_language_is_chosen(self):
+        """Test a block tagged with another language is skipped."""
+        text = "```bash\npip install x\n```\n```js\nconst a = 1;\n```"
+        self.assertEqual(validation.strip_fences(text, "javascript"), ("const a = 1;", True))
+
+    def test_unclosed_fence_is_incomplete(self):
+        """Test an unclosed block is reported as cut off."""
+        self.assertEqual(validation.strip_fences("```python\nx = 1\n", "python"), ("x = 1", False))
+
+    def test_lone_closing_fence_ends_code(self):
+        """Test a continuation ending with just a closing fence keeps its code."""
+        self.assertEqual(validation.strip_fences("    return x\n```", "python"), ("    return x", True))
+
+    def test_plain_output_is_unchanged(self):
+        """Test output without fences is returned as is."""
+        self.assertEqual(validation.strip_fences("x = 1\n", "python"), ("x = 1", True))
+
+
+class TestCheckers(unittest.TestCase):
+    """Test cases for the Python and JavaScript syntax checks."""
+
+    def test_python_truncated_vs_invalid(self):
+        """Test errors at the end of input count as truncation."""
+        self.assertEqual(validation.check_python("def f(x):\n    return (x +\n").status, validation.TRUNCATED)
+        self.assertEqual(validation.check_python("def f(x):\n").status, validation.TRUNCATED)
+        result = validation.check_python("def f(x)\n    return x\n\ndef g():\n    pass\n")
+        self.assertEqual((result.status, result.line), (validation.INVALID, 1))
+
+    def test_javascript_valid_code(self):
+        """Test strings, templates, regexes and comments do not confuse the tokenizer."""
+        code = (
+            "// braces in comments: {\n"
+            "function f(a) {\n"
+            "  const s = `x ${a + {b: '}'}.b} y`; /* ) */\n"
+            "  return /[/}]+/g.test(s) ? 1 / 2 : \"{\";\n"
+            "}\n"
+        )
+        self.assertEqual(validation.check_javascript(code).status, validation.OK)
+
+    def test_javascript_errors(self):
+        """Test unclosed blocks are truncation and mismatches are invalid."""
+        truncated = validation.check_javascript("function f(a) {\n  if (a) {\n    return `x")
+        self.assertEqual(truncated.status, validation.TRUNCATED)
+        invalid = validation.check_javascript("function f(a) {\n  return a);\n}\n")
+        self.assertEqual((invalid.status, invalid.line), (validation.INVALID, 2))
+
+    def test_unknown_language_is_unchecked(self):
+        """Test languages without a checker pass unless cut off."""
+        self.assertEqual(validation.validate("package main", "go").status, validation.UNCHECKED)
+        self.assertEqual(validation.validate("package main", "go", complete=False).status, validation.TRUNCATED)
+
+
+class TestRepairHelpers(unittest.TestCase):
+    """Test cases for the continuation and repair helpers."""
+
+    def test_enclosing_block_keeps_decorators(self):
+        """Test the block range starts at the decorator and stops before the next block."""
+        code = "import os\n\n@cache\n@trace\ndef f(x)\n    return x\n\ndef g():\n    pass\n"
+        self.assertEqual(validation.enclosing_block(code, 5), (3, 6))
+
+    def test_stitch_drops_repeated_lines(self):
+        """Test lines the continuation repeats are not duplicated."""
+        kept = "def f(x):\n    total = x * 2"
+        self.assertEqual(
+            validation.stitch(kept, "    total = x * 2\n    return total"),
+            "def f(x):\n    total = x * 2\n    return total"
+        )
+
+    def test_stitch_keeps_short_repeated_lines(self):
+        """Test a repeated lone brace is not treated as overlap."""
+        self.assertEqual(validation.stitch("a {\n  }", "  }\n}"), "a {\n  }\n  }\n}")
+
+
+@patch.dict('os.environ', {'GEMINI_API_KEY': 'test_key'})
+class TestGenerateRepair(unittest.TestCase):
+    """generate_code_with_cli validates and repairs its output."""
+
+    def test_valid_code_needs_no_follow_up(self):
+        """Test fenced valid code is cleaned with a single call."""
+        with patch('app.tools.GeminiCLIWrapper.execute_cli_command',
+                   return_value=ok("```python\ndef add(a, b):\n    return a + b\n```")) as backend:
+            result = generate_code_with_cli("add numbers one", "python", "simple")
+
+        self.assertEqual(backend.call_count, 1)
+        self.assertEqual(result["code"], "def add(a, b):\n    return a + b")
+        self.assertEqual(result["validation"], {"status": "ok", "repairs": 0})
+
+    def test_truncated_code_is_continued(self):
+        """Test a cut-off answer gets a continuation from its tail only."""
+        first = "```python\nimport math\n\ndef area(r):\n    value = math.pi * r"
+        responses = [ok(first), ok("    value = math.pi * r * r\n    return value\n```")]
+        with patch('app.tools.GeminiCLIWrapper.execute_cli_command', side_effect=responses) as backend:
+            result = generate_code_with_cli("circle area two", "python", "simple")
+
+        prompt = backend.call_args_list[1][0][0]
+        self.assertIn("def area(r):", prompt)
+        self.assertNotIn("value = math.pi", prompt)
+        self.assertEqual(result["code"], "import math\n\ndef area(r):\n    value = math.pi * r * r\n    return value")
+        self.assertEqual(result["validation"], {"status": "ok", "repairs": 1})
+
+    def test_invalid_block_is_repaired_in_place(self):
+        """Test only the broken top-level block is sent for repair."""
+        code = "def good():\n    return 1\n\ndef bad(x)\n    return x\n\ndef other():\n    return 2"
+        responses = [ok(code), ok("def bad(x):\n    return x")]
+        with patch('app.tools.GeminiCLIWrapper.execute_cli_command', side_effect=responses) as backend:
+            result = generate_code_with_cli("three functions", "python", "simple")
+
+        prompt = backend.call_args_list[1][0][0]
+        self.assertIn("def bad(x)", prompt)
+        self.assertNotIn("def good", prompt)
+        self.assertNotIn("def other", prompt)
+        self.assertEqual(result["code"], code.replace("def bad(x)", "def bad(x):"))
+        self.assertEqual(result["validation"]["status"], "ok")
+
+    def test_timeout_partial_output_is_continued(self):
+        """Test a timed-out call is completed from its partial output."""
+        timed_out = {"success": False, "output": None, "error": "Command timed out after 60 seconds",
+                     "partial_output": "function double(x) {\n  const y = x * 2;\n  return y"}
+        responses = [timed_out, ok("  return y;\n}")]
+        with patch('app.tools.GeminiCLIWrapper.execute_cli_command', side_effect=responses):
+            result = generate_code_with_cli("double a number", "javascript", "simple")
+
+        self.assertTrue(result["success"])
+        self.assertEqual(result["code"], "function double(x) {\n  const y = x * 2;\n  return y;\n}")
+
+    def test_unfixable_code_reports_error(self):
+        """Test attempts stop when a repair changes nothing and the error is reported."""
+        broken = ok("def bad(x)\n    return x")
+        with patch('app.tools.GeminiCLIWrapper.execute_cli_command', return_value=broken) as backend:
+            result = generate_code_with_cli("unfixable", "python", "simple")
+
+        self.assertEqual(backend.call_count, 2)
+        self.assertTrue(result["success"])
+        self.assertEqual(result["validation"]["status"], "invalid")
+        self.assertIn("line 1", result["validation"]["error"])
+
+
+if __name__ == '__main__':
+    unittest.main()
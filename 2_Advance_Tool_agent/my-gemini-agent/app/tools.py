@@ -6,6 +6,7 @@ enabling code generation and analysis through subprocess execution.
 
 Key Components:
 - GeminiCLIWrapper: Core class for CLI interaction
+- RetryPolicy / CircuitBreaker: Retry and fail-fast behaviour for CLI calls
 - generate_code_with_cli: Tool for generating code
 - analyze_code_with_cli: Tool for analyzing code
 
@@ -13,14 +14,19 @@ Author: AI Agent Builder
 License: MIT
 """
 
+import asyncio
 import subprocess
 import json
 import logging
 import os
+import random
+import re
 import sys
+import threading
 import time
-from typing import Dict, Any, Optional, List
-from dataclasses import dataclass, asdict
+from enum import Enum
+from typing import Dict, Any, Optional, List, Tuple
+from dataclasses import dataclass, asdict, field
 
 # Configure logging
 logging.basicConfig(
@@ -42,6 +48,7 @@ class ToolResult:
         execution_time: Time taken to execute in seconds
         tool_name: Name of the tool that was executed
         metadata: Additional metadata about the execution
+        error_type: ErrorKind value describing why execution failed
     """
     success: bool
     data: Any
@@ -49,12 +56,195 @@ class ToolResult:
     execution_time: float = 0.0
     tool_name: str = ""
     metadata: Dict[str, Any] = None
+    error_type: Optional[str] = None
     
     def to_dict(self) -> Dict[str, Any]:
         """Convert result to dictionary format."""
         return asdict(self)
 
 
+# The error taxonomy and RetryPolicy are kept identical to
+# my-gemini-adk-agent/app/execution.py: both projects ship as their own
+# top-level `app` package, so neither can import the other. That project's
+# tests/test_execution.py fails if the two copies drift apart.
+class ErrorKind(str, Enum):
+    """Classification of a failed call, used to decide whether to retry."""
+    TRANSIENT = "transient"              # Network blips, 5xx, unknown failures
+    QUOTA = "quota"                      # Rate limited / quota exhausted upstream
+    TIMEOUT = "timeout"                  # CLI did not finish in time
+    INVALID_REQUEST = "invalid_request"  # Bad or oversized prompt
+    AUTH = "auth"                        # Missing or rejected API key
+    NOT_INSTALLED = "not_installed"      # Gemini CLI binary not found
+    CIRCUIT_OPEN = "circuit_open"        # Backend marked down, call not attempted
+    DEADLINE = "deadline"                # Total retry deadline exhausted
+    RATE_LIMITED = "rate_limited"        # Refused by a local rate limit
+    NOT_FOUND = "not_found"              # No tool registered under that name
+
+
+# Checked in order against the error message; the first match wins
+_ERROR_PATTERNS = [
+    (ErrorKind.NOT_INSTALLED, re.compile(r"CLI not found", re.I)),
+    (ErrorKind.TIMEOUT, re.compile(r"timed out", re.I)),
+    (ErrorKind.QUOTA, re.compile(r"\b429\b|quota|rate.?limit|resource.?exhausted|too many requests", re.I)),
+    (ErrorKind.AUTH, re.compile(r"\b40[13]\b|api.?key|unauthori[sz]ed|unauthenticated|permission.?denied", re.I)),
+    (ErrorKind.INVALID_REQUEST, re.compile(
+        r"\b400\b|invalid.?argument|bad request|too long|token limit|context length|safety", re.I)),
+]
+
+
+def classify_error(error: Optional[str]) -> ErrorKind:
+    """
+    Classify a failure from its error message (e.g. the CLI's stderr).
+    
+    Returns:
+        The matching ErrorKind; unrecognised failures count as TRANSIENT
+    """
+    for kind, pattern in _ERROR_PATTERNS:
+        if pattern.search(error or ""):
+            return kind
+    return ErrorKind.TRANSIENT
+
+
+@dataclass
+class RetryPolicy:
+    """
+    When and how long to wait before retrying a failed call.
+    
+    Delays grow exponentially from ``base_delay`` and use "full jitter"
+    (a random delay between 0 and the exponential value) so that many
+    callers failing at once do not retry in lockstep. Quota errors back off
+    ``quota_multiplier`` times longer. No retry is scheduled that would
+    end after ``deadline`` seconds from the first attempt.
+    
+    Attributes:
+        max_retries: Retries after the first attempt
+        base_delay: Upper bound of the first backoff in seconds
+        max_delay: Cap on any single backoff in seconds
+        multiplier: Growth factor of the backoff per attempt
+        quota_multiplier: Extra backoff factor for quota errors
+        deadline: Total time budget for all attempts in seconds
+        retryable: Error kinds worth retrying
+    """
+    max_retries: int = 2
+    base_delay: float = 0.5
+    max_delay: float = 8.0
+    multiplier: float = 2.0
+    quota_multiplier: float = 4.0
+    deadline: float = 90.0
+    retryable: frozenset = field(default_factory=lambda: frozenset({
+        ErrorKind.TRANSIENT, ErrorKind.QUOTA, ErrorKind.TIMEOUT
+    }))
+    
+    def remaining(self, start_time: float) -> float:
+        """Seconds left before the deadline of a call started at start_time."""
+        return self.deadline - (time.monotonic() - start_time)
+    
+    def next_delay(self, attempt: int, kind: ErrorKind, start_time: float) -> Optional[float]:
+        """
+        Backoff before the next attempt, or None if the call should give up.
+        
+        Args:
+            attempt: Zero-based index of the attempt that just failed
+            kind: Classification of its failure
+            start_time: time.monotonic() when the first attempt started
+        """
+        if kind not in self.retryable or attempt >= self.max_retries:
+            return None
+        ceiling = self.base_delay * (self.multiplier ** attempt)
+        if kind == ErrorKind.QUOTA:
+            ceiling *= self.quota_multiplier
+        delay = random.uniform(0, min(self.max_delay, ceiling))
+        # Leave time for the next attempt to actually run
+        if delay >= self.remaining(start_time) - 1:
+            return None
+        return delay
+
+
+class CircuitBreaker:
+    """
+    Fails calls fast while the Gemini backend looks down.
+    
+    After ``failure_threshold`` consecutive backend failures (transient,
+    quota or timeout errors) the circuit opens and calls are rejected
+    without spawning the CLI. Once ``reset_timeout`` seconds have passed a
+    single probe call is let through (half-open); its success closes the
+    circuit and its failure opens it again. Thread-safe, so one breaker can
+    be shared by every wrapper in the process.
+    """
+    
+    CLOSED = "closed"
+    OPEN = "open"
+    HALF_OPEN = "half_open"
+    
+    # Failures that say something about backend health; bad prompts do not
+    TRIPPING_ERRORS = frozenset({ErrorKind.TRANSIENT, ErrorKind.QUOTA, ErrorKind.TIMEOUT})
+    
+    def __init__(self, failure_threshold: int = 5, reset_timeout: float = 30.0):
+        self.failure_threshold = failure_threshold
+        self.reset_timeout = reset_timeout
+        self._state = self.CLOSED
+        self._failures = 0
+        self._opened_at = 0.0
+        self._probe_in_flight = False
+        self._lock = threading.Lock()
+    
+    @property
+    def state(self) -> str:
+        with self._lock:
+            if self._state == self.OPEN and time.monotonic() - self._opened_at >= self.reset_timeout:
+                return self.HALF_OPEN
+            return self._state
+    
+    def allow(self) -> bool:
+        """Return True if a call may be attempted now."""
+        with self._lock:
+            if self._state == self.CLOSED:
+                return True
+            if self._state == self.OPEN:
+                if time.monotonic() - self._opened_at < self.reset_timeout:
+                    return False
+                self._state = self.HALF_OPEN
+            # Half-open: only one probe at a time
+            if self._probe_in_flight:
+                return False
+            self._probe_in_flight = True
+            return True
+    
+    def record_success(self) -> None:
+        with self._lock:
+            self._state = self.CLOSED
+            self._failures = 0
+            self._probe_in_flight = False
+    
+    def record_failure(self, kind: ErrorKind) -> None:
+        with self._lock:
+            self._probe_in_flight = False
+            if kind not in self.TRIPPING_ERRORS:
+                if self._state == self.HALF_OPEN:
+                    # The probe reached the backend, so it is up
+                    self._state = self.CLOSED
+                    self._failures = 0
+                return
+            self._failures += 1
+            if self._state == self.HALF_OPEN or self._failures >= self.failure_threshold:
+                if self._state != self.OPEN:
+                    logger.warning(f"Circuit breaker opened after {self._failures} consecutive failures")
+                self._state = self.OPEN
+                self._opened_at = time.monotonic()
+    
+    def retry_after(self) -> float:
+        """Seconds until an open circuit lets a probe through."""
+        with self._lock:
+            if self._state != self.OPEN:
+                return 0.0
+            return max(0.0, self.reset_timeout - (time.monotonic() - self._opened_at))
+
+
+# Wrappers are created per tool call, so the breaker lives at module level
+# to track backend health across all of them.
+default_circuit_breaker = CircuitBreaker()
+
+
 class GeminiCLIWrapper:
     """
     Comprehensive wrapper for Google Gemini CLI interactions.
@@ -76,19 +266,30 @@ class GeminiCLIWrapper:
         result = wrapper.execute_prompt("Generate a Python function")
     """
     
-    def __init__(self, api_key: Optional[str] = None, timeout: int = 40):
+    def __init__(
+        self,
+        api_key: Optional[str] = None,
+        timeout: int = 40,
+        retry_policy: Optional[RetryPolicy] = None,
+        circuit_breaker: Optional[CircuitBreaker] = None
+    ):
         """
         Initialize the Gemini CLI wrapper.
         
         Args:
             api_key: Gemini API key (defaults to GEMINI_API_KEY env var)
-            timeout: Maximum execution time in seconds (default: 40)
+            timeout: Maximum execution time per attempt in seconds (default: 40)
+            retry_policy: Retry behaviour (default: RetryPolicy())
+            circuit_breaker: Breaker to consult before each attempt
+                (default: the process-wide default_circuit_breaker)
         
         Raises:
             ValueError: If API key is not provided or found in environment
         """
         self.api_key = api_key or os.getenv('GEMINI_API_KEY')
         self.timeout = timeout
+        self.retry_policy = retry_policy or RetryPolicy()
+        self.circuit_breaker = circuit_breaker or default_circuit_breaker
         
         if not self.api_key:
             logger.error("GEMINI_API_KEY not found in environment")
@@ -143,16 +344,110 @@ class GeminiCLIWrapper:
             logger.error(f"Gemini CLI validation failed: {e}")
             return False
     
-    def execute_prompt(self, prompt: str, max_retries: int = 2) -> ToolResult:
+    def _policy(self, max_retries: Optional[int]) -> RetryPolicy:
+        """Retry policy for one call, honouring a per-call max_retries override."""
+        if max_retries is None:
+            return self.retry_policy
+        return RetryPolicy(**{**asdict(self.retry_policy), "max_retries": max_retries})
+    
+    def _attempt_timeout(self, policy: RetryPolicy, start_time: float) -> float:
+        """Per-attempt timeout, shortened so the attempt ends before the deadline."""
+        return max(0.1, min(self.timeout, policy.remaining(start_time)))
+    
+    def _check_result(self, returncode: int, stdout: str, stderr: str) -> Tuple[Optional[ErrorKind], str]:
+        """Return (None, output) on success or (error kind, error message) on failure."""
+        if returncode == 0:
+            return None, stdout.strip()
+        error_msg = stderr.strip() or "Unknown error"
+        return classify_error(error_msg), error_msg
+    
+    def _rejected(self, start_time: float) -> ToolResult:
+        """Result for a call refused by the open circuit breaker."""
+        retry_after = self.circuit_breaker.retry_after()
+        logger.warning(f"Circuit open, rejecting CLI call (retry in {retry_after:.1f}s)")
+        return ToolResult(
+            success=False,
+            data=None,
+            error=f"Gemini backend unavailable (circuit open, retry in {retry_after:.0f}s)",
+            execution_time=time.monotonic() - start_time,
+            tool_name="gemini_cli",
+            metadata={"retry_after": retry_after},
+            error_type=ErrorKind.CIRCUIT_OPEN.value
+        )
+    
+    def _success(self, output: str, prompt: str, attempt: int, start_time: float) -> ToolResult:
+        execution_time = time.monotonic() - start_time
+        logger.info(f"CLI execution successful (took {execution_time:.2f}s)")
+        self.circuit_breaker.record_success()
+        return ToolResult(
+            success=True,
+            data=output,
+            execution_time=execution_time,
+            tool_name="gemini_cli",
+            metadata={
+                "prompt_length": len(prompt),
+                "response_length": len(output),
+                "attempt": attempt + 1
+            }
+        )
+    
+    def _failure(self, kind: ErrorKind, error: str, attempt: int, start_time: float) -> ToolResult:
+        return ToolResult(
+            success=False,
+            data=None,
+            error=error,
+            execution_time=time.monotonic() - start_time,
+            tool_name="gemini_cli",
+            metadata={"attempt": attempt + 1},
+            error_type=kind.value
+        )
+    
+    def _after_failure(
+        self, policy: RetryPolicy, kind: ErrorKind, error_msg: str, attempt: int, start_time: float,
+        timeout: float
+    ) -> Tuple[Optional[float], Optional[ToolResult]]:
+        """
+        Record a failed attempt and decide what happens next.
+        
+        Args:
+            timeout: Timeout the failed attempt ran with (capped by the deadline)
+        
+        Returns:
+            (delay, None) to retry after ``delay`` seconds, or (None, result)
+            with the final failed result
+        """
+        logger.warning(f"CLI returned {kind.value} error (attempt {attempt + 1}): {error_msg}")
+        self.circuit_breaker.record_failure(kind)
+        delay = policy.next_delay(attempt, kind, start_time)
+        if delay is not None:
+            logger.info(f"Retrying in {delay:.2f}s... ({attempt + 1}/{policy.max_retries})")
+            return delay, None
+        
+        if kind == ErrorKind.TIMEOUT:
+            error = f"Execution timed out after {round(timeout, 1):g} seconds"
+        elif kind == ErrorKind.NOT_INSTALLED:
+            error = "Gemini CLI not found. Please install: npm install -g @google/generative-ai-cli"
+        else:
+            error = f"CLI execution failed: {error_msg}"
+        if kind in policy.retryable and attempt < policy.max_retries:
+            kind = ErrorKind.DEADLINE
+            error = f"{error} (retry deadline of {policy.deadline:.0f}s exhausted)"
+        return None, self._failure(kind, error, attempt, start_time)
+    
+    def execute_prompt(self, prompt: str, max_retries: Optional[int] = None) -> ToolResult:
         """
         Execute a prompt using Gemini CLI with retry logic.
         
         This method handles the core CLI execution with comprehensive error handling,
-        timeout protection, and automatic retries on transient failures.
+        timeout protection, and automatic retries on transient failures. Errors are
+        classified so that bad prompts and auth problems fail immediately, while
+        transient, quota and timeout errors are retried with jittered exponential
+        backoff inside the policy's total deadline. While the circuit breaker is
+        open the call returns at once without spawning the CLI.
         
         Args:
             prompt: The prompt to send to Gemini
-            max_retries: Maximum number of retry attempts (default: 2)
+            max_retries: Override for the policy's maximum retry attempts
         
         Returns:
             ToolResult containing the CLI response or error information
@@ -162,100 +457,109 @@ class GeminiCLIWrapper:
             if result.success:
                 print(result.data)
         """
-        start_time = time.time()
+        start_time = time.monotonic()
+        policy = self._policy(max_retries)
         
         # Log the command being executed (truncate long prompts)
         prompt_preview = prompt[:100] + "..." if len(prompt) > 100 else prompt
         logger.info(f"Executing Gemini CLI: gemini -p \"{prompt_preview}\"")
         
-        for attempt in range(max_retries + 1):
+        attempt = 0
+        while True:
+            if not self.circuit_breaker.allow():
+                return self._rejected(start_time)
+            
+            timeout = self._attempt_timeout(policy, start_time)
             try:
-                # Build the command
-                command = [self.gemini_command, '-p', prompt]
-                
-                # Execute the CLI command
                 result = subprocess.run(
-                    command,
+                    [self.gemini_command, '-p', prompt],
                     capture_output=True,
                     text=True,
-                    timeout=self.timeout,
+                    timeout=timeout,
                     env=os.environ.copy()  # Pass environment variables
                 )
-                
-                execution_time = time.time() - start_time
-                
-                # Check if command executed successfully
-                if result.returncode == 0:
-                    output = result.stdout.strip()
-                    logger.info(f"CLI execution successful (took {execution_time:.2f}s)")
-                    
-                    return ToolResult(
-                        success=True,
-                        data=output,
-                        execution_time=execution_time,
-                        tool_name="gemini_cli",
-                        metadata={
-                            "prompt_length": len(prompt),
-                            "response_length": len(output),
-                            "attempt": attempt + 1
-                        }
-                    )
-                else:
-                    # Command failed, log error
-                    error_msg = result.stderr.strip() or "Unknown error"
-                    logger.warning(f"CLI returned error (attempt {attempt + 1}): {error_msg}")
-                    
-                    if attempt < max_retries:
-                        logger.info(f"Retrying... ({attempt + 1}/{max_retries})")
-                        time.sleep(1)  # Brief delay before retry
-                        continue
-                    
-                    return ToolResult(
-                        success=False,
-                        data=None,
-                        error=f"CLI execution failed: {error_msg}",
-                        execution_time=time.time() - start_time,
-                        tool_name="gemini_cli"
-                    )
-            
+                kind, text = self._check_result(result.returncode, result.stdout, result.stderr)
             except subprocess.TimeoutExpired:
-                logger.error(f"CLI execution timed out after {self.timeout}s")
-                return ToolResult(
-                    success=False,
-                    data=None,
-                    error=f"Execution timed out after {self.timeout} seconds",
-                    execution_time=self.timeout,
-                    tool_name="gemini_cli"
-                )
-            
+                kind, text = ErrorKind.TIMEOUT, "timed out"
             except FileNotFoundError:
-                logger.error("Gemini CLI not found. Is it installed?")
-                return ToolResult(
-                    success=False,
-                    data=None,
-                    error="Gemini CLI not found. Please install: npm install -g @google/generative-ai-cli",
-                    execution_time=time.time() - start_time,
-                    tool_name="gemini_cli"
-                )
-            
+                kind, text = ErrorKind.NOT_INSTALLED, "Gemini CLI not found"
             except Exception as e:
                 logger.error(f"Unexpected error during CLI execution: {e}")
-                return ToolResult(
-                    success=False,
-                    data=None,
-                    error=f"Unexpected error: {str(e)}",
-                    execution_time=time.time() - start_time,
-                    tool_name="gemini_cli"
-                )
+                self.circuit_breaker.record_failure(ErrorKind.TRANSIENT)
+                return self._failure(ErrorKind.TRANSIENT, f"Unexpected error: {str(e)}", attempt, start_time)
+            
+            if kind is None:
+                return self._success(text, prompt, attempt, start_time)
+            
+            delay, failed = self._after_failure(policy, kind, text, attempt, start_time, timeout)
+            if failed is not None:
+                return failed
+            time.sleep(delay)
+            attempt += 1
+    
+    async def execute_prompt_async(self, prompt: str, max_retries: Optional[int] = None) -> ToolResult:
+        """
+        Async version of execute_prompt.
         
-        # Should never reach here, but just in case
-        return ToolResult(
-            success=False,
-            data=None,
-            error="Maximum retries exceeded",
-            execution_time=time.time() - start_time,
-            tool_name="gemini_cli"
-        )
+        Runs the CLI with asyncio subprocesses and waits between retries with
+        asyncio.sleep, so retries and backoff never block the event loop.
+        
+        Args:
+            prompt: The prompt to send to Gemini
+            max_retries: Override for the policy's maximum retry attempts
+        
+        Returns:
+            ToolResult containing the CLI response or error information
+        """
+        start_time = time.monotonic()
+        policy = self._policy(max_retries)
+        
+        prompt_preview = prompt[:100] + "..." if len(prompt) > 100 else prompt
+        logger.info(f"Executing Gemini CLI (async): gemini -p \"{prompt_preview}\"")
+        
+        attempt = 0
+        while True:
+            if not self.circuit_breaker.allow():
+                return self._rejected(start_time)
+            
+            timeout = self._attempt_timeout(policy, start_time)
+            try:
+                process = await asyncio.create_subprocess_exec(
+                    self.gemini_command, '-p', prompt,
+                    stdout=asyncio.subprocess.PIPE,
+                    stderr=asyncio.subprocess.PIPE,
+                    env=os.environ.copy()
+                )
+                try:
+                    stdout, stderr = await asyncio.wait_for(
+                        process.communicate(), timeout=timeout
+                    )
+                except asyncio.TimeoutError:
+                    process.kill()
+                    await process.wait()
+                    raise
+                kind, text = self._check_result(
+                    process.returncode,
+                    stdout.decode(errors="replace"),
+                    stderr.decode(errors="replace")
+                )
+            except asyncio.TimeoutError:
+                kind, text = ErrorKind.TIMEOUT, "timed out"
+            except FileNotFoundError:
+                kind, text = ErrorKind.NOT_INSTALLED, "Gemini CLI not found"
+            except Exception as e:
+                logger.error(f"Unexpected error during CLI execution: {e}")
+                self.circuit_breaker.record_failure(ErrorKind.TRANSIENT)
+                return self._failure(ErrorKind.TRANSIENT, f"Unexpected error: {str(e)}", attempt, start_time)
+            
+            if kind is None:
+                return self._success(text, prompt, attempt, start_time)
+            
+            delay, failed = self._after_failure(policy, kind, text, attempt, start_time, timeout)
+            if failed is not None:
+                return failed
+            await asyncio.sleep(delay)
+            attempt += 1
 
 
 def generate_code_with_cli(
@@ -377,6 +681,48 @@ Return ONLY the code, no explanations before or after."""
         }
 
 
+# Checklist for each analysis type
+ANALYSIS_FOCUSES = {
+    "security": [
+        "SQL injection vulnerabilities",
+        "Command injection (exec, eval, system calls)",
+        "Path traversal vulnerabilities",
+        "Insecure deserialization",
+        "Hardcoded credentials or secrets",
+        "Insufficient input validation",
+        "Authentication and authorization issues"
+    ],
+    "performance": [
+        "Inefficient algorithms or data structures",
+        "Unnecessary loops or iterations",
+        "Memory leaks or excessive memory usage",
+        "Blocking operations that should be async",
+        "Database query optimization opportunities",
+        "Caching opportunities"
+    ],
+    "quality": [
+        "Poor naming conventions",
+        "Missing error handling",
+        "Code duplication",
+        "Overly complex functions",
+        "Missing documentation",
+        "Violation of SOLID principles"
+    ],
+    "all": [
+        "Security vulnerabilities",
+        "Performance issues",
+        "Code quality problems",
+        "Best practices violations"
+    ]
+}
+
+# The bullet list sent in the prompt, built once instead of on every call
+ANALYSIS_FOCUS_TEXT = {
+    analysis_type: "\n".join(f"- {item}" for item in items)
+    for analysis_type, items in ANALYSIS_FOCUSES.items()
+}
+
+
 def analyze_code_with_cli(
     code: str,
     analysis_type: str = "security"
@@ -409,43 +755,7 @@ def analyze_code_with_cli(
     """
     logger.info(f"Analyzing code for {analysis_type} issues")
     
-    # Define analysis focus based on type
-    analysis_focuses = {
-        "security": [
-            "SQL injection vulnerabilities",
-            "Command injection (exec, eval, system calls)",
-            "Path traversal vulnerabilities",
-            "Insecure deserialization",
-            "Hardcoded credentials or secrets",
-            "Insufficient input validation",
-            "Authentication and authorization issues"
-        ],
-        "performance": [
-            "Inefficient algorithms or data structures",
-            "Unnecessary loops or iterations",
-            "Memory leaks or excessive memory usage",
-            "Blocking operations that should be async",
-            "Database query optimization opportunities",
-            "Caching opportunities"
-        ],
-        "quality": [
-            "Poor naming conventions",
-            "Missing error handling",
-            "Code duplication",
-            "Overly complex functions",
-            "Missing documentation",
-            "Violation of SOLID principles"
-        ],
-        "all": [
-            "Security vulnerabilities",
-            "Performance issues",
-            "Code quality problems",
-            "Best practices violations"
-        ]
-    }
-    
-    focus_items = analysis_focuses.get(analysis_type, analysis_focuses["all"])
-    focus_text = "\n".join(f"- {item}" for item in focus_items)
+    focus_text = ANALYSIS_FOCUS_TEXT.get(analysis_type, ANALYSIS_FOCUS_TEXT["all"])
     
     # Construct analysis prompt
     prompt = f"""Analyze the following code for {analysis_type} issues:
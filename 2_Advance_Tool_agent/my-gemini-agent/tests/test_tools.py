@@ -0,0 +1,164 @@
+"""Tests for the retry policy and circuit breaker around Gemini CLI calls."""
+
+import asyncio
+import subprocess
+import unittest
+from unittest.mock import patch
+
+from app.tools import CircuitBreaker, ErrorKind, GeminiCLIWrapper, RetryPolicy
+
+
+class Clock:
+    """Manually advanced stand-in for time.monotonic."""
+
+    def __init__(self):
+        self.now = 1000.0
+
+    def __call__(self):
+        return self.now
+
+
+def completed(returncode=0, stdout="", stderr=""):
+    return subprocess.CompletedProcess(args=["gemini"], returncode=returncode, stdout=stdout, stderr=stderr)
+
+
+@patch.dict('os.environ', {'GEMINI_API_KEY': 'test_key'})
+class TestRetryPolicy(unittest.TestCase):
+    """Test cases for retries in GeminiCLIWrapper.execute_prompt."""
+
+    def wrapper(self, policy, timeout=40, breaker=None):
+        return GeminiCLIWrapper(timeout=timeout, retry_policy=policy, circuit_breaker=breaker or CircuitBreaker())
+
+    @patch('app.tools.time.sleep')
+    @patch('app.tools.subprocess.run')
+    def test_transient_error_is_retried(self, mock_run, mock_sleep):
+        """Test a transient failure is retried after a backoff."""
+        mock_run.side_effect = [completed(1, stderr="503 Service Unavailable"), completed(0, stdout="def f(): pass")]
+
+        result = self.wrapper(RetryPolicy(max_retries=2)).execute_prompt("prompt")
+
+        self.assertTrue(result.success)
+        self.assertEqual(result.metadata["attempt"], 2)
+        self.assertEqual(mock_run.call_count, 2)
+        self.assertEqual(mock_sleep.call_count, 1)
+        self.assertLessEqual(mock_sleep.call_args[0][0], 0.5)
+
+    @patch('app.tools.time.sleep')
+    @patch('app.tools.subprocess.run')
+    def test_permanent_error_is_not_retried(self, mock_run, mock_sleep):
+        """Test bad requests and auth errors fail on the first attempt."""
+        for stderr, kind in [("400 Bad Request: invalid argument", ErrorKind.INVALID_REQUEST),
+                             ("API key not valid", ErrorKind.AUTH)]:
+            with self.subTest(kind=kind):
+                mock_run.reset_mock()
+                mock_run.return_value = completed(1, stderr=stderr)
+
+                result = self.wrapper(RetryPolicy(max_retries=2)).execute_prompt("prompt")
+
+                self.assertFalse(result.success)
+                self.assertEqual(result.error_type, kind.value)
+                self.assertEqual(mock_run.call_count, 1)
+        mock_sleep.assert_not_called()
+
+    @patch('app.tools.time.sleep')
+    @patch('app.tools.subprocess.run')
+    def test_deadline_caps_attempts(self, mock_run, mock_sleep):
+        """Test attempt timeouts shrink to fit the deadline and the applied timeout is reported."""
+        clock = Clock()
+        timeouts = []
+
+        def run(*args, timeout, **kwargs):
+            timeouts.append(timeout)
+            clock.now += timeout
+            raise subprocess.TimeoutExpired(cmd="gemini", timeout=timeout)
+
+        mock_run.side_effect = run
+        with patch('app.tools.time.monotonic', clock):
+            result = self.wrapper(RetryPolicy(max_retries=5, deadline=25), timeout=20).execute_prompt("prompt")
+
+        self.assertEqual(timeouts, [20, 5])
+        self.assertFalse(result.success)
+        self.assertEqual(result.error_type, ErrorKind.DEADLINE.value)
+        self.assertIn("timed out after 5 seconds", result.error)
+
+    def test_async_retries_without_blocking(self):
+        """Test execute_prompt_async retries a transient failure with asyncio.sleep."""
+        outputs = [(1, b"", b"503 Service Unavailable"), (0, b"def f(): pass", b"")]
+
+        class Process:
+            def __init__(self, returncode, stdout, stderr):
+                self.returncode = returncode
+                self.output = (stdout, stderr)
+
+            async def communicate(self):
+                return self.output
+
+        async def create_subprocess_exec(*args, **kwargs):
+            return Process(*outputs.pop(0))
+
+        async def no_sleep(delay):
+            return None
+
+        wrapper = self.wrapper(RetryPolicy(max_retries=2))
+        with patch('app.tools.asyncio.create_subprocess_exec', create_subprocess_exec), \
+                patch('app.tools.asyncio.sleep', no_sleep), patch('app.tools.time.sleep') as mock_sleep:
+            result = asyncio.run(wrapper.execute_prompt_async("prompt"))
+
+        self.assertTrue(result.success)
+        self.assertEqual(result.data, "def f(): pass")
+        self.assertEqual(result.metadata["attempt"], 2)
+        mock_sleep.assert_not_called()
+
+
+@patch.dict('os.environ', {'GEMINI_API_KEY': 'test_key'})
+class TestCircuitBreaker(unittest.TestCase):
+    """Test cases for CircuitBreaker."""
+
+    @patch('app.tools.subprocess.run')
+    def test_opens_after_threshold(self, mock_run):
+        """Test calls are rejected without running the CLI once the threshold is reached."""
+        mock_run.return_value = completed(1, stderr="503 Service Unavailable")
+        breaker = CircuitBreaker(failure_threshold=3, reset_timeout=30)
+        wrapper = GeminiCLIWrapper(retry_policy=RetryPolicy(max_retries=0), circuit_breaker=breaker)
+
+        for _ in range(3):
+            self.assertEqual(wrapper.execute_prompt("prompt").error_type, ErrorKind.TRANSIENT.value)
+        rejected = wrapper.execute_prompt("prompt")
+
+        self.assertEqual(breaker.state, CircuitBreaker.OPEN)
+        self.assertEqual(rejected.error_type, ErrorKind.CIRCUIT_OPEN.value)
+        self.assertEqual(mock_run.call_count, 3)
+
+    def test_permanent_errors_do_not_trip(self):
+        """Test bad requests say nothing about backend health."""
+        breaker = CircuitBreaker(failure_threshold=2)
+        for _ in range(5):
+            breaker.record_failure(ErrorKind.INVALID_REQUEST)
+        self.assertEqual(breaker.state, CircuitBreaker.CLOSED)
+
+    def test_half_open_probe_after_reset_window(self):
+        """Test one probe is let through after the reset window and its outcome decides the state."""
+        clock = Clock()
+        breaker = CircuitBreaker(failure_threshold=1, reset_timeout=30)
+        with patch('app.tools.time.monotonic', clock):
+            breaker.record_failure(ErrorKind.TRANSIENT)
+            self.assertFalse(breaker.allow())
+
+            clock.now += 30
+            self.assertEqual(breaker.state, CircuitBreaker.HALF_OPEN)
+            self.assertTrue(breaker.allow())
+            self.assertFalse(breaker.allow())  # only one probe at a time
+
+            breaker.record_failure(ErrorKind.TIMEOUT)
+            self.assertEqual(breaker.state, CircuitBreaker.OPEN)
+            self.assertFalse(breaker.allow())
+
+            clock.now += 30
+            self.assertTrue(breaker.allow())
+            breaker.record_success()
+            self.assertEqual(breaker.state, CircuitBreaker.CLOSED)
+            self.assertTrue(breaker.allow())
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,153 @@
+#!/usr/bin/env python3
+"""
+Benchmark the single-pass rule engine in detect_common_bugs
+
+Compares RuleSet.scan (one finditer over the whole file) with the previous
+implementation, which ran every rule's re.search on every line. Checks
+that both report identical findings on sample_buggy_code.py and on each
+generated file, then times them on files of increasing size.
+
+Usage:
+    python benchmark_rules.py [--sizes 1000 10000 100000] [--repeat 5]
+"""
+
+import argparse
+import re
+import time
+from typing import Any, Dict, List
+
+from bug_assistant import PYTHON_RULES
+
+
+def legacy_detect_common_bugs(code: str) -> List[Dict[str, Any]]:
+    """The per-line implementation detect_common_bugs used before RuleSet"""
+    bugs = []
+    lines = code.split('\n')
+
+    # Dangerous function usage
+    dangerous_patterns = [
+        (r'\beval\s*\(', "eval", "Security risk: eval() can execute arbitrary code"),
+        (r'\bexec\s*\(', "exec", "Security risk: exec() can execute arbitrary code"),
+        (r'__import__\s*\(', "__import__", "Security risk: dynamic imports can be dangerous"),
+    ]
+
+    for i, line in enumerate(lines, 1):
+        # Check dangerous patterns
+        for pattern, name, message in dangerous_patterns:
+            if re.search(pattern, line):
+                bugs.append({
+                    "type": "security",
+                    "severity": "high",
+                    "line": i,
+                    "code": line.strip(),
+                    "issue": f"Dangerous function: {name}",
+                    "description": message
+                })
+
+        # Password/secret logging
+        if re.search(r'(password|secret|token|api_key)', line, re.IGNORECASE):
+            if re.search(r'(print|log|logger)', line, re.IGNORECASE):
+                bugs.append({
+                    "type": "security",
+                    "severity": "critical",
+                    "line": i,
+                    "code": line.strip(),
+                    "issue": "Potential credential exposure",
+                    "description": "Logging sensitive information"
+                })
+
+        # Bare except
+        if re.search(r'except\s*:', line):
+            bugs.append({
+                "type": "error_handling",
+                "severity": "medium",
+                "line": i,
+                "code": line.strip(),
+                "issue": "Bare except clause",
+                "description": "Catches all exceptions, may hide bugs"
+            })
+
+        # TODO/FIXME markers
+        if re.search(r'#\s*(TODO|FIXME|HACK|XXX)', line, re.IGNORECASE):
+            match = re.search(r'#\s*(TODO|FIXME|HACK|XXX)', line, re.IGNORECASE)
+            bugs.append({
+                "type": "code_quality",
+                "severity": "low",
+                "line": i,
+                "code": line.strip(),
+                "issue": f"{match.group(1)} marker found",
+                "description": "Incomplete or temporary code"
+            })
+
+        # SQL injection risk
+        if re.search(r'execute\s*\([^)]*%s|execute\s*\([^)]*\+', line):
+            bugs.append({
+                "type": "security",
+                "severity": "high",
+                "line": i,
+                "code": line.strip(),
+                "issue": "Potential SQL injection",
+                "description": "Use parameterized queries instead"
+            })
+    return bugs
+
+
+def generate_source(lines: int) -> str:
+    """Realistic Python: mostly clean code with the sample's bugs mixed in"""
+    with open("sample_buggy_code.py", encoding="utf-8") as f:
+        sample = f.read().split('\n')
+    clean = [
+        "def handler(request, session):",
+        "    \"\"\"Handle one request.\"\"\"",
+        "    items = [item.strip() for item in request.args.get('items', '').split(',')]",
+        "    if not items:",
+        "        return {'status': 'empty', 'count': 0}",
+        "    total = sum(len(item) for item in items if item)",
+        "    session.store(key=request.path, value=total)",
+        "    return {'status': 'ok', 'count': total}",
+        "",
+    ]
+    # One sample block per ten clean blocks (~1 finding per 50 lines)
+    block = sample + clean * (10 * len(sample) // len(clean))
+    source = (block * (lines // len(block) + 1))[:lines]
+    return '\n'.join(source)
+
+
+def best_time(fn, code: str, repeat: int) -> float:
+    timings = []
+    for _ in range(repeat):
+        start = time.perf_counter()
+        fn(code)
+        timings.append(time.perf_counter() - start)
+    return min(timings)
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark the detect_common_bugs rule engine")
+    parser.add_argument('--sizes', type=int, nargs='+', default=[1000, 10000, 100000],
+                        help='Generated file sizes in lines (default: 1000 10000 100000)')
+    parser.add_argument('--repeat', type=int, default=5, help='Runs per size; the best is reported')
+    args = parser.parse_args()
+
+    with open("sample_buggy_code.py", encoding="utf-8") as f:
+        sample = f.read()
+    identical = PYTHON_RULES.scan(sample) == legacy_detect_common_bugs(sample)
+    print(f"sample_buggy_code.py: {len(PYTHON_RULES.scan(sample))} findings, identical: {identical}")
+
+    print(f"\n{'lines':>8} {'findings':>9} {'legacy ms':>10} {'rules ms':>9} {'speedup':>8}  identical")
+    for size in args.sizes:
+        code = generate_source(size)
+        findings = PYTHON_RULES.scan(code)
+        same = findings == legacy_detect_common_bugs(code)
+        identical = identical and same
+        legacy = best_time(legacy_detect_common_bugs, code, args.repeat)
+        rules = best_time(PYTHON_RULES.scan, code, args.repeat)
+        print(f"{size:>8} {len(findings):>9} {legacy * 1000:>10.1f} {rules * 1000:>9.1f} "
+              f"{legacy / rules:>7.1f}x  {same}")
+
+    if not identical:
+        raise SystemExit("Findings differ from the legacy implementation")
+
+
+if __name__ == "__main__":
+    main()
@@ -5,13 +5,18 @@ Analyzes code for bugs, security issues, and generates fixes using MCP tools.
 """
 
 import ast
+import hashlib
 import json
 import os
 import re
 import sys
 import argparse
+import sqlite3
+import subprocess
+import time
+from concurrent.futures import ProcessPoolExecutor
 from pathlib import Path
-from typing import Dict, List, Any, Optional
+from typing import Dict, List, Any, Optional, Tuple
 from datetime import datetime
 import logging
 
@@ -23,6 +28,153 @@ logging.basicConfig(
 logger = logging.getLogger(__name__)
 
 
+class BugRule:
+    """
+    A line-based bug pattern
+    
+    A line is reported when `pattern` matches it (and `requires`, if given,
+    also matches). `anchor` lists, separated by "|", literals of which every
+    match contains at least one (compared case-insensitively); the rule is
+    only tried on lines where one occurs. `issue` may refer to the
+    pattern's groups, e.g. "{0} marker found".
+    """
+    
+    def __init__(self, anchor: str, pattern: str, bug_type: str, severity: str, issue: str,
+                 description: str, flags: int = 0, requires: Optional[str] = None):
+        self.anchors = anchor.split("|")
+        self.pattern = re.compile(pattern, flags)
+        self.requires = re.compile(requires, flags) if requires else None
+        self.type = bug_type
+        self.severity = severity
+        self.issue = issue
+        self.description = description
+    
+    def check(self, line: str, line_number: int) -> Optional[Dict[str, Any]]:
+        """Return the bug found on this line, if any"""
+        match = self.pattern.search(line)
+        if match is None or (self.requires is not None and not self.requires.search(line)):
+            return None
+        return {
+            "type": self.type,
+            "severity": self.severity,
+            "line": line_number,
+            "code": line.strip(),
+            "issue": self.issue.format(*match.groups()),
+            "description": self.description
+        }
+
+
+class RuleSet:
+    """
+    Rules matched over a whole file at once
+    
+    Instead of trying every rule on every line, each anchor literal is
+    searched for over the whole (lower-cased) file with finditer, which
+    runs at C speed for a plain literal. The hits are mapped back to line
+    numbers, and only those lines are tried against the rules whose
+    anchors occur on them, in rule order. Findings are therefore the same
+    as trying every rule on every line.
+    """
+    
+    def __init__(self, rules: List[BugRule]):
+        self.rules = list(rules)
+        anchor_rules: Dict[str, List[int]] = {}
+        for index, rule in enumerate(self.rules):
+            for anchor in rule.anchors:
+                anchor_rules.setdefault(anchor.lower(), []).append(index)
+        self.scanners = [(re.compile(re.escape(anchor)), indexes) for anchor, indexes in anchor_rules.items()]
+        # For text whose length lower() changes (e.g. U+0130), so offsets would not map back
+        self.folding_scanners = [(re.compile(re.escape(anchor), re.IGNORECASE), indexes)
+                                 for anchor, indexes in anchor_rules.items()]
+    
+    @property
+    def fingerprint(self) -> str:
+        """Hash of every rule definition; changes whenever a rule is edited"""
+        definitions = [
+            (rule.anchors, rule.pattern.pattern, rule.pattern.flags,
+             rule.requires.pattern if rule.requires else None,
+             rule.type, rule.severity, rule.issue, rule.description)
+            for rule in self.rules
+        ]
+        return hashlib.sha256(repr(definitions).encode('utf-8')).hexdigest()[:16]
+    
+    def scan(self, code: str) -> List[Dict[str, Any]]:
+        """Return the bugs found in `code`, ordered by line and then by rule"""
+        text = code.lower()
+        scanners = self.scanners
+        if len(text) != len(code):
+            text, scanners = code, self.folding_scanners
+        hits = sorted(
+            (match.start(), indexes)
+            for scanner, indexes in scanners
+            for match in scanner.finditer(text)
+        )
+        
+        bugs = []
+        pending = set()
+        line_number, counted, line_start, line_end = 1, 0, 0, -1
+        for position, indexes in hits:
+            if position > line_end:
+                # First hit on a new line: check the previous one
+                self._check_line(code[line_start:line_end], line_number, pending, bugs)
+                line_number += code.count('\n', counted, position)
+                counted = position
+                line_start = code.rfind('\n', 0, position) + 1
+                line_end = code.find('\n', position)
+                if line_end == -1:
+                    line_end = len(code)
+                pending = set()
+            pending.update(indexes)
+        
+        self._check_line(code[line_start:line_end], line_number, pending, bugs)
+        return bugs
+    
+    def _check_line(self, line: str, line_number: int, rule_indexes: set, bugs: List[Dict[str, Any]]):
+        for index in sorted(rule_indexes):
+            bug = self.rules[index].check(line, line_number)
+            if bug:
+                bugs.append(bug)
+
+
+PYTHON_RULES = RuleSet([
+    # Dangerous function usage
+    BugRule("eval", r'\beval\s*\(', "security", "high", "Dangerous function: eval",
+            "Security risk: eval() can execute arbitrary code"),
+    BugRule("exec", r'\bexec\s*\(', "security", "high", "Dangerous function: exec",
+            "Security risk: exec() can execute arbitrary code"),
+    BugRule("__import__", r'__import__\s*\(', "security", "high", "Dangerous function: __import__",
+            "Security risk: dynamic imports can be dangerous"),
+    # Password/secret logging
+    BugRule("password|secret|token|api_key", r'(password|secret|token|api_key)', "security", "critical",
+            "Potential credential exposure", "Logging sensitive information",
+            flags=re.IGNORECASE, requires=r'(print|log|logger)'),
+    # Bare except
+    BugRule("except", r'except\s*:', "error_handling", "medium", "Bare except clause",
+            "Catches all exceptions, may hide bugs"),
+    # TODO/FIXME markers
+    BugRule("#", r'#\s*(TODO|FIXME|HACK|XXX)', "code_quality", "low", "{0} marker found",
+            "Incomplete or temporary code", flags=re.IGNORECASE),
+    # SQL injection risk
+    BugRule("execute", r'execute\s*\([^)]*%s|execute\s*\([^)]*\+', "security", "high",
+            "Potential SQL injection", "Use parameterized queries instead"),
+])
+
+
+# Bump when analysis or report format changes outside PYTHON_RULES (syntax
+# checks, fix generation, report fields) so cached reports are not reused
+RULESET_VERSION = f"1-{PYTHON_RULES.fingerprint}"
+
+
+def count_severity(bugs: List[Dict[str, Any]]) -> Dict[str, int]:
+    """Count bugs by severity"""
+    return {
+        "critical": sum(1 for b in bugs if b.get("severity") == "critical"),
+        "high": sum(1 for b in bugs if b.get("severity") == "high"),
+        "medium": sum(1 for b in bugs if b.get("severity") == "medium"),
+        "low": sum(1 for b in bugs if b.get("severity") == "low")
+    }
+
+
 class MCPToolsLayer:
     """MCP Tools implementation for bug analysis"""
     
@@ -98,87 +250,14 @@ class MCPToolsLayer:
             Dict with detected bugs
         """
         bugs = []
-        lines = code.split('\n')
         
         if language.lower() == "python":
-            # Dangerous function usage
-            dangerous_patterns = [
-                (r'\beval\s*\(', "eval", "Security risk: eval() can execute arbitrary code"),
-                (r'\bexec\s*\(', "exec", "Security risk: exec() can execute arbitrary code"),
-                (r'__import__\s*\(', "__import__", "Security risk: dynamic imports can be dangerous"),
-            ]
-            
-            for i, line in enumerate(lines, 1):
-                # Check dangerous patterns
-                for pattern, name, message in dangerous_patterns:
-                    if re.search(pattern, line):
-                        bugs.append({
-                            "type": "security",
-                            "severity": "high",
-                            "line": i,
-                            "code": line.strip(),
-                            "issue": f"Dangerous function: {name}",
-                            "description": message
-                        })
-                
-                # Password/secret logging
-                if re.search(r'(password|secret|token|api_key)', line, re.IGNORECASE):
-                    if re.search(r'(print|log|logger)', line, re.IGNORECASE):
-                        bugs.append({
-                            "type": "security",
-                            "severity": "critical",
-                            "line": i,
-                            "code": line.strip(),
-                            "issue": "Potential credential exposure",
-                            "description": "Logging sensitive information"
-                        })
-                
-                # Bare except
-                if re.search(r'except\s*:', line):
-                    bugs.append({
-                        "type": "error_handling",
-                        "severity": "medium",
-                        "line": i,
-                        "code": line.strip(),
-                        "issue": "Bare except clause",
-                        "description": "Catches all exceptions, may hide bugs"
-                    })
-                
-                # TODO/FIXME markers
-                if re.search(r'#\s*(TODO|FIXME|HACK|XXX)', line, re.IGNORECASE):
-                    match = re.search(r'#\s*(TODO|FIXME|HACK|XXX)', line, re.IGNORECASE)
-                    bugs.append({
-                        "type": "code_quality",
-                        "severity": "low",
-                        "line": i,
-                        "code": line.strip(),
-                        "issue": f"{match.group(1)} marker found",
-                        "description": "Incomplete or temporary code"
-                    })
-                
-                # SQL injection risk
-                if re.search(r'execute\s*\([^)]*%s|execute\s*\([^)]*\+', line):
-                    bugs.append({
-                        "type": "security",
-                        "severity": "high",
-                        "line": i,
-                        "code": line.strip(),
-                        "issue": "Potential SQL injection",
-                        "description": "Use parameterized queries instead"
-                    })
-        
-        # Count by severity
-        severity_count = {
-            "critical": sum(1 for b in bugs if b.get("severity") == "critical"),
-            "high": sum(1 for b in bugs if b.get("severity") == "high"),
-            "medium": sum(1 for b in bugs if b.get("severity") == "medium"),
-            "low": sum(1 for b in bugs if b.get("severity") == "low")
-        }
+            bugs = PYTHON_RULES.scan(code)
         
         return {
             "bugs_found": len(bugs),
             "bugs": bugs,
-            "severity_count": severity_count,
+            "severity_count": count_severity(bugs),
             "language": language
         }
     
@@ -244,11 +323,253 @@ class MCPToolsLayer:
         return fix
 
 
+# Directories never scanned (matched against each directory or file name)
+EXCLUDED_NAMES = ('venv', 'node_modules')
+
+
+def find_source_files(dir_path: str, extensions: List[str] = None) -> List[str]:
+    """
+    Find files to analyze in a single walk of the tree
+    
+    Args:
+        dir_path: Directory to scan recursively
+        extensions: File extensions to include (default: .py .js .java)
+        
+    Returns:
+        Sorted list of file paths
+    """
+    if extensions is None:
+        extensions = ['.py', '.js', '.java']
+    extensions = tuple(extensions)
+    
+    files = []
+    for root, dirs, names in os.walk(dir_path):
+        dirs[:] = [d for d in dirs if not any(excluded in d for excluded in EXCLUDED_NAMES)]
+        for name in names:
+            if name.endswith(extensions) and not any(excluded in name for excluded in EXCLUDED_NAMES):
+                files.append(os.path.join(root, name))
+    
+    files.sort()
+    return files
+
+
+class ScanProgress:
+    """Log scan progress every 5% of files (and at the end)"""
+    
+    def __init__(self, total: int, step: int = 5):
+        self.total = total
+        self.step = step
+        self.done = 0
+        self.start = time.monotonic()
+        self.next_percent = step
+    
+    def update(self, count: int = 1):
+        self.done += count
+        percent = self.done * 100 // max(self.total, 1)
+        if percent >= self.next_percent or self.done == self.total:
+            elapsed = time.monotonic() - self.start
+            logger.info(f"Scanned {self.done}/{self.total} files ({percent}%) in {elapsed:.1f}s")
+            self.next_percent = (percent // self.step + 1) * self.step
+
+
+def _build_report(file_path: str) -> Dict[str, Any]:
+    """Worker-process entry point for parallel directory scans"""
+    return BugAnalyzer().build_report(file_path)
+
+
+def file_digest(file_path: str) -> str:
+    """SHA-256 of a file's content"""
+    digest = hashlib.sha256()
+    with open(file_path, 'rb') as f:
+        for block in iter(lambda: f.read(1 << 20), b''):
+            digest.update(block)
+    return digest.hexdigest()
+
+
+class ScanCache:
+    """
+    Persistent cache of per-file reports in SQLite
+    
+    A report is reused while the file's path, size, mtime, content hash and
+    the rule-set version are unchanged. Size and mtime are compared first,
+    so unchanged files are not read at all; when only the mtime differs
+    (e.g. a fresh CI checkout) the content hash decides. The hash stored is
+    the report's own "sha256", taken from the bytes that were analyzed, so a
+    file edited mid-scan is never cached under its new content. Paths are
+    stored absolute, one row per file.
+    """
+    
+    def __init__(self, db_path: str, version: str = RULESET_VERSION):
+        self.db_path = db_path
+        self.version = version
+        self.hits = 0
+        self.misses = 0
+        self.pruned = 0
+        
+        db_dir = Path(db_path).parent
+        if not db_dir.exists():
+            db_dir.mkdir(parents=True, exist_ok=True)
+        self.conn = sqlite3.connect(db_path)
+        self.conn.execute("""
+            CREATE TABLE IF NOT EXISTS reports (
+                path TEXT PRIMARY KEY,
+                size INTEGER NOT NULL,
+                mtime_ns INTEGER NOT NULL,
+                sha256 TEXT NOT NULL,
+                version TEXT NOT NULL,
+                report TEXT NOT NULL
+            )
+        """)
+    
+    def get(self, file_path: str) -> Tuple[Optional[Dict[str, Any]], Optional[tuple]]:
+        """
+        Look up the cached report for a file
+        
+        Returns:
+            (report or None, fingerprint to pass to put() after analyzing)
+        """
+        path = os.path.abspath(file_path)
+        try:
+            stat = os.stat(path)
+        except OSError:
+            return None, None
+        
+        fingerprint = (path, stat.st_size, stat.st_mtime_ns)
+        row = self.conn.execute(
+            "SELECT size, mtime_ns, sha256, version, report FROM reports WHERE path = ?", (path,)
+        ).fetchone()
+        if row is not None and row[3] == self.version and row[0] == stat.st_size:
+            if row[1] != stat.st_mtime_ns:
+                if file_digest(path) != row[2]:
+                    self.misses += 1
+                    return None, fingerprint
+                self.conn.execute("UPDATE reports SET mtime_ns = ? WHERE path = ?", (stat.st_mtime_ns, path))
+            self.hits += 1
+            report = json.loads(row[4])
+            report["file"] = file_path
+            return report, fingerprint
+        
+        self.misses += 1
+        return None, fingerprint
+    
+    def put(self, fingerprint: Optional[tuple], report: Dict[str, Any]):
+        """Store a fresh report under the fingerprint returned by get()"""
+        if fingerprint is None or "error" in report or not report.get("sha256"):
+            return
+        path, size, mtime_ns = fingerprint
+        self.conn.execute(
+            "INSERT OR REPLACE INTO reports (path, size, mtime_ns, sha256, version, report) "
+            "VALUES (?, ?, ?, ?, ?, ?)",
+            (path, size, mtime_ns, report["sha256"], self.version, json.dumps(report))
+        )
+    
+    def prune(self, dir_path: str, files: List[str]) -> int:
+        """Remove entries under dir_path for files no longer in `files`"""
+        prefix = os.path.join(os.path.abspath(dir_path), '')
+        keep = {os.path.abspath(file_path) for file_path in files}
+        stale = [
+            (path,) for (path,) in self.conn.execute(
+                "SELECT path FROM reports WHERE substr(path, 1, ?) = ?", (len(prefix), prefix)
+            )
+            if path not in keep
+        ]
+        self.conn.executemany("DELETE FROM reports WHERE path = ?", stale)
+        self.pruned += len(stale)
+        return len(stale)
+    
+    def stats(self) -> Dict[str, Any]:
+        return {"path": self.db_path, "hits": self.hits, "misses": self.misses, "pruned": self.pruned}
+    
+    def commit(self):
+        self.conn.commit()
+    
+    def close(self):
+        self.conn.commit()
+        self.conn.close()
+
+
+HUNK_HEADER = re.compile(r'^@@ -\d+(?:,(\d+))? \+(\d+)(?:,(\d+))? @@')
+
+
+def run_git(args: List[str], cwd: str = '.') -> str:
+    """Run a git command and return its output (raises CalledProcessError)"""
+    result = subprocess.run(
+        ['git', '-c', 'core.quotePath=false'] + args,
+        cwd=cwd, capture_output=True, text=True, encoding='utf-8', errors='replace', check=True
+    )
+    return result.stdout
+
+
+def parse_diff_hunks(diff_text: str) -> Dict[str, List[Tuple[int, int]]]:
+    """
+    Parse `git diff --unified=0` output
+    
+    Returns:
+        Dict mapping each new-side path (relative to the repository root)
+        to the (first, last) line ranges added or changed in it. Files with
+        only deleted lines map to an empty list; deleted files are left out.
+    """
+    hunks: Dict[str, List[Tuple[int, int]]] = {}
+    path = None
+    remaining = 0  # lines left in the current hunk, so content is never read as a header
+    for line in diff_text.split('\n'):
+        if remaining > 0 and line[:1] in ('-', '+', ' '):
+            remaining -= 1
+            continue
+        if line.startswith('+++ '):
+            target = line[4:].rstrip('\t')
+            path = None if target == '/dev/null' else target[2:] if target.startswith('b/') else target
+            if path is not None:
+                hunks.setdefault(path, [])
+            continue
+        match = HUNK_HEADER.match(line)
+        if match and path is not None:
+            old_count = int(match.group(1)) if match.group(1) is not None else 1
+            start = int(match.group(2))
+            count = int(match.group(3)) if match.group(3) is not None else 1
+            remaining = old_count + count
+            if count:
+                hunks[path].append((start, start + count - 1))
+    return hunks
+
+
+def git_changed_lines(diff_range: str, path: str = '.') -> Dict[str, List[Tuple[int, int]]]:
+    """
+    Changed line ranges per file for a git range
+    
+    Args:
+        diff_range: "base..head", "base...head" (changes since the merge
+            base), or "base" to compare with the working tree
+        path: Directory inside the repository; only changes below it count
+    """
+    return parse_diff_hunks(run_git(
+        ['diff', '--unified=0', '--no-color', '--no-ext-diff', '--find-renames', '--diff-filter=d',
+         diff_range, '--', '.'],
+        cwd=path
+    ))
+
+
+def restrict_to_lines(report: Dict[str, Any], ranges: List[Tuple[int, int]]) -> Dict[str, Any]:
+    """Keep only the findings (and fixes) of a report on the given lines"""
+    def changed(line: Optional[int]) -> bool:
+        return line is not None and any(first <= line <= last for first, last in ranges)
+    
+    bugs = [bug for bug in report["bug_detection"]["bugs"] if changed(bug.get("line"))]
+    report["bug_detection"]["bugs"] = bugs
+    report["bug_detection"]["bugs_found"] = len(bugs)
+    report["bug_detection"]["severity_count"] = count_severity(bugs)
+    report["fixes"] = [fix for fix in report["fixes"] if changed(fix["bug"].get("line"))]
+    report["summary"]["bugs_found"] = len(bugs)
+    report["summary"]["severity"] = report["bug_detection"]["severity_count"]
+    return report
+
+
 class BugAnalyzer:
     """Main bug analysis engine"""
     
-    def __init__(self):
+    def __init__(self, cache: Optional[ScanCache] = None):
         self.tools = MCPToolsLayer()
+        self.cache = cache
         self.results = {
             "files_analyzed": 0,
             "total_bugs": 0,
@@ -257,15 +578,39 @@ class BugAnalyzer:
         }
     
     def analyze_file(self, file_path: str) -> Dict[str, Any]:
-        """Analyze a single file"""
-        logger.info(f"Analyzing: {file_path}")
-        
-        try:
-            with open(file_path, 'r', encoding='utf-8') as f:
-                code = f.read()
-        except Exception as e:
-            logger.error(f"Failed to read {file_path}: {e}")
-            return {"error": str(e), "file": file_path}
+        """Analyze a single file (served from the cache if unchanged)"""
+        report, fingerprint = self._lookup(file_path)
+        if report is None:
+            logger.info(f"Analyzing: {file_path}")
+            report = self.build_report(file_path)
+            self._store(fingerprint, report)
+            if self.cache is not None:
+                self.cache.commit()
+        self.record_report(report)
+        return report
+    
+    def _lookup(self, file_path: str) -> Tuple[Optional[Dict[str, Any]], Optional[tuple]]:
+        if self.cache is None:
+            return None, None
+        return self.cache.get(file_path)
+    
+    def _store(self, fingerprint: Optional[tuple], report: Dict[str, Any]):
+        if self.cache is not None:
+            self.cache.put(fingerprint, report)
+    
+    def build_report(self, file_path: str, code: Optional[str] = None) -> Dict[str, Any]:
+        """Analyze a single file (or `code` given for it) without adding it to the results"""
+        if code is None:
+            try:
+                with open(file_path, 'rb') as f:
+                    data = f.read()
+                # Same newline handling as reading in text mode
+                code = data.decode('utf-8').replace('\r\n', '\n').replace('\r', '\n')
+            except Exception as e:
+                logger.error(f"Failed to read {file_path}: {e}")
+                return {"error": str(e), "file": file_path}
+        else:
+            data = code.encode('utf-8')
         
         # Determine language
         ext = Path(file_path).suffix.lower()
@@ -286,8 +631,9 @@ class BugAnalyzer:
             fix = self.tools.generate_fix(bug, code)
             fixes.append(fix)
         
-        report = {
+        return {
             "file": file_path,
+            "sha256": hashlib.sha256(data).hexdigest(),
             "language": language,
             "timestamp": datetime.now().isoformat(),
             "syntax_analysis": syntax_result,
@@ -299,36 +645,139 @@ class BugAnalyzer:
                 "severity": bug_result.get("severity_count", {})
             }
         }
+    
+    def record_report(self, report: Dict[str, Any]):
+        """Add a file report to the results (unreadable files are skipped)"""
+        if "error" in report:
+            return
         
+        bug_result = report["bug_detection"]
         self.results["files_analyzed"] += 1
         self.results["total_bugs"] += bug_result.get("bugs_found", 0)
-        if not syntax_result.get("valid", True):
+        if not report["syntax_analysis"].get("valid", True):
             self.results["syntax_errors"] += 1
         
         self.results["reports"].append(report)
+    
+    def analyze_directory(self, dir_path: str, extensions: List[str] = None,
+                          jobs: int = 1) -> List[Dict[str, Any]]:
+        """
+        Analyze all files in a directory
         
-        return report
+        Args:
+            dir_path: Directory to scan recursively
+            extensions: File extensions to analyze (default: .py .js .java)
+            jobs: Worker processes; 1 analyzes in this process, 0 uses every CPU
+            
+        Returns:
+            List of file reports, in the same (sorted path) order for any jobs
+            
+        With a cache, unchanged files are not re-analyzed and entries for
+        files deleted from the directory are pruned.
+        """
+        files = find_source_files(dir_path, extensions)
+        looked_up = [self._lookup(file_path) for file_path in files]
+        missing = [i for i, (report, _) in enumerate(looked_up) if report is None]
+        jobs = jobs or os.cpu_count() or 1
+        jobs = min(jobs, len(missing)) or 1
+        logger.info(f"Scanning {len(files)} files: {len(files) - len(missing)} cached, "
+                    f"{len(missing)} to analyze with {jobs} job(s)")
+        
+        fresh = {}
+        if jobs == 1:
+            for i in missing:
+                logger.info(f"Analyzing: {files[i]}")
+                fresh[i] = self.build_report(files[i])
+        else:
+            # Chunks amortise inter-process overhead; map() yields reports in
+            # input order, so the merged results do not depend on scheduling
+            chunksize = max(1, min(64, len(missing) // (jobs * 8)))
+            progress = ScanProgress(len(missing))
+            with ProcessPoolExecutor(max_workers=jobs) as executor:
+                paths = [files[i] for i in missing]
+                for i, report in zip(missing, executor.map(_build_report, paths, chunksize=chunksize)):
+                    fresh[i] = report
+                    progress.update()
+        
+        reports = []
+        for i, (report, fingerprint) in enumerate(looked_up):
+            if report is None:
+                report = fresh[i]
+                self._store(fingerprint, report)
+            self.record_report(report)
+            reports.append(report)
+        
+        if self.cache is not None:
+            self.cache.prune(dir_path, files)
+            self.cache.commit()
+        
+        return reports
     
-    def analyze_directory(self, dir_path: str, extensions: List[str] = None) -> List[Dict[str, Any]]:
-        """Analyze all files in a directory"""
+    def analyze_diff(self, diff_range: str, path: str = '.',
+                     extensions: List[str] = None) -> List[Dict[str, Any]]:
+        """
+        Analyze only the files and lines changed in a git range
+        
+        Each changed file is analyzed in full at the head revision (so the
+        syntax check sees the whole file), but only findings on added or
+        changed lines are reported. Work is proportional to the diff; the
+        scan cache is not used.
+        
+        Args:
+            diff_range: "base..head", "base...head", or "base" to compare
+                with the working tree
+            path: Directory inside the repository to limit the diff to
+            extensions: File extensions to analyze (default: .py .js .java)
+            
+        Returns:
+            List of file reports with a "diff" entry, sorted by path
+        """
         if extensions is None:
             extensions = ['.py', '.js', '.java']
+        extensions = tuple(extensions)
         
-        reports = []
-        dir_path = Path(dir_path)
+        root = run_git(['rev-parse', '--show-toplevel'], cwd=path).strip()
+        changed = git_changed_lines(diff_range, path)
+        # Read files at the head revision; a bare base compares with the working tree
+        head = None
+        if '..' in diff_range:
+            head = diff_range.split('..')[-1].lstrip('.') or 'HEAD'
+        logger.info(f"{len(changed)} files changed in {diff_range}")
         
-        for ext in extensions:
-            for file_path in dir_path.rglob(f'*{ext}'):
-                if 'venv' in str(file_path) or 'node_modules' in str(file_path):
-                    continue
-                report = self.analyze_file(str(file_path))
-                reports.append(report)
+        reports = []
+        for file_path in sorted(changed):
+            name = os.path.basename(file_path)
+            if not changed[file_path] or not name.endswith(extensions):
+                continue
+            if any(excluded in part for part in file_path.split('/') for excluded in EXCLUDED_NAMES):
+                continue
+            
+            logger.info(f"Analyzing changes: {file_path}")
+            try:
+                if head is None:
+                    with open(os.path.join(root, file_path), 'r', encoding='utf-8') as f:
+                        code = f.read()
+                else:
+                    code = run_git(['show', f'{head}:{file_path}'], cwd=root)
+            except (OSError, subprocess.CalledProcessError) as e:
+                logger.error(f"Failed to read {file_path}: {e}")
+                continue
+            
+            report = restrict_to_lines(self.build_report(file_path, code), changed[file_path])
+            report["diff"] = {
+                "range": diff_range,
+                "changed_lines": [list(lines) for lines in changed[file_path]]
+            }
+            self.record_report(report)
+            reports.append(report)
         
         return reports
     
     def generate_report(self, output_path: str = "bug_report.json"):
         """Generate and save analysis report"""
         self.results["generated_at"] = datetime.now().isoformat()
+        if self.cache is not None:
+            self.results["cache"] = self.cache.stats()
         
         # Save JSON report
         output_dir = Path(output_path).parent
@@ -351,6 +800,9 @@ class BugAnalyzer:
         print(f"Files Analyzed: {self.results['files_analyzed']}")
         print(f"Total Bugs Found: {self.results['total_bugs']}")
         print(f"Syntax Errors: {self.results['syntax_errors']}")
+        if "cache" in self.results:
+            cache = self.results["cache"]
+            print(f"Cache: {cache['hits']} unchanged, {cache['misses']} analyzed, {cache['pruned']} pruned")
         
         # Aggregate severity counts
         total_severity = {"critical": 0, "high": 0, "medium": 0, "low": 0}
@@ -401,6 +853,13 @@ def main():
         type=str,
         help='Path to directory to analyze recursively'
     )
+    parser.add_argument(
+        '--diff',
+        type=str,
+        metavar='RANGE',
+        help='Only report findings on lines changed in a git range: base..head, base...head, '
+             'or base (working tree); limited to --directory (default: current directory)'
+    )
     parser.add_argument(
         '--output',
         type=str,
@@ -414,15 +873,40 @@ def main():
         default=['.py', '.js', '.java'],
         help='File extensions to analyze (default: .py .js .java)'
     )
+    parser.add_argument(
+        '--cache',
+        type=str,
+        default='outputs/scan_cache.db',
+        help='SQLite cache of per-file reports; unchanged files are not re-analyzed '
+             '(default: outputs/scan_cache.db)'
+    )
+    parser.add_argument(
+        '--no-cache',
+        action='store_true',
+        help='Analyze every file without reading or updating the cache'
+    )
+    parser.add_argument(
+        '--jobs',
+        type=int,
+        default=1,
+        help='Worker processes for --directory scans; 0 uses every CPU (default: 1)'
+    )
     
     args = parser.parse_args()
     
-    analyzer = BugAnalyzer()
+    cache = None if args.no_cache else ScanCache(args.cache)
+    analyzer = BugAnalyzer(cache)
     
-    if args.file:
+    if args.diff:
+        try:
+            analyzer.analyze_diff(args.diff, args.directory or '.', args.extensions)
+        except (OSError, subprocess.CalledProcessError) as e:
+            logger.error(f"git diff {args.diff} failed: {getattr(e, 'stderr', '') or e}")
+            sys.exit(1)
+    elif args.file:
         analyzer.analyze_file(args.file)
     elif args.directory:
-        analyzer.analyze_directory(args.directory, args.extensions)
+        analyzer.analyze_directory(args.directory, args.extensions, args.jobs)
     else:
         # Default: analyze sample file if it exists
         sample_file = "sample_buggy_code.py"
@@ -435,6 +919,9 @@ def main():
             sys.exit(1)
     
     analyzer.generate_report(args.output)
+    if cache is not None:
+        cache.close()
 
 
 if __name__ == "__main__":
+    main()
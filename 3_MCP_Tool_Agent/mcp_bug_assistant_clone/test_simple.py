@@ -7,8 +7,15 @@ Tests core functionality of the MCP tools and analyzer
 import unittest
 import json
 import os
+import shutil
+import sqlite3
+import subprocess
+import tempfile
 from pathlib import Path
-from bug_assistant import MCPToolsLayer, BugAnalyzer
+from bug_assistant import (
+    MCPToolsLayer, BugAnalyzer, PYTHON_RULES, ScanCache, find_source_files, parse_diff_hunks
+)
+from benchmark_rules import legacy_detect_common_bugs
 
 
 class TestMCPTools(unittest.TestCase):
@@ -124,6 +131,39 @@ print(password)  # critical
         self.assertGreater(severity["low"], 0)
 
 
+class TestRuleSet(unittest.TestCase):
+    """Test the single-pass rule engine against the per-line implementation"""
+    
+    def test_sample_file_findings_unchanged(self):
+        """Test identical findings on sample_buggy_code.py"""
+        with open("sample_buggy_code.py", encoding="utf-8") as f:
+            code = f.read()
+        bugs = PYTHON_RULES.scan(code)
+        
+        self.assertEqual(bugs, legacy_detect_common_bugs(code))
+        self.assertEqual(len(bugs), 18)
+    
+    def test_edge_cases_unchanged(self):
+        """Test several rules per line, overlapping anchors, case and Unicode"""
+        cases = [
+            "",
+            "eval(x); exec(y)  # TODO log password",
+            "print(exceptoken)",
+            "cursor.execute('SELECT ' + name)\nEVAL(x)\nexcept :",
+            "# İstanbul\nlogger.info(API_KEY)\n\t# hack",
+            "x = 1\r\ntry:\r\n    pass\r\nexcept:\r\n    pass",
+        ]
+        for code in cases:
+            with self.subTest(code=code):
+                self.assertEqual(PYTHON_RULES.scan(code), legacy_detect_common_bugs(code))
+    
+    def test_line_numbers(self):
+        """Test offsets map back to the right lines"""
+        code = "x = 1\n\n\nresult = eval(data)\n" + "y = 2\n" * 100 + "exec(code)"
+        lines = [bug["line"] for bug in PYTHON_RULES.scan(code)]
+        self.assertEqual(lines, [4, 105])
+
+
 class TestBugAnalyzer(unittest.TestCase):
     """Test Bug Analyzer"""
     
@@ -185,6 +225,181 @@ class TestBugAnalyzer(unittest.TestCase):
         self.assertGreater(self.analyzer.results["total_bugs"], 0)
 
 
+class TestDirectoryScan(unittest.TestCase):
+    """Test directory scanning"""
+    
+    def setUp(self):
+        self.temp_dir = tempfile.TemporaryDirectory()
+        root = Path(self.temp_dir.name)
+        for relative, code in [
+            ("a.py", "eval('x')\n"),
+            ("pkg/b.py", "try:\n    pass\nexcept:\n    pass\n"),
+            ("pkg/c.js", "exec(code)\n"),
+            ("pkg/notes.txt", "eval('x')\n"),
+            ("venv/lib/d.py", "eval('x')\n"),
+            ("node_modules/e.js", "eval('x')\n"),
+        ]:
+            path = root / relative
+            path.parent.mkdir(parents=True, exist_ok=True)
+            path.write_text(code)
+    
+    def tearDown(self):
+        self.temp_dir.cleanup()
+    
+    def test_find_source_files(self):
+        """Test a single sorted walk that skips venv and node_modules"""
+        files = find_source_files(self.temp_dir.name)
+        relative = [os.path.relpath(f, self.temp_dir.name) for f in files]
+        self.assertEqual(relative, ["a.py", os.path.join("pkg", "b.py"), os.path.join("pkg", "c.js")])
+    
+    def test_parallel_matches_sequential(self):
+        """Test --jobs merges the same reports in the same order"""
+        sequential = BugAnalyzer()
+        sequential.analyze_directory(self.temp_dir.name)
+        parallel = BugAnalyzer()
+        parallel.analyze_directory(self.temp_dir.name, jobs=2)
+        
+        for key in ("files_analyzed", "total_bugs", "syntax_errors"):
+            self.assertEqual(parallel.results[key], sequential.results[key])
+        self.assertEqual(
+            [(r["file"], r["bug_detection"]) for r in parallel.results["reports"]],
+            [(r["file"], r["bug_detection"]) for r in sequential.results["reports"]]
+        )
+        self.assertEqual(parallel.results["files_analyzed"], 3)
+
+
+class TestScanCache(unittest.TestCase):
+    """Test the persistent scan cache"""
+    
+    def setUp(self):
+        self.temp_dir = tempfile.TemporaryDirectory()
+        self.root = Path(self.temp_dir.name) / "src"
+        self.root.mkdir()
+        for name in ("a.py", "b.py", "c.py"):
+            (self.root / name).write_text("eval('x')\n")
+        self.db_path = str(Path(self.temp_dir.name) / "cache.db")
+    
+    def tearDown(self):
+        self.temp_dir.cleanup()
+    
+    def scan(self, version="test"):
+        cache = ScanCache(self.db_path, version=version)
+        analyzer = BugAnalyzer(cache)
+        analyzer.analyze_directory(str(self.root))
+        cache.close()
+        return analyzer, cache
+    
+    def test_unchanged_files_are_served_from_cache(self):
+        """Test a second scan reuses every report"""
+        first, _ = self.scan()
+        second, cache = self.scan()
+        
+        self.assertEqual((cache.hits, cache.misses), (3, 0))
+        self.assertEqual(second.results, first.results)
+    
+    def test_changed_and_touched_files(self):
+        """Test new content is re-analyzed and a new mtime alone is not"""
+        self.scan()
+        (self.root / "a.py").write_text("exec('y')\n")
+        b = self.root / "b.py"
+        os.utime(b, ns=(b.stat().st_atime_ns, b.stat().st_mtime_ns + 10 ** 9))
+        
+        analyzer, cache = self.scan()
+        
+        self.assertEqual((cache.hits, cache.misses), (2, 1))
+        self.assertEqual(analyzer.results["reports"][0]["bug_detection"]["bugs"][0]["issue"],
+                         "Dangerous function: exec")
+    
+    def test_edit_during_scan_is_not_cached(self):
+        """Test a report is stored under the hash of the bytes it analyzed"""
+        cache = ScanCache(self.db_path, version="test")
+        path = str(self.root / "a.py")
+        _, fingerprint = cache.get(path)
+        report = BugAnalyzer().build_report(path)
+        # Same-size edit after the file was read but before the report is stored
+        (self.root / "a.py").write_text("exec('x')\n")
+        os.utime(path, ns=(fingerprint[2], fingerprint[2] + 10 ** 9))
+        cache.put(fingerprint, report)
+        cache.close()
+        
+        analyzer, cache = self.scan()
+        
+        self.assertEqual((cache.hits, cache.misses), (0, 3))
+        self.assertEqual(analyzer.results["reports"][0]["bug_detection"]["bugs"][0]["issue"],
+                         "Dangerous function: exec")
+    
+    def test_deleted_files_are_pruned(self):
+        """Test entries for files removed from the tree are deleted"""
+        self.scan()
+        (self.root / "c.py").unlink()
+        _, cache = self.scan()
+        
+        self.assertEqual(cache.pruned, 1)
+        with sqlite3.connect(self.db_path) as conn:
+            self.assertEqual(conn.execute("SELECT COUNT(*) FROM reports").fetchone()[0], 2)
+    
+    def test_rule_set_version_invalidates(self):
+        """Test reports from another rule-set version are not reused"""
+        self.scan(version="1")
+        _, cache = self.scan(version="2")
+        self.assertEqual((cache.hits, cache.misses), (0, 3))
+
+
+class TestDiffScan(unittest.TestCase):
+    """Test git-diff-scoped scanning"""
+    
+    def test_parse_diff_hunks(self):
+        """Test added/changed ranges, deletions and hunk lines that look like headers"""
+        diff = "\n".join([
+            "diff --git a/app.py b/app.py",
+            "--- a/app.py",
+            "+++ b/app.py",
+            "@@ -3,0 +4,2 @@ def main():",
+            "+    eval(x)",
+            "++++ not a header",
+            "@@ -10 +12 @@",
+            "-    old()",
+            "+    new()",
+            "@@ -20,2 +21,0 @@",
+            "-    gone()",
+            "-    gone()",
+            "diff --git a/old.py b/old.py",
+            "--- a/old.py",
+            "+++ /dev/null",
+            "@@ -1 +0,0 @@",
+            "-eval(x)",
+        ])
+        self.assertEqual(parse_diff_hunks(diff), {"app.py": [(4, 5), (12, 12)]})
+    
+    @unittest.skipUnless(shutil.which("git"), "git is not installed")
+    def test_only_changed_lines_are_reported(self):
+        """Test findings outside changed hunks and unchanged files are left out"""
+        with tempfile.TemporaryDirectory() as repo:
+            def git(*args):
+                subprocess.run(["git", "-c", "user.name=test", "-c", "user.email=test@example.com", *args],
+                               cwd=repo, check=True, capture_output=True)
+            
+            Path(repo, "a.py").write_text("eval('old')\n\nx = 1\n")
+            Path(repo, "b.py").write_text("exec('untouched')\n")
+            git("init", "-q")
+            git("add", ".")
+            git("commit", "-q", "-m", "base")
+            Path(repo, "a.py").write_text("eval('old')\n\nx = 1\nexec('new')\ndef broken(:\n")
+            git("commit", "-q", "-am", "head")
+            Path(repo, "a.py").write_text("eval('working tree only')\n")
+            
+            analyzer = BugAnalyzer()
+            reports = analyzer.analyze_diff("HEAD~1..HEAD", repo)
+        
+        self.assertEqual([report["file"] for report in reports], ["a.py"])
+        bugs = reports[0]["bug_detection"]["bugs"]
+        self.assertEqual([(bug["line"], bug["issue"]) for bug in bugs], [(4, "Dangerous function: exec")])
+        self.assertEqual(len(reports[0]["fixes"]), 1)
+        self.assertFalse(reports[0]["syntax_analysis"]["valid"])
+        self.assertEqual(reports[0]["diff"]["changed_lines"], [[4, 5]])
+        self.assertEqual(analyzer.results["total_bugs"], 1)
+
+
 class TestIntegration(unittest.TestCase):
     """Integration tests"""
     